@@ -0,0 +1,154 @@
+'''
+Headless bot against bot matches.
+
+Every deal is played twice with the players swapping seats, so both get the
+same cards and positions and most of the luck cancels out. Stacks are reset
+before every hand and nothing is printed.
+
+Usage: python arena.py [number of hands]
+'''
+import itertools
+import random
+import time
+from math import sqrt
+from statistics import NormalDist
+from typing import Iterator, NamedTuple
+
+from game import Game
+from player import Player
+
+
+class ArenaResult(NamedTuple):
+    '''The result of run, from the point of view of the first player.'''
+    hands: int
+    seconds: float
+    hands_per_second: float
+    bb_per_100: float
+    interval: tuple[float, float]
+
+
+def play_hands(
+    player_a: Player,
+    player_b: Player,
+    *,
+    seed: int | None = None,
+    stack: int = 1000,
+    blind: int = 10
+) -> Iterator[float]:
+    '''
+    Play two players against each other for as long as hands are requested.
+    Args:
+        player_a (Player): The player the results are reported for.
+        player_b (Player): The opponent.
+        seed (int | None): The seed of the deals.
+        stack (int): The stack of both players at the start of every hand.
+        blind (int): The big blind.
+
+    Yields:
+        float: The big blinds won by player_a in every hand. Hands 2i and
+            2i + 1 share the same deal with the seats swapped.
+    '''
+    rng = random.Random(seed)
+    games = (
+        Game(player_a, player_b, stack, stack, blind),
+        Game(player_b, player_a, stack, stack, blind)
+    )
+    for deal in itertools.count():
+        deal_seed = rng.getrandbits(64)
+        button = deal % 2
+        for game, seat in zip(games, (0, 1)):
+            status = game.status
+            status.players_money[:] = [stack, stack]
+            # play_round moves the button before dealing
+            status.initial_player = 1 - button
+            game.rng = random.Random(deal_seed)
+            game.play_round()
+            yield (status.players_money[seat] - stack) / blind
+
+
+def bb_per_100(
+    total: float,
+    squares: float,
+    deals: int,
+    hands: int,
+    confidence: float = 0.95
+) -> tuple[float, tuple[float, float]]:
+    '''
+    Win rate and its confidence interval from the results of every deal.
+    Deals are independent, the two hands of a deal are not.
+    Args:
+        total (float): The sum of the big blinds won on every deal.
+        squares (float): The sum of their squares.
+        deals (int): The number of deals.
+        hands (int): The number of hands played in them.
+        confidence (float): The confidence level of the interval.
+
+    Returns:
+        tuple[float, tuple[float, float]]: The big blinds per 100 hands and
+            their confidence interval.
+    '''
+    per_hand = total / hands
+    margin = 0.0
+    if deals > 1:
+        variance = max(squares - total * total / deals, 0.0) / (deals - 1)
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        margin = z * sqrt(variance / deals) * deals / hands
+    return 100 * per_hand, (100 * (per_hand - margin), 100 * (per_hand + margin))
+
+
+def run(
+    player_a: Player,
+    player_b: Player,
+    hands: int = 1_000_000,
+    *,
+    seed: int | None = None,
+    stack: int = 1000,
+    blind: int = 10,
+    confidence: float = 0.95
+) -> ArenaResult:
+    '''
+    Play two players against each other.
+    Args:
+        player_a (Player): The player the results are reported for.
+        player_b (Player): The opponent.
+        hands (int): The number of hands to play, every deal counts twice.
+        seed (int | None): The seed of the deals.
+        stack (int): The stack of both players at the start of every hand.
+        blind (int): The big blind.
+        confidence (float): The confidence level of the interval.
+
+    Returns:
+        ArenaResult: The number of hands played, the time it took, the hands
+            per second and the big blinds per 100 hands won by player_a with
+            its confidence interval.
+    '''
+    # Big blinds won by player_a on every deal, both seats together
+    deals = [0.0] * ((hands + 1) // 2)
+    start = time.perf_counter()
+    results = play_hands(player_a, player_b, seed=seed, stack=stack, blind=blind)
+    for i, won in enumerate(itertools.islice(results, hands)):
+        deals[i // 2] += won
+    seconds = time.perf_counter() - start
+
+    rate, interval = bb_per_100(
+        sum(deals),
+        sum(won * won for won in deals),
+        len(deals),
+        hands,
+        confidence
+    )
+    return ArenaResult(hands, seconds, hands / seconds, rate, interval)
+
+
+if __name__ == '__main__':
+    import sys
+
+    from basic_decider import BasicDecisionMaker
+
+    hands = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    result = run(BasicDecisionMaker('Bot A'), BasicDecisionMaker('Bot B'), hands, seed=0)
+    low, high = result.interval
+    print(
+        f'{result.hands} hands in {result.seconds:.1f}s ({result.hands_per_second:,.0f} hands/s), '
+        f'Bot A: {result.bb_per_100:+.1f} bb/100 [{low:+.1f}, {high:+.1f}]'
+    )
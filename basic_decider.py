@@ -1,12 +1,35 @@
 from game_objects import Action, ActionType, HoleCards, Board, GameStatus, GamePhase
 from player import Player
-from stats import calculate_equity
+from stats import preflop
+from stats.adaptive import adaptive_equity
+from stats.cache import EquityCache, equity_cache
+from stats.incremental import HandEquity
 
 class BasicDecisionMaker(Player):
     '''Basic decision maker based on a pre-made decision tree.'''
-    def __init__(self, name: str, *, verbose: bool = False):
+    # Equities the decision tree branches on
+    win_thresholds = (0.9, 0.7, 0.5, 0.4)
+    lose_thresholds = (0.7,)
+    
+    def __init__(
+        self,
+        name: str,
+        *,
+        verbose: bool = False,
+        cache: EquityCache = equity_cache,
+        win_thresholds: tuple[float, float, float, float] | None = None,
+        lose_thresholds: tuple[float] | None = None
+    ):
         super().__init__(name)
         self.verbose = verbose
+        self.cache = cache
+        # Variants of the bot only change where the tree branches
+        if win_thresholds is not None:
+            self.win_thresholds = tuple(win_thresholds)
+        if lose_thresholds is not None:
+            self.lose_thresholds = tuple(lose_thresholds)
+        # Equity of the current hand, refined as the board is dealt
+        self.hand_equity: HandEquity | None = None
     
     def get_action(
         self,
@@ -17,7 +40,25 @@ class BasicDecisionMaker(Player):
         op_holecards: HoleCards | None = None
     ) -> Action:
         
-        winrate, lose_rate = calculate_equity(player_hand, board)
+        if board.status == GamePhase.PRE_FLOP and not preflop.available():
+            # Only sample until it is clear which rule below applies
+            winrate, lose_rate, *_ = adaptive_equity(
+                player_hand,
+                board,
+                target_error=None,
+                thresholds=self.win_thresholds,
+                lose_thresholds=self.lose_thresholds,
+                max_simulations=1000
+            )
+        elif board.status == GamePhase.PRE_FLOP:
+            winrate, lose_rate = self.cache.equity(player_hand, board, 'preflop')
+        else:
+            # Exact from the flop on, no sampling noise around the thresholds.
+            # The flop is enumerated once per canonical situation in the
+            # shared cache, and later streets and actions reuse it
+            if self.hand_equity is None or self.hand_equity.hole_cards != player_hand:
+                self.hand_equity = HandEquity(player_hand, cache=self.cache)
+            winrate, lose_rate = self.hand_equity.equity(board)
         draw_rate = 1 - winrate - lose_rate
         if self.verbose:
             print(f'Bot\'s hand: {player_hand}')
@@ -40,15 +81,17 @@ class BasicDecisionMaker(Player):
             return Action(ActionType.SHOW)
         
         valid_actions = status.get_valid_actions()
+        very_high, high, medium, moderate = self.win_thresholds
+        max_lose_rate, = self.lose_thresholds
         
         spare_money = money - bet_to_call
-        if winrate > 0.9: # Very high equity
+        if winrate > very_high: # Very high equity
             if ActionType.RAISE in valid_actions:
                 return Action(ActionType.RAISE, spare_money) # All-in
             return Action(ActionType.CALL)
                         
         # Rules based on the equity
-        if winrate > 0.7:  # High equity
+        if winrate > high:  # High equity
             if ActionType.RAISE in valid_actions:
                 raise_amount = max(min_bet * 2, pot_size * 0.5)
                 raise_amount = min(raise_amount, spare_money)
@@ -59,7 +102,7 @@ class BasicDecisionMaker(Player):
             
             return Action(ActionType.CHECK)
 
-        if winrate > 0.5:
+        if winrate > medium:
             if ActionType.RAISE in valid_actions:
                 raise_amount = max(min_bet, pot_size * 0.1)
                 raise_amount = min(raise_amount, spare_money)
@@ -70,13 +113,13 @@ class BasicDecisionMaker(Player):
             
             return Action(ActionType.CHECK)
             
-        if winrate > 0.4:  # Moderate equity
+        if winrate > moderate:  # Moderate equity
             if ActionType.CALL in valid_actions:
                 return Action(ActionType.CALL)
             return Action(ActionType.CHECK)
 
         
-        if winrate + draw_rate > 0.3:  # Low equity
+        if winrate + draw_rate > 1 - max_lose_rate:  # Low equity
             if ActionType.CALL in valid_actions:
                 return Action(ActionType.CALL)
             return Action(ActionType.CHECK)
@@ -0,0 +1,30 @@
+from .pokerstars import (
+    Hand,
+    HandAction,
+    MalformedHand,
+    parse_hands,
+    parse_file,
+    open_hand_history,
+    hand_history_files
+)
+from .store import HandStore, build_store, load_store, merge_stores
+from .ingest import IngestResult, ingest_folder
+from .index import HandIndex, build_index
+
+__all__ = [
+    'Hand',
+    'HandAction',
+    'MalformedHand',
+    'parse_hands',
+    'parse_file',
+    'open_hand_history',
+    'hand_history_files',
+    'HandStore',
+    'build_store',
+    'load_store',
+    'merge_stores',
+    'IngestResult',
+    'ingest_folder',
+    'HandIndex',
+    'build_index'
+]
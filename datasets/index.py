@@ -0,0 +1,335 @@
+'''
+Random-access index of the hands of a folder of hand histories.
+
+The index records where every hand starts and how many bytes it takes in its
+file, so a hand is read with a seek and parsed alone. Next to them it keeps
+the secondary keys hands are looked up by: hand id, street reached, pot size
+bucket and, for every player of the hand, the player, its position and the
+last street it reached before folding.
+
+The index lives next to the data, in a .hand_index folder inside the folder
+of the hand histories, with one .npz file per hand history and an
+index.json with the size and modification time of each. Building it again
+only parses the files that changed, and then merges the indexes of every
+file into index.npz, the only file queries load. Offsets of gzip compressed files are
+positions in the decompressed data, so reading them decompresses up to the
+hand.
+
+Usage: python -m datasets.index [folder]
+'''
+import io
+import json
+import os
+from bisect import bisect_right
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from game_objects import ActionType, GamePhase
+
+from .pokerstars import Hand, hand_history_files, open_hand_history, parse_file, parse_hands
+
+INDEX_FOLDER = '.hand_index'
+INDEX_FILE = 'index.json'
+MERGED_FILE = 'index.npz'
+
+# Positions from the small blind to the button, for 6 players. Smaller
+# tables drop the early positions first
+POSITIONS = ('SB', 'BB', 'UTG', 'MP', 'CO', 'BTN')
+# Lower bounds of the pot size buckets, in big blinds
+POT_BUCKETS = (0, 5, 10, 20, 50, 100)
+# Columns of the merged index, per hand and then per player of every hand
+_COLUMNS = (
+    'hand_id', 'source', 'offset', 'length', 'street', 'pot_bucket',
+    'player_hand', 'player', 'position', 'player_street'
+)
+# Street reached by a hand with a board of every length
+_BOARD_STREETS = {
+    0: GamePhase.PRE_FLOP.value,
+    3: GamePhase.FLOP.value,
+    4: GamePhase.TURN.value,
+    5: GamePhase.RIVER.value
+}
+
+
+def positions(n_players: int) -> tuple[str, ...]:
+    '''Return the positions of a table with some players, from the seat
+    after the button to the button.'''
+    if n_players == 2:
+        # The button posts the small blind heads-up
+        return ('BB', 'BTN')
+    return POSITIONS[:2] + POSITIONS[2:-1][len(POSITIONS) - n_players:] + POSITIONS[-1:]
+
+
+def pot_bucket(pot: float, big_blind: int) -> int:
+    '''Return the index in POT_BUCKETS of the bucket of a pot.'''
+    return bisect_right(POT_BUCKETS, pot / big_blind) - 1
+
+
+def _index_hands(hands: Iterable[Hand]) -> dict[str, np.ndarray]:
+    '''Return the index columns of the hands of a file.'''
+    columns = {name: [] for name in (
+        'hand_id', 'offset', 'street', 'pot_bucket',
+        'player_hand', 'player', 'position', 'player_street'
+    )}
+    names = {}
+    for row, hand in enumerate(hands):
+        street = _BOARD_STREETS[len(hand.board)]
+        folded = {}
+        for action in hand.actions:
+            if action.action_type is ActionType.FOLD:
+                folded[action.player] = action.street.value
+            elif action.street is GamePhase.SHOWDOWN:
+                street = GamePhase.SHOWDOWN.value
+        columns['hand_id'].append(hand.hand_id)
+        columns['offset'].append(hand.offset)
+        columns['street'].append(street)
+        columns['pot_bucket'].append(pot_bucket(hand.total_pot, hand.big_blind))
+
+        # Seats from the one after the button
+        n_players = len(hand.players)
+        first = next((i for i, seat in enumerate(hand.seats) if seat > hand.button), 0)
+        for position, i in zip(positions(n_players), range(first, first + n_players)):
+            name = hand.players[i % n_players]
+            columns['player_hand'].append(row)
+            columns['player'].append(names.setdefault(name, len(names)))
+            columns['position'].append(POSITIONS.index(position))
+            columns['player_street'].append(folded.get(name, street))
+
+    offsets = columns['offset']
+    arrays = {
+        'hand_id': np.array(columns['hand_id'], dtype=np.int64),
+        'offset': np.array(offsets, dtype=np.int64),
+        # The last hand runs to the end of the file
+        'length': np.append(np.diff(np.array(offsets, dtype=np.int64)), -1),
+        'street': np.array(columns['street'], dtype=np.int8),
+        'pot_bucket': np.array(columns['pot_bucket'], dtype=np.int8),
+        'player_hand': np.array(columns['player_hand'], dtype=np.int32),
+        'player': np.array(columns['player'], dtype=np.int32),
+        'position': np.array(columns['position'], dtype=np.int8),
+        'player_street': np.array(columns['player_street'], dtype=np.int8),
+        'names': np.array(list(names), dtype=str)
+    }
+    return arrays
+
+
+def build_index(folder: str, *, verbose: bool = False) -> list[str]:
+    '''
+    Bring the index of a folder of hand histories up to date, indexing only
+    the files that are new or changed.
+    Args:
+        folder (str): The folder of the hand history files.
+        verbose (bool): Whether to print the files indexed.
+
+    Returns:
+        list[str]: The names of the files indexed.
+    '''
+    index_folder = os.path.join(folder, INDEX_FOLDER)
+    os.makedirs(index_folder, exist_ok=True)
+    meta_path = os.path.join(index_folder, INDEX_FILE)
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path) as file:
+            meta = json.load(file)
+
+    names = [os.path.basename(path) for path in hand_history_files(folder)]
+    removed = set(meta) - set(names)
+    for name in removed:
+        del meta[name]
+        os.remove(os.path.join(index_folder, f'{name}.npz'))
+    indexed = []
+    for name in names:
+        path = os.path.join(folder, name)
+        stat = os.stat(path)
+        if meta.get(name) == {'size': stat.st_size, 'mtime': stat.st_mtime_ns}:
+            continue
+        if verbose:
+            print(f'Indexing {path}')
+        np.savez_compressed(os.path.join(index_folder, f'{name}.npz'), **_index_hands(parse_file(path)))
+        meta[name] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+        indexed.append(name)
+
+    merged_path = os.path.join(index_folder, MERGED_FILE)
+    if indexed or removed or not os.path.exists(merged_path):
+        _merge(index_folder, names, merged_path)
+    partial = meta_path + '.partial'
+    with open(partial, 'w') as file:
+        json.dump(meta, file, indent=1)
+    os.replace(partial, meta_path)
+    return indexed
+
+
+def _merge(index_folder: str, names: list[str], path: str) -> None:
+    '''Write the index of every file, in order, as a single index.'''
+    player_ids = {}
+    parts = {column: [] for column in _COLUMNS}
+    hands = 0
+    for i, name in enumerate(names):
+        with np.load(os.path.join(index_folder, f'{name}.npz')) as data:
+            columns = dict(data)
+        ids = np.array([player_ids.setdefault(player, len(player_ids)) for player in columns.pop('names')], dtype=np.int32)
+        columns['player'] = ids[columns['player']] if len(ids) else columns['player']
+        columns['player_hand'] = columns['player_hand'] + hands
+        columns['source'] = np.full(len(columns['hand_id']), i, dtype=np.int32)
+        for column, values in parts.items():
+            values.append(columns[column])
+        hands += len(columns['hand_id'])
+    merged = {
+        column: np.concatenate(values) if values else np.zeros(0, dtype=np.int64)
+        for column, values in parts.items()
+    }
+    partial = path + '.partial.npz'
+    np.savez(
+        partial,
+        files=np.array(names, dtype=str),
+        players=np.array(list(player_ids), dtype=str),
+        **merged
+    )
+    os.replace(partial, path)
+
+
+class HandIndex:
+    '''
+    The index of a folder of hand histories, loaded in memory. Hands are
+    referred to by their row, in file order.
+    Args:
+        folder (str): The folder of the hand history files.
+        update (bool): Whether to bring the index up to date first.
+    '''
+    def __init__(self, folder: str, update: bool = True):
+        if update:
+            build_index(folder)
+        self.folder = folder
+        with np.load(os.path.join(folder, INDEX_FOLDER, MERGED_FILE)) as data:
+            self.files: list[str] = data['files'].tolist()
+            self.players: list[str] = data['players'].tolist()
+            for column in _COLUMNS:
+                setattr(self, column, data[column])
+        self._player_ids = {player: i for i, player in enumerate(self.players)}
+        self._rows = {hand_id: row for row, hand_id in enumerate(self.hand_id.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.hand_id)
+
+    def query(
+        self,
+        *,
+        hand_id: int | None = None,
+        players: Iterable[str] = (),
+        positions: dict[str, str] | None = None,
+        street: GamePhase | None = None,
+        pot_bucket: int | None = None
+    ) -> np.ndarray:
+        '''
+        Find the hands matching every given condition.
+        Args:
+            hand_id (int | None): The id of the hand.
+            players (Iterable[str]): Players that must be in the hand and,
+                with street, reach it without folding.
+            positions (dict[str, str] | None): The position of some players,
+                from POSITIONS.
+            street (GamePhase | None): The street the hand, and the players,
+                must reach.
+            pot_bucket (int | None): The index in POT_BUCKETS of the bucket
+                of the final pot.
+
+        Returns:
+            np.ndarray: The rows of the hands, in file order.
+        '''
+        match = np.ones(len(self), dtype=bool)
+        if hand_id is not None:
+            match[:] = False
+            if hand_id in self._rows:
+                match[self._rows[hand_id]] = True
+        if street is not None:
+            match &= self.street >= street.value
+        if pot_bucket is not None:
+            match &= self.pot_bucket == pot_bucket
+        conditions = {player: None for player in players}
+        conditions.update(positions or {})
+        for player, position in conditions.items():
+            if player not in self._player_ids:
+                return np.zeros(0, dtype=np.int64)
+            rows = self.player == self._player_ids[player]
+            if street is not None:
+                rows &= self.player_street >= street.value
+            if position is not None:
+                rows &= self.position == POSITIONS.index(position)
+            found = np.zeros(len(self), dtype=bool)
+            found[self.player_hand[rows]] = True
+            match &= found
+        return np.flatnonzero(match)
+
+    def hands(self, rows: Iterable[int]) -> Iterator[Hand]:
+        '''Read and parse the hands of some rows, seeking straight to each
+        of them.'''
+        rows = sorted(rows, key=lambda row: (self.source[row], self.offset[row]))
+        file = None
+        current = None
+        try:
+            for row in rows:
+                if self.source[row] != current:
+                    if file is not None:
+                        file.close()
+                    current = self.source[row]
+                    path = os.path.join(self.folder, self.files[current])
+                    file = open_hand_history(path)
+                offset = int(self.offset[row])
+                file.seek(offset)
+                data = file.read(int(self.length[row]))
+                for hand in parse_hands(io.BytesIO(data), path):
+                    yield hand._replace(offset=offset)
+        finally:
+            if file is not None:
+                file.close()
+
+    def get(self, hand_id: int) -> Hand:
+        '''Return the hand with an id.'''
+        if hand_id not in self._rows:
+            raise KeyError(f'Hand #{hand_id} is not in the index.')
+        return next(self.hands([self._rows[hand_id]]))
+
+
+if __name__ == '__main__':
+    # Index the corpus and time a few lookups against parsing every file
+    import sys
+    import time
+
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), 'full_datasets')
+    start = time.perf_counter()
+    indexed = build_index(folder)
+    print(f'Indexed {len(indexed)} files in {time.perf_counter() - start:.2f}s')
+
+    start = time.perf_counter()
+    index = HandIndex(folder)
+    print(f'Loaded the index of {len(index)} hands in {(time.perf_counter() - start) * 1000:.1f}ms')
+    size = sum(os.path.getsize(os.path.join(folder, INDEX_FOLDER, name)) for name in os.listdir(os.path.join(folder, INDEX_FOLDER)))
+    print(f'Index size: {size / 1024:.0f} KiB')
+
+    start = time.perf_counter()
+    hand = index.get(100000)
+    print(f'Hand #{hand.hand_id} read in {(time.perf_counter() - start) * 1000:.2f}ms')
+
+    start = time.perf_counter()
+    rows = index.query(players=('Pluribus', 'MrBlue'), street=GamePhase.FLOP)
+    found = list(index.hands(rows))
+    elapsed = time.perf_counter() - start
+    print(f'{len(found)} hands where Pluribus saw a flop against MrBlue, read in {elapsed * 1000:.1f}ms')
+
+    start = time.perf_counter()
+    expected = [
+        hand
+        for path in hand_history_files(folder)
+        for hand in parse_file(path)
+        if hand.board and all(
+            player in hand.players and not any(
+                action.player == player
+                and action.action_type is ActionType.FOLD
+                and action.street is GamePhase.PRE_FLOP
+                for action in hand.actions
+            )
+            for player in ('Pluribus', 'MrBlue')
+        )
+    ]
+    elapsed = time.perf_counter() - start
+    print(f'{len(expected)} found by parsing every file in {elapsed * 1000:.1f}ms, same hands: {expected == found}')
@@ -0,0 +1,205 @@
+'''
+Incremental ingestion of a folder of hand histories into stores.
+
+Every hand history file is parsed into its own shard, a store under
+shards/, by a pool of processes. A manifest keeps the size, modification
+time and content hash of every file, so later runs only parse the files
+that are new or changed, drop the shards of files that were removed, and
+then merge the shards into a single store. Files whose size and
+modification time did not change are not even read, and files that were
+only touched are hashed but not parsed again. The shards and hashes the
+merged store was built from are kept apart from the manifest, so a run
+interrupted before the merge is merged by the next one.
+
+Output folder layout:
+    manifest.json: The manifest, keyed by the path of every file.
+    merged.json: The shard and hash of every file in the merged store.
+    shards/<file name>/: The store of every file.
+    store/: The merged store of every shard, in file order.
+
+Usage: python -m datasets.ingest [folder output [workers]]
+'''
+import hashlib
+import json
+import os
+import shutil
+from multiprocessing import Pool
+from typing import NamedTuple
+
+from .pokerstars import MalformedHand, hand_history_files, parse_file
+from .store import build_store, merge_stores
+
+MANIFEST_FILE = 'manifest.json'
+MERGED_FILE = 'merged.json'
+SHARDS_FOLDER = 'shards'
+STORE_FOLDER = 'store'
+
+
+class IngestResult(NamedTuple):
+    '''What a call to ingest_folder did.'''
+    files: int
+    parsed: list[str]
+    removed: list[str]
+    hands: int
+    malformed: list[MalformedHand]
+
+
+def file_hash(path: str) -> str:
+    '''Return the BLAKE2 hash of the contents of a file.'''
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as file:
+        while chunk := file.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _ingest_file(task: tuple[str, str, str | None]) -> tuple[str, str, int | None, list[MalformedHand]]:
+    '''Hash a file and parse it into its shard unless the hash is the one in
+    the manifest. Returns the hash, and the number of hands and the
+    malformed hands if it was parsed.'''
+    path, shard, known_hash = task
+    content_hash = file_hash(path)
+    if content_hash == known_hash and os.path.isdir(shard):
+        return path, content_hash, None, []
+    errors = []
+    # The old shard stays valid until the new one is complete
+    partial = shard + '.partial'
+    shutil.rmtree(partial, ignore_errors=True)
+    hands = build_store(parse_file(path, errors), partial)
+    shutil.rmtree(shard, ignore_errors=True)
+    os.replace(partial, shard)
+    return path, content_hash, hands, errors
+
+
+def _save_manifest(path: str, manifest: dict) -> None:
+    partial = path + '.partial'
+    with open(partial, 'w') as file:
+        json.dump(manifest, file, indent=1)
+    os.replace(partial, path)
+
+
+def ingest_folder(
+    folder: str,
+    output: str,
+    *,
+    workers: int | None = None,
+    verbose: bool = False
+) -> IngestResult:
+    '''
+    Bring the stores of a folder of hand histories up to date.
+    Args:
+        folder (str): The folder of the hand history files, plain or gzip
+            compressed.
+        output (str): The folder of the manifest, the shards and the merged
+            store.
+        workers (int | None): The number of processes, one per core if not
+            provided.
+        verbose (bool): Whether to print the progress.
+
+    Returns:
+        IngestResult: The number of files, the files parsed and removed,
+            the hands in the merged store and the malformed hands of the
+            files parsed.
+    '''
+    manifest_path = os.path.join(output, MANIFEST_FILE)
+    shards = os.path.join(output, SHARDS_FOLDER)
+    os.makedirs(shards, exist_ok=True)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+
+    paths = hand_history_files(folder)
+    removed = sorted(set(manifest) - set(paths))
+    for path in removed:
+        shutil.rmtree(os.path.join(shards, manifest.pop(path)['shard']), ignore_errors=True)
+
+    tasks = []
+    stats = {}
+    for path in paths:
+        stat = os.stat(path)
+        stats[path] = stat
+        entry = manifest.get(path)
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+            continue
+        shard = entry['shard'] if entry else os.path.basename(path)
+        tasks.append((path, os.path.join(shards, shard), entry and entry['hash']))
+
+    parsed = []
+    malformed = []
+    if tasks:
+        with Pool(min(workers or os.cpu_count(), len(tasks))) as pool:
+            for done, (path, content_hash, hands, errors) in enumerate(pool.imap_unordered(_ingest_file, tasks), 1):
+                entry = manifest.setdefault(path, {'shard': os.path.basename(path)})
+                entry['size'] = stats[path].st_size
+                entry['mtime'] = stats[path].st_mtime_ns
+                entry['hash'] = content_hash
+                if hands is not None:
+                    entry['hands'] = hands
+                    entry['malformed'] = len(errors)
+                    parsed.append(path)
+                    malformed.extend(errors)
+                # Saved after every file, so an interrupted run keeps its work
+                _save_manifest(manifest_path, manifest)
+                if verbose:
+                    print(f'{done}/{len(tasks)} {path}: {"parsed" if hands is not None else "unchanged"}')
+    elif removed:
+        _save_manifest(manifest_path, manifest)
+
+    store = os.path.join(output, STORE_FOLDER)
+    merged_path = os.path.join(output, MERGED_FILE)
+    merged = [[manifest[path]['shard'], manifest[path]['hash']] for path in paths]
+    previous = None
+    if os.path.exists(merged_path):
+        with open(merged_path) as file:
+            previous = json.load(file)
+    if merged != previous or not os.path.isdir(store):
+        hands = merge_stores([os.path.join(shards, shard) for shard, _ in merged], store)
+        _save_manifest(merged_path, merged)
+    else:
+        hands = sum(manifest[path]['hands'] for path in paths)
+    return IngestResult(len(paths), sorted(parsed), removed, hands, malformed)
+
+
+if __name__ == '__main__':
+    # Ingest a folder, or without arguments time a full ingestion of a copy
+    # of the corpus, a run with nothing to do and runs after one file
+    # changes
+    import sys
+    import tempfile
+    import time
+
+    if len(sys.argv) > 2:
+        result = ingest_folder(
+            sys.argv[1],
+            sys.argv[2],
+            workers=int(sys.argv[3]) if len(sys.argv) > 3 else None,
+            verbose=True
+        )
+        print(f'{len(result.parsed)}/{result.files} files parsed, {result.hands} hands, {len(result.malformed)} malformed')
+        sys.exit()
+
+    with tempfile.TemporaryDirectory() as temporary:
+        corpus = os.path.join(temporary, 'corpus')
+        output = os.path.join(temporary, 'ingested')
+        shutil.copytree(os.path.join(os.path.dirname(__file__), 'full_datasets'), corpus)
+
+        def timed(label: str) -> None:
+            start = time.perf_counter()
+            result = ingest_folder(corpus, output)
+            elapsed = time.perf_counter() - start
+            print(
+                f'{label}: {len(result.parsed)}/{result.files} files parsed, '
+                f'{result.hands} hands, {len(result.malformed)} malformed in {elapsed:.2f}s'
+            )
+
+        timed('Full')
+        timed('Unchanged')
+        changed = hand_history_files(corpus)[0]
+        with open(changed, 'ab') as file:
+            file.write(b'\r\n')
+        timed('One file changed')
+        os.utime(changed)
+        timed('One file touched')
+        os.remove(changed)
+        timed('One file removed')
@@ -0,0 +1,341 @@
+'''
+Streaming parser of PokerStars hand histories.
+
+Files are read line by line in a single pass, holding only the lines of the
+hand being parsed, and every hand is turned into a Hand record with typed
+fields: Card objects, GamePhase streets and ActionType actions. A small state
+machine follows the sections of the hand (seats, blinds, the streets, the
+showdown and the summary). Hands that cannot be parsed are reported as
+MalformedHand and skipped, the rest of the file is still parsed. Gzip
+compressed files are read transparently.
+
+Usage: python -m datasets.pokerstars [files or folders]
+'''
+import gzip
+import io
+import itertools
+import os
+import re
+import sys
+from datetime import datetime
+from typing import BinaryIO, Iterable, Iterator, NamedTuple
+
+from game_objects import ActionType, Card, GamePhase
+
+HAND_PREFIX = b'PokerStars Hand #'
+
+_CARDS = {
+    rank + suit: Card.from_index(s * 13 + r)
+    for s, suit in enumerate('shdc')
+    for r, rank in enumerate('23456789TJQKA')
+}
+_STREETS = {
+    'FLOP': GamePhase.FLOP,
+    'TURN': GamePhase.TURN,
+    'RIVER': GamePhase.RIVER,
+    'SHOWDOWN': GamePhase.SHOWDOWN
+}
+_HEADER = re.compile(
+    r"PokerStars Hand #(\d+): +Hold'em No Limit \((\d+)/(\d+)\) - "
+    r'(\d{4})/(\d\d)/(\d\d) (\d\d?):(\d\d):(\d\d)'
+)
+_TABLE = re.compile(r"Table '(.*)' (\d+)-max .*Seat #(\d+) is the button")
+
+# Sections of a hand
+_SEATS, _STREET, _SUMMARY = range(3)
+
+
+class HandAction(NamedTuple):
+    '''
+    An action of a player. Bets are raises, as in Game. amount is the money
+    the action put in the pot and total the bet of the player on the street
+    after it.
+    '''
+    street: GamePhase
+    player: str
+    action_type: ActionType
+    amount: int = 0
+    total: int = 0
+    all_in: bool = False
+
+
+class Hand(NamedTuple):
+    '''
+    A parsed hand. Players, seats, stacks and hole cards are in seat order,
+    and hole cards are None for players whose cards were not dealt or shown.
+    '''
+    hand_id: int
+    timestamp: datetime
+    table: str
+    max_seats: int
+    button: int
+    small_blind: int
+    big_blind: int
+    seats: tuple[int, ...]
+    players: tuple[str, ...]
+    stacks: tuple[int, ...]
+    hole_cards: tuple[tuple[Card, Card] | None, ...]
+    posts: tuple[tuple[str, int], ...]
+    actions: tuple[HandAction, ...]
+    board: tuple[Card, ...]
+    returned: tuple[tuple[str, int], ...]
+    collected: tuple[tuple[str, float], ...]
+    total_pot: int
+    rake: int
+    source: str
+    offset: int
+
+
+class MalformedHand(NamedTuple):
+    '''A hand that could not be parsed, and where it starts.'''
+    source: str
+    line: int
+    offset: int
+    hand_id: int | None
+    message: str
+
+
+def _cards(text: str) -> tuple[Card, ...]:
+    '''Return the cards between the last pair of brackets.'''
+    return tuple(_CARDS[card] for card in text[text.rindex('[') + 1:text.rindex(']')].split())
+
+
+def _parse_hand(lines: list[str], source: str, offset: int) -> Hand:
+    header = _HEADER.match(lines[0])
+    if header is None:
+        raise ValueError('Unrecognized hand header')
+    hand_id, small_blind, big_blind, *date = map(int, header.groups())
+    table = _TABLE.match(lines[1])
+    if table is None:
+        raise ValueError('Unrecognized table line')
+
+    seats, players, stacks = [], [], []
+    holes = {}
+    posts, actions, board, returned, collected = [], [], [], [], []
+    # Bets of every player on the current street
+    bets = {}
+    total_pot = rake = None
+    section = _SEATS
+    street = GamePhase.PRE_FLOP
+    for line in lines[2:]:
+        # Actions are the most common lines, so they are tried first
+        name, separator, move = line.partition(': ')
+        if separator and name in bets:
+            all_in = move.endswith(' and is all-in')
+            if all_in:
+                move = move[:-14]
+            verb, _, rest = move.partition(' ')
+            if verb == 'folds':
+                action = HandAction(street, name, ActionType.FOLD, 0, bets[name])
+            elif verb == 'checks':
+                action = HandAction(street, name, ActionType.CHECK, 0, bets[name])
+            elif verb == 'calls':
+                amount = int(rest)
+                bets[name] += amount
+                action = HandAction(street, name, ActionType.CALL, amount, bets[name], all_in)
+            elif verb == 'raises':
+                total = int(rest.rpartition(' to ')[2])
+                action = HandAction(street, name, ActionType.RAISE, total - bets[name], total, all_in)
+                bets[name] = total
+            elif verb == 'bets':
+                amount = int(rest)
+                bets[name] += amount
+                action = HandAction(street, name, ActionType.RAISE, amount, bets[name], all_in)
+            elif verb == 'posts':
+                amount = int(rest.rsplit(' ', 1)[1])
+                bets[name] += amount
+                posts.append((name, amount))
+                continue
+            elif verb == 'shows':
+                holes[name] = _cards(rest)
+                action = HandAction(street, name, ActionType.SHOW)
+            elif verb == 'mucks' or move == "doesn't show hand":
+                action = HandAction(street, name, ActionType.MUCK)
+            else:
+                raise ValueError(f'Unrecognized action: {line!r}')
+            actions.append(action)
+            continue
+
+        if not line:
+            continue
+        if line.startswith('*** '):
+            name = line[4:line.index(' ***')]
+            if name == 'SUMMARY':
+                section = _SUMMARY
+            elif name == 'HOLE CARDS':
+                section = _STREET
+            elif section == _STREET:
+                street = _STREETS[name]
+                bets = dict.fromkeys(bets, 0)
+                if street is not GamePhase.SHOWDOWN:
+                    board.extend(_cards(line))
+            else:
+                raise ValueError(f'Unexpected {name} section')
+        elif section == _SUMMARY:
+            if line.startswith('Total pot '):
+                pot, _, rake = line[10:].partition(' | Rake ')
+                total_pot = int(pot)
+                rake = int(rake)
+            elif line.startswith('Board '):
+                if _cards(line) != tuple(board):
+                    raise ValueError('Summary board does not match the streets')
+            # Seat lines repeat the showdown
+        elif line.startswith('Dealt to '):
+            holes[line[9:line.index(' [')]] = _cards(line)
+        elif section == _SEATS and line.startswith('Seat '):
+            seat, _, rest = line[5:].partition(': ')
+            name, _, chips = rest.rpartition(' (')
+            seats.append(int(seat))
+            players.append(name)
+            stacks.append(int(chips.split(' ', 1)[0]))
+            bets[name] = 0
+        elif line.startswith('Uncalled bet ('):
+            amount, _, name = line[14:].partition(') returned to ')
+            returned.append((name, int(amount)))
+        elif line.endswith(' from pot'):
+            name, _, amount = line[:-9].rpartition(' collected ')
+            collected.append((name, float(amount)))
+        else:
+            raise ValueError(f'Unrecognized line: {line!r}')
+
+    if total_pot is None:
+        raise ValueError('Missing summary')
+    put_in = sum(amount for _, amount in posts) + sum(action.amount for action in actions)
+    if put_in - sum(amount for _, amount in returned) != total_pot:
+        raise ValueError('Bets do not add up to the total pot')
+    return Hand(
+        hand_id,
+        datetime(*date),
+        table.group(1),
+        int(table.group(2)),
+        int(table.group(3)),
+        small_blind,
+        big_blind,
+        tuple(seats),
+        tuple(players),
+        tuple(stacks),
+        tuple(holes.get(name) for name in players),
+        tuple(posts),
+        tuple(actions),
+        tuple(board),
+        tuple(returned),
+        tuple(collected),
+        total_pot,
+        rake,
+        source,
+        offset
+    )
+
+
+def parse_hands(
+    stream: Iterable[bytes],
+    source: str = '<stream>',
+    errors: list[MalformedHand] | None = None
+) -> Iterator[Hand]:
+    '''
+    Parse the hands of a hand history.
+    Args:
+        stream (Iterable[bytes]): The lines of the hand history, such as a
+            file opened in binary mode.
+        source (str): The name of the hand history in the records.
+        errors (list[MalformedHand] | None): The list to report the hands
+            that could not be parsed to, printed if not provided.
+
+    Yields:
+        Hand: Every hand that could be parsed, in order.
+    '''
+    # Raw lines of the current hand, decoded together once it is complete
+    lines = []
+    start = offset = 0
+    start_line = 0
+    for number, raw in enumerate(itertools.chain(stream, (HAND_PREFIX,)), 1):
+        if raw.startswith(HAND_PREFIX):
+            if lines:
+                try:
+                    yield _parse_hand(b''.join(lines).decode().splitlines(), source, start)
+                except (ValueError, KeyError, IndexError) as error:
+                    # UnicodeDecodeError is a ValueError, so the header may
+                    # not decode either
+                    header = _HEADER.match(lines[0].decode(errors='replace'))
+                    malformed = MalformedHand(
+                        source,
+                        start_line,
+                        start,
+                        int(header.group(1)) if header else None,
+                        str(error)
+                    )
+                    if errors is None:
+                        print(f'Malformed hand at {source}:{start_line}: {malformed.message}', file=sys.stderr)
+                    else:
+                        errors.append(malformed)
+            lines = [raw]
+            start = offset
+            start_line = number
+        elif lines:
+            lines.append(raw)
+        offset += len(raw)
+
+
+def open_hand_history(path: str) -> BinaryIO:
+    '''Open a hand history in binary mode, decompressing it if it is gzip
+    compressed.'''
+    file = open(path, 'rb')
+    if file.peek(2)[:2] == b'\x1f\x8b':
+        # GzipFile reads lines slowly on its own
+        return io.BufferedReader(gzip.GzipFile(fileobj=file), 1 << 16)
+    return file
+
+
+def parse_file(path: str, errors: list[MalformedHand] | None = None) -> Iterator[Hand]:
+    '''
+    Parse the hands of a hand history file, plain or gzip compressed.
+    Args:
+        path (str): The path of the file.
+        errors (list[MalformedHand] | None): The list to report the hands
+            that could not be parsed to, printed if not provided.
+
+    Yields:
+        Hand: Every hand that could be parsed, in order.
+    '''
+    with open_hand_history(path) as file:
+        yield from parse_hands(file, path, errors)
+
+
+def hand_history_files(folder: str) -> list[str]:
+    '''Return the hand history files of a folder, plain or gzip compressed,
+    sorted by name.'''
+    return sorted(
+        os.path.join(folder, name)
+        for name in os.listdir(folder)
+        if name.endswith(('.txt', '.txt.gz'))
+    )
+
+
+if __name__ == '__main__':
+    # Throughput over the corpus, plain and compressed
+    import tempfile
+    import time
+
+    paths = []
+    for argument in sys.argv[1:] or [os.path.join(os.path.dirname(__file__), 'full_datasets')]:
+        paths.extend(hand_history_files(argument) if os.path.isdir(argument) else [argument])
+
+    errors = []
+    start = time.perf_counter()
+    n_hands = sum(1 for path in paths for _ in parse_file(path, errors))
+    elapsed = time.perf_counter() - start
+    print(f'{n_hands} hands from {len(paths)} files in {elapsed:.2f}s ({n_hands / elapsed:,.0f} hands/s)')
+    print(f'{len(errors)} malformed hands')
+    for error in errors[:10]:
+        print(f'  {error.source}:{error.line}: {error.message}')
+
+    with tempfile.TemporaryDirectory() as folder:
+        compressed = []
+        for path in paths:
+            compressed.append(os.path.join(folder, os.path.basename(path) + '.gz'))
+            with open(path, 'rb') as source, gzip.open(compressed[-1], 'wb') as target:
+                target.write(source.read())
+        start = time.perf_counter()
+        n_compressed = sum(1 for path in compressed for _ in parse_file(path, []))
+        elapsed = time.perf_counter() - start
+        print(f'{n_compressed} hands from gzip in {elapsed:.2f}s ({n_compressed / elapsed:,.0f} hands/s)')
@@ -0,0 +1,375 @@
+'''
+Columnar store of parsed hands, memory-mapped on load.
+
+A store is a folder of .npy files, one per column, and a meta.json with the
+strings the columns refer to (players, tables and sources). Loading maps
+every column with np.load(mmap_mode='r'), so nothing is parsed and only the
+pages that are read are loaded from disk.
+
+There are three kinds of columns:
+    hand_*: One row per hand.
+    seat_*: One row per player of every hand, in seat order. The seats of
+        hand i are rows seat_start[i]:seat_start[i + 1].
+    action_*: One row per action of every hand, in order. The actions of
+        hand i are rows action_start[i]:action_start[i + 1].
+Cards are stored by index (suit * 13 + rank) and missing cards as -1.
+
+Usage: python -m datasets.store [store folder]
+'''
+import json
+import os
+from array import array
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from game_objects import ActionType, Card, GamePhase
+
+from .pokerstars import Hand, HandAction
+
+META_FILE = 'meta.json'
+
+# Columns and their types
+HAND_COLUMNS = {
+    'hand_id': np.int64,
+    'hand_timestamp': 'datetime64[s]',
+    'hand_table': np.int32,
+    'hand_max_seats': np.int8,
+    'hand_button': np.int8,
+    'hand_small_blind': np.int32,
+    'hand_big_blind': np.int32,
+    'hand_board': np.int8,
+    'hand_total_pot': np.int32,
+    'hand_rake': np.int32,
+    'hand_source': np.int32,
+    'hand_offset': np.int64,
+    'seat_start': np.int64,
+    'action_start': np.int64
+}
+SEAT_COLUMNS = {
+    'seat_number': np.int8,
+    'seat_player': np.int32,
+    'seat_stack': np.int32,
+    'seat_hole_cards': np.int8,
+    'seat_posted': np.int32,
+    'seat_returned': np.int32,
+    'seat_collected': np.float64
+}
+ACTION_COLUMNS = {
+    'action_street': np.int8,
+    'action_seat': np.int8,
+    'action_type': np.int8,
+    'action_amount': np.int32,
+    'action_total': np.int32,
+    'action_all_in': np.bool_
+}
+# Columns with more than one value per row
+_WIDTHS = {'hand_board': 5, 'seat_hole_cards': 2}
+
+# Timestamps are stored as seconds since the epoch, without a time zone
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+
+_phases = {phase.value: phase for phase in GamePhase}
+_action_types = {action_type.value: action_type for action_type in ActionType}
+
+
+class _Strings:
+    '''Ids of the strings of a column, in order of appearance.'''
+    def __init__(self):
+        self.strings = []
+        self.ids = {}
+
+    def __call__(self, string: str) -> int:
+        if string not in self.ids:
+            self.ids[string] = len(self.strings)
+            self.strings.append(string)
+        return self.ids[string]
+
+
+def build_store(hands: Iterable[Hand], path: str) -> int:
+    '''
+    Write hands to a store, replacing the one at path if there is one.
+    Args:
+        hands (Iterable[Hand]): The hands, such as the ones from
+            datasets.parse_file.
+        path (str): The folder of the store.
+
+    Returns:
+        int: The number of hands written.
+    '''
+    # Columns are filled as flat arrays, so memory grows with the number of
+    # values and not of Python objects
+    columns = {
+        name: array('d' if name == 'seat_collected' else 'q')
+        for name in (*HAND_COLUMNS, *SEAT_COLUMNS, *ACTION_COLUMNS)
+    }
+    players, tables, sources = _Strings(), _Strings(), _Strings()
+    seat_start = columns['seat_start']
+    action_start = columns['action_start']
+    seat_start.append(0)
+    action_start.append(0)
+    for hand in hands:
+        columns['hand_id'].append(hand.hand_id)
+        columns['hand_timestamp'].append((hand.timestamp - _EPOCH) // _SECOND)
+        columns['hand_table'].append(tables(hand.table))
+        columns['hand_max_seats'].append(hand.max_seats)
+        columns['hand_button'].append(hand.button)
+        columns['hand_small_blind'].append(hand.small_blind)
+        columns['hand_big_blind'].append(hand.big_blind)
+        columns['hand_board'].extend([card.index for card in hand.board] + [-1] * (5 - len(hand.board)))
+        columns['hand_total_pot'].append(hand.total_pot)
+        columns['hand_rake'].append(hand.rake)
+        columns['hand_source'].append(sources(hand.source))
+        columns['hand_offset'].append(hand.offset)
+
+        seats = {name: i for i, name in enumerate(hand.players)}
+        posted = [0] * len(seats)
+        returned = [0] * len(seats)
+        collected = [0.0] * len(seats)
+        for name, amount in hand.posts:
+            posted[seats[name]] += amount
+        for name, amount in hand.returned:
+            returned[seats[name]] += amount
+        for name, amount in hand.collected:
+            collected[seats[name]] += amount
+        columns['seat_number'].extend(hand.seats)
+        columns['seat_player'].extend(map(players, hand.players))
+        columns['seat_stack'].extend(hand.stacks)
+        for cards in hand.hole_cards:
+            columns['seat_hole_cards'].extend((-1, -1) if cards is None else [card.index for card in cards])
+        columns['seat_posted'].extend(posted)
+        columns['seat_returned'].extend(returned)
+        columns['seat_collected'].extend(collected)
+        seat_start.append(seat_start[-1] + len(seats))
+
+        for action in hand.actions:
+            columns['action_street'].append(action.street.value)
+            columns['action_seat'].append(seats[action.player])
+            columns['action_type'].append(action.action_type.value)
+            columns['action_amount'].append(action.amount)
+            columns['action_total'].append(action.total)
+            columns['action_all_in'].append(action.all_in)
+        action_start.append(action_start[-1] + len(hand.actions))
+
+    arrays = {
+        name: np.frombuffer(values, dtype=values.typecode)
+        for name, values in columns.items()
+    }
+    _write_store(path, arrays, players.strings, tables.strings, sources.strings)
+    return len(columns['hand_id'])
+
+
+def _write_store(
+    path: str,
+    columns: dict[str, np.ndarray],
+    players: list[str],
+    tables: list[str],
+    sources: list[str]
+) -> None:
+    os.makedirs(path, exist_ok=True)
+    # Without meta.json the folder is not a store, so it goes last and is
+    # removed first
+    if os.path.exists(os.path.join(path, META_FILE)):
+        os.remove(os.path.join(path, META_FILE))
+    for name, dtype in (HAND_COLUMNS | SEAT_COLUMNS | ACTION_COLUMNS).items():
+        values = columns[name].astype(dtype)
+        if name in _WIDTHS:
+            values = values.reshape(-1, _WIDTHS[name])
+        np.save(os.path.join(path, f'{name}.npy'), values)
+    with open(os.path.join(path, META_FILE), 'w') as file:
+        json.dump(
+            {
+                'hands': len(columns['hand_id']),
+                'players': players,
+                'tables': tables,
+                'sources': sources
+            },
+            file
+        )
+
+
+def merge_stores(paths: Iterable[str], path: str) -> int:
+    '''
+    Write the hands of several stores, in order, to a single store.
+    Args:
+        paths (Iterable[str]): The folders of the stores to merge.
+        path (str): The folder of the merged store.
+
+    Returns:
+        int: The number of hands written.
+    '''
+    players, tables, sources = _Strings(), _Strings(), _Strings()
+    parts = {name: [] for name in (*HAND_COLUMNS, *SEAT_COLUMNS, *ACTION_COLUMNS)}
+    seats = actions = 0
+    for store in map(HandStore, paths):
+        # Ids of the strings of the store in the merged store
+        ids = {
+            'seat_player': np.array([players(name) for name in store.players], dtype=np.int32),
+            'hand_table': np.array([tables(name) for name in store.tables], dtype=np.int32),
+            'hand_source': np.array([sources(name) for name in store.sources], dtype=np.int32)
+        }
+        for name, values in parts.items():
+            column = getattr(store, name)
+            if name in ids:
+                column = ids[name][column]
+            elif name == 'seat_start':
+                column = column[:-1] + seats
+            elif name == 'action_start':
+                column = column[:-1] + actions
+            values.append(np.asarray(column))
+        seats += len(store.seat_player)
+        actions += len(store.action_type)
+    parts['seat_start'].append(np.array([seats]))
+    parts['action_start'].append(np.array([actions]))
+
+    columns = {
+        name: np.concatenate(values).reshape(-1) if values else np.zeros(0, dtype=np.int64)
+        for name, values in parts.items()
+    }
+    _write_store(path, columns, players.strings, tables.strings, sources.strings)
+    return len(columns['hand_id'])
+
+
+class HandStore:
+    '''
+    A store of hands opened for reading. Every column is a read-only
+    memory-mapped array attribute named after its file, such as
+    store.hand_id or store.action_amount.
+    Args:
+        path (str): The folder of the store.
+    '''
+    def __init__(self, path: str):
+        with open(os.path.join(path, META_FILE)) as file:
+            meta = json.load(file)
+        self.path = path
+        self.players: list[str] = meta['players']
+        self.tables: list[str] = meta['tables']
+        self.sources: list[str] = meta['sources']
+        for name in (*HAND_COLUMNS, *SEAT_COLUMNS, *ACTION_COLUMNS):
+            setattr(self, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r'))
+
+    def __len__(self) -> int:
+        return len(self.hand_id)
+
+    def seats(self, i: int) -> slice:
+        '''Return the rows of the seat columns of hand i.'''
+        return slice(int(self.seat_start[i]), int(self.seat_start[i + 1]))
+
+    def actions(self, i: int) -> slice:
+        '''Return the rows of the action columns of hand i.'''
+        return slice(int(self.action_start[i]), int(self.action_start[i + 1]))
+
+    def hand(self, i: int) -> Hand:
+        '''Return hand i as the parser returned it.'''
+        seats = self.seats(i)
+        actions = self.actions(i)
+        players = tuple(self.players[player] for player in self.seat_player[seats])
+        hole_cards = tuple(
+            None if cards[0] < 0 else (Card.from_index(cards[0]), Card.from_index(cards[1]))
+            for cards in self.seat_hole_cards[seats].tolist()
+        )
+        seat_values = zip(
+            players,
+            self.seat_posted[seats].tolist(),
+            self.seat_returned[seats].tolist(),
+            self.seat_collected[seats].tolist()
+        )
+        posts, returned, collected = [], [], []
+        for name, posted, back, won in seat_values:
+            if posted:
+                posts.append((name, posted))
+            if back:
+                returned.append((name, back))
+            if won:
+                collected.append((name, won))
+        hand_actions = tuple(
+            HandAction(_phases[street], players[seat], _action_types[action_type], amount, total, all_in)
+            for street, seat, action_type, amount, total, all_in in zip(
+                self.action_street[actions].tolist(),
+                self.action_seat[actions].tolist(),
+                self.action_type[actions].tolist(),
+                self.action_amount[actions].tolist(),
+                self.action_total[actions].tolist(),
+                self.action_all_in[actions].tolist()
+            )
+        )
+        return Hand(
+            int(self.hand_id[i]),
+            self.hand_timestamp[i].item(),
+            self.tables[self.hand_table[i]],
+            int(self.hand_max_seats[i]),
+            int(self.hand_button[i]),
+            int(self.hand_small_blind[i]),
+            int(self.hand_big_blind[i]),
+            tuple(self.seat_number[seats].tolist()),
+            players,
+            tuple(self.seat_stack[seats].tolist()),
+            hole_cards,
+            tuple(posts),
+            hand_actions,
+            tuple(Card.from_index(card) for card in self.hand_board[i].tolist() if card >= 0),
+            tuple(returned),
+            tuple(collected),
+            int(self.hand_total_pot[i]),
+            int(self.hand_rake[i]),
+            self.sources[self.hand_source[i]],
+            int(self.hand_offset[i])
+        )
+
+    def __getitem__(self, i: int) -> Hand:
+        return self.hand(i)
+
+    def __iter__(self) -> Iterator[Hand]:
+        return map(self.hand, range(len(self)))
+
+
+def load_store(path: str) -> HandStore:
+    '''Open a store for reading, see HandStore.'''
+    return HandStore(path)
+
+
+if __name__ == '__main__':
+    # Build the store of the corpus and compare loading it with parsing the
+    # stringified dicts of processed_data.csv
+    import ast
+    import csv
+    import sys
+    import tempfile
+    import time
+
+    from .pokerstars import hand_history_files, parse_file
+
+    here = os.path.dirname(__file__)
+    with tempfile.TemporaryDirectory() as folder:
+        path = sys.argv[1] if len(sys.argv) > 1 else folder
+        start = time.perf_counter()
+        paths = hand_history_files(os.path.join(here, 'full_datasets'))
+        n_hands = build_store((hand for path in paths for hand in parse_file(path)), path)
+        print(f'Built {n_hands} hands in {time.perf_counter() - start:.2f}s')
+
+        start = time.perf_counter()
+        store = load_store(path)
+        elapsed = time.perf_counter() - start
+        print(f'Loaded {len(store)} hands, {len(store.action_type)} actions in {elapsed * 1000:.1f}ms')
+
+        # Whole column scans read straight from the mapped files
+        start = time.perf_counter()
+        raises = np.count_nonzero(np.asarray(store.action_type) == ActionType.RAISE.value)
+        reached_flop = np.count_nonzero(np.asarray(store.hand_board)[:, 0] >= 0)
+        elapsed = time.perf_counter() - start
+        print(f'{raises} raises and {reached_flop} flops counted in {elapsed * 1000:.1f}ms')
+
+        # Round trip against the parser
+        mismatches = sum(
+            store[i] != hand
+            for i, hand in enumerate(hand for path in paths for hand in parse_file(path))
+        )
+        print(f'{mismatches} hands differ from the parser')
+
+    start = time.perf_counter()
+    with open(os.path.join(here, 'processed_data.csv')) as file:
+        rows = [[ast.literal_eval(value) for value in row] for row in list(csv.reader(file))[1:]]
+    elapsed = time.perf_counter() - start
+    print(f'processed_data.csv: {len(rows)} rows parsed with literal_eval in {elapsed * 1000:.1f}ms')
@@ -1,3 +1,5 @@
+import random
+
 from game_objects import (
     Deck,
     HoleCards,
@@ -5,7 +7,9 @@ from game_objects import (
     ActionType,
     Action,
     GamePhase,
-    GameStatus
+    GameStatus,
+    FrozenBoard,
+    StatusSnapshot
 )
 
 from player import Player
@@ -17,7 +21,9 @@ class Game:
         player2: Player,
         player1_money: int = 1000,
         player2_money: int = 1000,
-        blind: int = 10
+        blind: int = 10,
+        *,
+        rng: random.Random | None = None
     ):
         assert player1.name != player2.name
         if blind % 2:
@@ -25,7 +31,9 @@ class Game:
         self.players = [player1, player2]
         self.hole_cards = [None, None]
         self.board = Board()
-        self.deck = Deck()
+        # A new deck is shuffled with this generator for every round
+        self.rng = rng
+        self.deck = Deck(rng=rng)
         
         self.blind = blind
         player1_money = max(player1_money, 0)
@@ -96,28 +104,36 @@ class Game:
         
         raise ValueError('Invalid action type.')
     
-    def summary(self, initial_money: tuple[int, int]) -> None:
+    def summary(self, initial_money: tuple[int, int], verbose: bool = False) -> None:
+        if not verbose:
+            return
         print('Summary:')
         if initial_money[0] > self.status.players_money[0]:
             print(f'{self.players[1]} won {initial_money[0] - self.status.players_money[0]}!')
             return
         print(f'{self.players[0]} won {initial_money[1] - self.status.players_money[1]}!')
         
+    def _player_view(self) -> tuple[FrozenBoard, StatusSnapshot]:
+        '''Return read-only snapshots of the board and status to pass to the
+        players, so they cannot modify the game.'''
+        return self.board.snapshot(), self.status.snapshot()
+
     def play_phase(self, verbose: bool = False) -> None:
         status = self.status
         phase = status.game_phase
         next_phase = phase.next_phase()
         
         action1 = self.players[status.current_player] \
-            .get_action(self.hole_cards[status.current_player], self.board.copy(), status.copy())
+            .get_action(self.hole_cards[status.current_player], *self._player_view())
         self.process_action(action1, verbose=verbose)
         status.current_player = 1 - status.current_player
         while status.game_phase == phase:
             action = self.players[status.current_player] \
-                .get_action(self.hole_cards[status.current_player], self.board.copy(), status.copy())
+                .get_action(self.hole_cards[status.current_player], *self._player_view())
             self.process_action(action, verbose=verbose)
             status.current_player = 1 - status.current_player
-            if status.bets[0] == status.bets[1]:
+            # A fold with matched bets finishes the round
+            if status.game_phase == phase and status.bets[0] == status.bets[1]:
                 status.game_phase = next_phase
         
         status.current_player = status.initial_player
@@ -145,6 +161,7 @@ class Game:
         
         if verbose: print('Playing a new round!')
         self.board.clear()
+        self.deck = Deck(rng=self.rng)
         for i in range(2):
             self.hole_cards[i] = HoleCards([self.deck.deal(), self.deck.deal()])
         if verbose:
@@ -159,7 +176,7 @@ class Game:
             status.game_phase = GamePhase.SHOWDOWN
         
         if status.game_phase == GamePhase.FINISHED:
-            self.summary(initial_money)
+            self.summary(initial_money, verbose)
             if verbose:
                 print('Round finished!')
             return
@@ -177,7 +194,7 @@ class Game:
             status.game_phase = GamePhase.SHOWDOWN
             
         if status.game_phase == GamePhase.FINISHED:
-            self.summary(initial_money)
+            self.summary(initial_money, verbose)
             if verbose:
                 print('Round finished!')
             return
@@ -195,7 +212,7 @@ class Game:
             status.game_phase = GamePhase.SHOWDOWN
         
         if status.game_phase == GamePhase.FINISHED:
-            self.summary(initial_money)
+            self.summary(initial_money, verbose)
             if verbose:
                 print('Round finished!')
             return
@@ -213,7 +230,7 @@ class Game:
             status.game_phase = GamePhase.SHOWDOWN
         
         if status.game_phase == GamePhase.FINISHED:
-            self.summary(initial_money)
+            self.summary(initial_money, verbose)
             if verbose:
                 print('Round finished!')
             return
@@ -223,11 +240,11 @@ class Game:
         ag_player = status.last_aggresive_player
         status.current_player = ag_player
         action = self.players[ag_player] \
-            .get_action(self.hole_cards[ag_player], self.board.copy(), status.copy())
+            .get_action(self.hole_cards[ag_player], *self._player_view())
         self.process_action(action, verbose=verbose)
         
         if status.game_phase == GamePhase.FINISHED:
-            self.summary(initial_money)
+            self.summary(initial_money, verbose)
             if verbose:
                 print('Round finished!')
             return
@@ -236,19 +253,19 @@ class Game:
         status.current_player = other
         action = self.players[other].get_action(
             self.hole_cards[other],
-            self.board.copy(),
-            status.copy(),
+            *self._player_view(),
             op_holecards=self.hole_cards[ag_player]
         )
         self.process_action(action, verbose=verbose)
         
         if status.game_phase == GamePhase.FINISHED:
-            self.summary(initial_money)
+            self.summary(initial_money, verbose)
             if verbose:
                 print('Round finished!')
             return
         
-        print(f'{self.players[other]} showed {self.hole_cards[other]}!') 
+        if verbose:
+            print(f'{self.players[other]} showed {self.hole_cards[other]}!')
         is_win, index = self.board.evaluate(*self.hole_cards)
         if not is_win:
             status.players_money[0] += status.bets[0]
@@ -257,8 +274,9 @@ class Game:
             status.players_money[index] += sum(status.bets)
         
         # Change initial player
-        self.summary(initial_money)
-        print('Round finished!')
+        self.summary(initial_money, verbose)
+        if verbose:
+            print('Round finished!')
             
             
 if __name__ == '__main__':
@@ -1,23 +1,38 @@
 from .color import Color
-from .card import Card
+from .card import Card, cards_to_mask, mask_to_cards
 from .deck import Deck
 
 from.hole_cards import HoleCards
-from .board import Board
+from .board import Board, FrozenBoard
+from .evaluator import rank7, rank_mask, hand_category
+from .isomorphism import canonicalize, canonical_key, board_index, flop_index
 
 from .action import Action, ActionType
 
-from .game_status import GameStatus, GamePhase
+from .game_status import GameStatus, GamePhase, StatusSnapshot
+from .game_state import GameState
 
 
 __all__ = [
     'Color',
     'Card',
+    'cards_to_mask',
+    'mask_to_cards',
     'Deck',
-    'Hand',
+    'HoleCards',
     'Board',
+    'FrozenBoard',
+    'rank7',
+    'rank_mask',
+    'hand_category',
+    'canonicalize',
+    'canonical_key',
+    'board_index',
+    'flop_index',
     'Action',
     'ActionType',
     'GameStatus',
-    'GamePhase'
+    'StatusSnapshot',
+    'GamePhase',
+    'GameState'
 ]
\ No newline at end of file
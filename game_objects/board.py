@@ -2,8 +2,9 @@ from collections import Counter
 from copy import deepcopy
 
 from .hole_cards import HoleCards
-from .card import Card
+from .card import Card, N_RANKS, N_SUITS, suit_ranks, rank_union
 from .color import Color
+from .evaluator import rank_mask, hand_category
 from .game_status import GamePhase
 
 class Board(list):
@@ -14,6 +15,11 @@ class Board(list):
     def copy(self):
         '''Return a copy of the board.'''
         return deepcopy(self)
+
+    def snapshot(self) -> 'FrozenBoard':
+        '''Return a read-only copy of the board, which only copies the five
+        card references.'''
+        return FrozenBoard(self)
         
     def flop(self, c1: Card, c2: Card, c3: Card) -> None:
         '''Replace the current board with the flop.'''
@@ -53,6 +59,15 @@ class Board(list):
             return GamePhase.TURN
         return GamePhase.RIVER
     
+    @property
+    def mask(self) -> int:
+        '''Return the 52-bit mask of the cards on the board.'''
+        mask = 0
+        for card in self:
+            if card is not None:
+                mask |= card.mask
+        return mask
+    
     def __len__(self) -> int:
         return 5 - self.count(None)
         
@@ -61,21 +76,25 @@ class Board(list):
     
     def color_count(self) -> Counter[Color]:
         '''Return the number of cards in the hand with the given color.'''
-        return Counter(card.color for card in self)
+        return Counter(card.color for card in self if card is not None)
     
     def number_count(
         self,
         hole_cards: HoleCards = None,
         *,
         color: Color = None
-    ) -> Counter:
-        
-        if not hole_cards: hole_cards = []
-        # Count and adjust the ace to be the highest card
-        # If color is provided, only count the cards of that color
-        c = Counter((card.number - 1) % 13 for card in self if not color or card.color == color)
-        c.update((card.number - 1) % 13 for card in hole_cards if not color or card.color == color)
-        return c
+    ) -> list[int]:
+        '''
+        Count the cards of each rank in the board and hole cards. Ranks go
+        from 0 (deuce) to 12 (ace). If color is provided, only count the
+        cards of that color.
+        '''
+        mask = self.mask
+        if hole_cards: mask |= hole_cards.mask
+        if color:
+            ranks = suit_ranks(mask, color.value - 1)
+            return [ranks >> rank & 1 for rank in range(N_RANKS)]
+        return _rank_counts(mask)
     
     def check_straight(
         self,
@@ -94,35 +113,23 @@ class Board(list):
             int: The rank from 0 to 9 of the straight if there is one, \
                 otherwise -1.
         '''
-        if not color:
-            cards = set(
-                (
-                    *(card.number for card in self),
-                    *(card.number for card in hole_cards)
-                )
-            )
-        else:
-            cards = set(
-                (
-                    *(card.number for card in self if card.color == color),
-                    *(card.number for card in hole_cards if card.color == color)
-                    )
-                )
-        if 1 in cards:
-            cards.add(14)
-            
-        cards = sorted(cards, reverse=True)
-
-        accum = 1
-        for i in range(len(cards) - 1):
-            if cards[i] - 1 != cards[i+1]:
-                accum = 1
-            else:
-                accum += 1
-                if accum == 5:
-                    return cards[i] - 1 # Ranks: 0-9
-
-        return -1
+        mask = self.mask
+        if hole_cards: mask |= hole_cards.mask
+        if color:
+            return _straight_rank(suit_ranks(mask, color.value - 1))
+        return _straight_rank(rank_union(mask))
+    
+    def rank(self, hole_cards: HoleCards) -> int:
+        '''
+        Rank the best hand made with the board and the hole cards.
+        Args:
+            hole_cards: The hole cards of the player.
+        
+        Returns:
+            int: The strength of the hand from 1 to 7462, the higher the \
+                better.
+        '''
+        return rank_mask(self.mask | hole_cards.mask)
     
     def evaluate(
         self,
@@ -146,51 +153,76 @@ class Board(list):
         '''
         
         assert all(self[:])
+        board_mask = self.mask
+        rank0 = rank_mask(board_mask | h0.mask)
+        rank1 = rank_mask(board_mask | h1.mask)
+        if verbose: print(hand_category(max(rank0, rank1)))
+        return rank0 != rank1, int(rank0 < rank1)
+
+    def winners(self, hands: list[HoleCards]) -> list[int]:
+        '''
+        Return the indices of the hands that win the showdown, more than one
+        if they tie. Every hand is ranked once, regardless of how many there
+        are.
+        Args:
+            hands: The hole cards of every player still in the hand.
+
+        Returns:
+            list[int]: The indices of the best hands.
+        '''
+        assert all(self[:])
+        board_mask = self.mask
+        ranks = [rank_mask(board_mask | hand.mask) for hand in hands]
+        best = max(ranks)
+        return [i for i, rank in enumerate(ranks) if rank == best]
 
-        # Check for flushes
-        fls0, fls1 = None, None
-        colors = self.color_count()
-        for color, count in colors.most_common(2):
-            if count > 2:
-                if h0.color_count(color) + count >= 5:
-                    fls0 = color
-                if h1.color_count(color) + count >= 5:
-                    fls1 = color
+    def _evaluate_pairwise(
+        self,
+        h0: HoleCards,
+        h1: HoleCards,
+        *,
+        verbose: bool = False
+    ) -> tuple[bool, int]:
+        '''
+        Evaluate the hands of two players by comparing them category by
+        category. Slower than evaluate, kept to cross-check the rank tables
+        (see ``python -m game_objects.evaluator``).
+        '''
+        
+        assert all(self[:])
+        board_mask = self.mask
+        mask0 = board_mask | h0.mask
+        mask1 = board_mask | h1.mask
+
+        # Check for flushes, as the rank mask of the flush color
+        fls0 = _flush_ranks(mask0)
+        fls1 = _flush_ranks(mask1)
         
         # STRAIGHT FLUSHES AND ROYAL FLUSHES
         if fls0 or fls1:
-            # Check for straight flushes
-            if not (fls0 and fls1):
-                # Only one can have a straight flush
-                if fls0 and self.check_straight(h0, color=fls0) != -1:
-                    if verbose: print('Straight Flush')
-                    return True, 0
-                if fls1 and self.check_straight(h1, color=fls1) != -1:
-                    if verbose: print('Straight Flush')
-                    return True, 1
-            else:
-                str0 = self.check_straight(h0, color=fls0)
-                str1 = self.check_straight(h1, color=fls1)
-                str0_bool = str0 != -1
-                str1_bool = str1 != -1
-                if str0_bool or str1_bool:
-                    if verbose: print('Straight Flush')
-                    if not (str0_bool and str1_bool):
-                        # Only one has straight flush
-                        return True, int(str1_bool)
-                    
-                    # Both have straight flushes so compare them
-                    return str0 != str1, int(str0 < str1)
+            str0 = _straight_rank(fls0)
+            str1 = _straight_rank(fls1)
+            str0_bool = str0 != -1
+            str1_bool = str1 != -1
+            if str0_bool or str1_bool:
+                if verbose: print('Straight Flush')
+                if not (str0_bool and str1_bool):
+                    # Only one has straight flush
+                    return True, int(str1_bool)
+                
+                # Both have straight flushes so compare them
+                return str0 != str1, int(str0 < str1)
         
         # POKER AND FULL HOUSE
-        nums0 = self.number_count(h0)
-        nums1 = self.number_count(h1)
-        combos0 = nums0.most_common(2)
-        combos1 = nums1.most_common(2)
-        poker0 = combos0[0][1] == 4
-        full0 = sum(count for _, count in combos0) == 5
-        poker1 = combos1[0][1] == 4
-        full1 = sum(count for _, count in combos1) == 5
+        # Groups of equal numbers as (count, rank), biggest groups first
+        combos0 = _groups(mask0)
+        combos1 = _groups(mask1)
+        ranks0 = rank_union(mask0)
+        ranks1 = rank_union(mask1)
+        poker0 = combos0[0][0] == 4
+        full0 = combos0[0][0] == 3 and combos0[1][0] >= 2
+        poker1 = combos1[0][0] == 4
+        full1 = combos1[0][0] == 3 and combos1[1][0] >= 2
         
         if poker0 or full0 or poker1 or full1:
             if poker0 or poker1:
@@ -200,20 +232,14 @@ class Board(list):
                     return True, int(poker1)
                 
                 # Both have pokers so compare them
-                poker_number0 = combos0[0][0]
-                poker_number1 = combos1[1][0]
+                poker_number0 = combos0[0][1]
+                poker_number1 = combos1[0][1]
                 if poker_number0 != poker_number1:
                     return True, int(poker_number0 < poker_number1)
                 
                 # Look for high card
-                # Could do an n-largest algorithm but it's constant time either way
-                highest0 = sorted(nums0.keys(), reverse=True)[:2]
-                highest1 = sorted(nums1.keys(), reverse=True)[:2]
-                
-                highest0 = highest0[0] if highest0[0] != poker_number0 else highest0[1]
-                highest1 = highest1[0] if highest1[0] != poker_number1 else highest1[1]
-                
-                
+                highest0 = _top_ranks(ranks0 & ~(1 << poker_number0), 1)
+                highest1 = _top_ranks(ranks1 & ~(1 << poker_number1), 1)
                 return highest0 != highest1, int(highest0 < highest1)
                     
             if verbose: print('Full House')
@@ -222,14 +248,12 @@ class Board(list):
                 return True, int(full1)    
             
             # Both have full houses so compare them
-            full_numbers0 = [n for n, _ in combos0]
-            full_numbers1 = [n for n, _ in combos1]
             # First compare the three of a kinds
-            if full_numbers0[0] != full_numbers1[0]:
-                return True, int(full_numbers0[0] < full_numbers1[0])
+            if combos0[0][1] != combos1[0][1]:
+                return True, int(combos0[0][1] < combos1[0][1])
             
             # Then compare the pairs
-            return full_numbers0[1] != full_numbers1[1], int(full_numbers0[1] < full_numbers1[1])            
+            return combos0[1][1] != combos1[1][1], int(combos0[1][1] < combos1[1][1])
         
         # FLUSHES
         if fls0 or fls1:
@@ -238,31 +262,29 @@ class Board(list):
                 # Only one has flush
                 return True, int(bool(fls1))
 
-            # Both have flushes, so highest card wins
-            nums0 = self.number_count(h0, color=fls0)
-            nums1 = self.number_count(h1, color=fls1)
-            highests0 = sorted(nums0.keys(), reverse=True)
-            highests1 = sorted(nums1.keys(), reverse=True)
+            # Both have flushes, so the five highest cards win
+            highests0 = _top_ranks(fls0, 5)
+            highests1 = _top_ranks(fls1, 5)
             return highests0 != highests1, int(highests0 < highests1)
 
         
         # STRAIGHTS
-        str0 = self.check_straight(h0)
-        str1 = self.check_straight(h1)
+        str0 = _straight_rank(ranks0)
+        str1 = _straight_rank(ranks1)
         str0_bool = str0 != -1
         str1_bool = str1 != -1
         if str0_bool or str1_bool:
             if verbose: print('Straight')
             if not (str0_bool and str1_bool):
-                # Only one has straight flush
+                # Only one has straight
                 return True, int(str1_bool)
             
-            # Both have straight flushes so compare them
+            # Both have straights so compare them
             return str0 != str1, int(str0 < str1)
         
         # THREE OF A KINDS
-        trip0 = combos0[0][1] == 3
-        trip1 = combos1[0][1] == 3
+        trip0 = combos0[0][0] == 3
+        trip1 = combos1[0][0] == 3
         if trip0 or trip1:
             if verbose: print('Three of a Kind')
             if not (trip0 and trip1):
@@ -270,29 +292,19 @@ class Board(list):
                 return True, int(trip1)
             
             # Both have three of a kinds so compare them
-            trip_number0 = combos0[0][0]
-            trip_number1 = combos1[0][0]
+            trip_number0 = combos0[0][1]
+            trip_number1 = combos1[0][1]
             if trip_number0 != trip_number1:
                 return True, int(trip_number0 < trip_number1)
             
-            # Look for high cards
-            highests0 = sorted(nums0.keys(), reverse=True)[:3]
-            highests1 = sorted(nums1.keys(), reverse=True)[:3]
-            
-            # Remove the three of a kind from the high cards
-            # Otherwise remove the worst card
-            try: highests0.remove(trip_number0)
-            except: highests0.pop()
-                
-            try: highests1.remove(trip_number1)
-            except: highests1.pop()
-            
-            # Compare both lists
+            # Look for high cards, without the three of a kind
+            highests0 = _top_ranks(ranks0 & ~(1 << trip_number0), 2)
+            highests1 = _top_ranks(ranks1 & ~(1 << trip_number1), 2)
             return highests0 != highests1, int(highests0 < highests1)
         
         # TWO PAIRS
-        twopair0 = combos0[0][1] == 2 and combos0[1][1] == 2
-        twopair1 = combos1[0][1] == 2 and combos1[1][1] == 2
+        twopair0 = combos0[0][0] == 2 and combos0[1][0] == 2
+        twopair1 = combos1[0][0] == 2 and combos1[1][0] == 2
         if twopair0 or twopair1:
             if verbose: print('Two Pair')
             if not (twopair0 and twopair1):
@@ -300,31 +312,20 @@ class Board(list):
                 return True, int(twopair1)
             
             # Both have two pairs so compare them
-            pair_numbers0 = sorted([n for n, _ in combos0], reverse=True)
-            pair_numbers1 = sorted([n for n, _ in combos1], reverse=True)
-            
+            pair_numbers0 = (combos0[0][1], combos0[1][1])
+            pair_numbers1 = (combos1[0][1], combos1[1][1])
             if pair_numbers0 != pair_numbers1:
                 return True, int(pair_numbers0 < pair_numbers1)
             
-            # Look for high card
-            highests0 = sorted(nums0.keys(), reverse=True)[:3]
-            highests1 = sorted(nums1.keys(), reverse=True)[:3]
-            highest0 = highests0[-1] # Default
-            highest1 = highests1[-1] # Default
-            for i in range(2):
-                if highests0[i] not in pair_numbers0:
-                    highest0 = highests0[i]
-                    break
-            for i in range(2):
-                if highests1[i] not in pair_numbers1:
-                    highest1 = highests1[i]
-                    break
-                
+            # Look for high card, which may come from a third pair
+            pairs_mask = (1 << pair_numbers0[0]) | (1 << pair_numbers0[1])
+            highest0 = _top_ranks(ranks0 & ~pairs_mask, 1)
+            highest1 = _top_ranks(ranks1 & ~pairs_mask, 1)
             return highest0 != highest1, int(highest0 < highest1)
         
         # PAIRS
-        pair0 = combos0[0][1] == 2
-        pair1 = combos1[0][1] == 2
+        pair0 = combos0[0][0] == 2
+        pair1 = combos1[0][0] == 2
         if pair0 or pair1:
             if verbose: print('Pair')
             if not (pair0 and pair1):
@@ -332,26 +333,90 @@ class Board(list):
                 return True, int(pair1)
             
             # Both have pairs so compare them
-            pair_number0 = combos0[0][0]
-            pair_number1 = combos1[0][0]
+            pair_number0 = combos0[0][1]
+            pair_number1 = combos1[0][1]
             if pair_number0 != pair_number1:
                 return True, int(pair_number0 < pair_number1)
             
-            # Look for high cards
-            highests0 = sorted(nums0.keys(), reverse=True)[:4]
-            highests1 = sorted(nums1.keys(), reverse=True)[:4]
-            
-            try: highests0.remove(pair_number0)
-            except: highests0.pop()
-                
-            try: highests1.remove(pair_number1)
-            except: highests1.pop()
-            
+            # Look for high cards, without the pair
+            highests0 = _top_ranks(ranks0 & ~(1 << pair_number0), 3)
+            highests1 = _top_ranks(ranks1 & ~(1 << pair_number1), 3)
             return highests0 != highests1, int(highests0 < highests1)
         
         # HIGH CARD
         if verbose: print('High Card')
-        highests0 = sorted(nums0.keys(), reverse=True)[:5]
-        highests1 = sorted(nums1.keys(), reverse=True)[:5]
+        highests0 = _top_ranks(ranks0, 5)
+        highests1 = _top_ranks(ranks1, 5)
         
-        return highests0 != highests1, int(highests0 < highests1)
\ No newline at end of file
+        return highests0 != highests1, int(highests0 < highests1)
+
+
+class FrozenBoard(tuple):
+    '''
+    Read-only snapshot of a Board, with the same queries. Cards are interned
+    and immutable, so the snapshot can never change nor change the board.
+    '''
+    __slots__ = ()
+
+    status = Board.status
+    mask = Board.mask
+    __len__ = Board.__len__
+    __str__ = Board.__str__
+    color_count = Board.color_count
+    number_count = Board.number_count
+    check_straight = Board.check_straight
+    rank = Board.rank
+    evaluate = Board.evaluate
+    winners = Board.winners
+
+    def copy(self) -> Board:
+        '''Return a mutable copy of the board.'''
+        board = Board()
+        board[:] = self
+        return board
+
+
+# Bit helpers over rank masks, where bit i stands for rank i (0 is a deuce)
+
+def _rank_counts(mask: int) -> list[int]:
+    '''Return how many cards of each rank there are in a 52-bit mask.'''
+    counts = [0] * N_RANKS
+    for suit in range(N_SUITS):
+        ranks = suit_ranks(mask, suit)
+        while ranks:
+            low = ranks & -ranks
+            counts[low.bit_length() - 1] += 1
+            ranks ^= low
+    return counts
+
+def _groups(mask: int) -> list[tuple[int, int]]:
+    '''Return the (count, rank) of every rank present in a 52-bit mask,
+    sorted from the biggest group to the smallest and then by rank.'''
+    counts = _rank_counts(mask)
+    return sorted(
+        ((count, rank) for rank, count in enumerate(counts) if count),
+        reverse=True
+    )
+
+def _flush_ranks(mask: int) -> int:
+    '''Return the rank mask of the flush color, or 0 if there is no flush.'''
+    for suit in range(N_SUITS):
+        ranks = suit_ranks(mask, suit)
+        if ranks.bit_count() >= 5:
+            return ranks
+    return 0
+
+def _straight_rank(ranks: int) -> int:
+    '''Return the rank from 0 (five high) to 9 (ace high) of the best
+    straight in a rank mask, or -1 if there is none.'''
+    # Shift to make room for the ace playing as the lowest card
+    ranks = (ranks << 1) | (ranks >> 12 & 1)
+    runs = ranks & ranks >> 1 & ranks >> 2 & ranks >> 3 & ranks >> 4
+    return runs.bit_length() - 1
+
+def _top_ranks(ranks: int, n: int) -> int:
+    '''Keep the n highest ranks of a rank mask. The results compare as ints
+    like the sorted lists of ranks they represent.'''
+    while ranks.bit_count() > n:
+        ranks &= ranks - 1
+    return ranks
@@ -1,4 +1,4 @@
-from typing import Self
+from typing import Iterable, Self
 
 from .color import Color
 
@@ -9,21 +9,101 @@ number_to_str = {
     13: 'K'
 }
 
+# Compact card encoding. Ranks go from 0 (deuce) to 12 (ace) and suits from
+# 0 to 3 following the order of Color. Every card is an int in 0..51 laid out
+# as ``suit * 13 + rank``, so a set of cards is a 52-bit mask made of four
+# contiguous 13-bit rank masks, one per suit.
+N_RANKS = 13
+N_SUITS = 4
+N_CARDS = N_RANKS * N_SUITS
+RANK_MASK = (1 << N_RANKS) - 1
+FULL_DECK_MASK = (1 << N_CARDS) - 1
+
+_colors = tuple(Color)
+
 class Card:
-    '''A card in a deck of cards.'''
-    def __init__(self, number: int, color: Color):
-        '''Create a new card with the given number and color.'''
-        self.number = number
-        self.color = color
-        
+    '''A card in a deck of cards.
+
+    There are only 52 cards, all of them created once when this module is
+    imported. ``Card(number, color)`` returns the interned instance, so cards
+    can be compared by identity and never allocate.
+    '''
+    __slots__ = ('number', 'color', 'rank', 'suit', 'index', 'mask')
+
+    def __new__(cls, number: int, color: Color):
+        '''Return the card with the given number and color.'''
+        if not 1 <= number <= 13 or not isinstance(color, Color):
+            raise ValueError(f'Invalid card: {number} of {color!r}')
+        return _cards[(color.value - 1) * N_RANKS + (number - 2) % N_RANKS]
+
+    @classmethod
+    def _create(cls, index: int) -> Self:
+        card = object.__new__(cls)
+        suit, rank = divmod(index, N_RANKS)
+        object.__setattr__(card, 'number', rank + 2 if rank < 12 else 1)
+        object.__setattr__(card, 'color', _colors[suit])
+        object.__setattr__(card, 'rank', rank)
+        object.__setattr__(card, 'suit', suit)
+        object.__setattr__(card, 'index', index)
+        object.__setattr__(card, 'mask', 1 << index)
+        return card
+
+    @staticmethod
+    def from_index(index: int) -> Self:
+        '''Return the card encoded by an int from 0 to 51.'''
+        return _cards[index]
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Cards are immutable.')
+
     def __eq__(self, other: Self):
-        return isinstance(other, Card) and self.number == other.number and self.color == other.color
-    
+        return self is other
+
     def __hash__(self):
-        return hash((self.number, self.color))
-    
+        return self.index
+
+    def __reduce__(self):
+        return Card, (self.number, self.color)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
     def __str__(self):
         return f'{number_to_str.get(self.number, self.number)}{self.color}'
-    
+
     def __repr__(self):
-        return f'Card({self.number}, {repr(self.color)})'
\ No newline at end of file
+        return f'Card({self.number}, {repr(self.color)})'
+
+_cards = tuple(Card._create(index) for index in range(N_CARDS))
+
+
+def cards_to_mask(cards: Iterable[Card | None]) -> int:
+    '''Return the 52-bit mask of the given cards, ignoring empty slots.'''
+    mask = 0
+    for card in cards:
+        if card is not None:
+            mask |= card.mask
+    return mask
+
+def mask_to_cards(mask: int) -> list[Card]:
+    '''Return the cards of a 52-bit mask ordered by index.'''
+    cards = []
+    while mask:
+        low = mask & -mask
+        cards.append(_cards[low.bit_length() - 1])
+        mask ^= low
+    return cards
+
+def suit_ranks(mask: int, suit: int) -> int:
+    '''Return the 13-bit rank mask of the cards of one suit.'''
+    return (mask >> (suit * N_RANKS)) & RANK_MASK
+
+def rank_union(mask: int) -> int:
+    '''Return the 13-bit mask of the ranks present in any suit.'''
+    return (
+        (mask | mask >> N_RANKS | mask >> 2 * N_RANKS | mask >> 3 * N_RANKS)
+        & RANK_MASK
+    )
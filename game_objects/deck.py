@@ -1,21 +1,36 @@
 import random
 
-from .color import Color
-from .card import Card
+from .card import Card, N_CARDS
 
 class Deck(list):
-    default_deck = [Card(number, color) for number in range(1, 14) for color in Color]
-    def __init__(self, *, existing_cards:list[Card] = None):
+    default_deck = [Card.from_index(index) for index in range(N_CARDS)]
+    def __init__(
+        self,
+        *,
+        existing_cards:list[Card] = None,
+        rng: random.Random | None = None
+    ):
         if existing_cards is None:
-            super().__init__([*Deck.default_deck])
-            random.shuffle(self)
+            super().__init__(Deck.default_deck)
         else:
-            existing_cards = set(existing_cards)
-            super().__init__([card for card in Deck.default_deck if card not in existing_cards])
-            random.shuffle(self)
-        
+            dead = 0
+            for card in existing_cards:
+                if card is not None:
+                    dead |= card.mask
+            super().__init__([card for card in Deck.default_deck if not dead >> card.index & 1])
+        # The module level functions share the global generator
+        (rng or random).shuffle(self)
+
+    @property
+    def mask(self) -> int:
+        '''Return the 52-bit mask of the cards left in the deck.'''
+        mask = 0
+        for card in self:
+            mask |= card.mask
+        return mask
+
     def deal(self) -> Card:
         '''Remove and return a card from the deck.'''
         if not self:
             raise IndexError('Cannot deal from an empty deck.')
-        return self.pop()
\ No newline at end of file
+        return self.pop()
@@ -0,0 +1,240 @@
+'''
+Lookup table hand evaluator.
+
+Any set of 5 to 7 cards maps to a single integer strength from 1 (the worst
+high card) to 7462 (a royal flush), so comparing two players is a single
+integer comparison and the rank of a hand can be reused against many
+opponents.
+
+Flushes are read from a table indexed by the 13-bit rank mask of the flush
+color. Every other hand is identified by its rank multiset, encoded as the
+sum of the four suit masks with every rank bit spread over 3 bits, which is a
+perfect hash of how many cards of each rank there are. The tables are built
+once and cached on disk next to this module.
+'''
+from array import array
+from collections import Counter
+from itertools import combinations, combinations_with_replacement
+from pathlib import Path
+from typing import Iterable
+
+from .card import Card, N_RANKS, RANK_MASK
+
+HAND_CATEGORIES = (
+    'High Card',
+    'Pair',
+    'Two Pair',
+    'Three of a Kind',
+    'Straight',
+    'Flush',
+    'Full House',
+    'Poker',
+    'Straight Flush'
+)
+
+TABLES_PATH = Path(__file__).with_name('rank_tables.bin')
+_MAGIC = b'RANK7v1\n'
+
+# Spread the 13 bits of a rank mask over 3 bits each, so adding the four suit
+# masks counts the cards of every rank without carries.
+_SPREAD = [
+    sum(1 << 3 * rank for rank in range(N_RANKS) if ranks >> rank & 1)
+    for ranks in range(1 << N_RANKS)
+]
+
+
+def _straight(ranks: int) -> int:
+    '''Return the highest card of the best straight in a rank mask, or -1.'''
+    ranks = (ranks << 1) | (ranks >> 12 & 1)
+    runs = ranks & ranks >> 1 & ranks >> 2 & ranks >> 3 & ranks >> 4
+    return runs.bit_length() + 2 if runs else -1
+
+def _top(ranks: int, n: int) -> tuple[int, ...]:
+    '''Return the n highest ranks of a rank mask in decreasing order.'''
+    return tuple(rank for rank in range(12, -1, -1) if ranks >> rank & 1)[:n]
+
+def _flush_key(ranks: int) -> tuple[int, ...]:
+    '''Return the comparable key of the best hand in a flush rank mask.'''
+    straight = _straight(ranks)
+    if straight != -1:
+        return (8, straight)
+    return (5, *_top(ranks, 5))
+
+def _multiset_key(counts: Counter) -> tuple[int, ...]:
+    '''Return the comparable key of the best non flush hand made with the
+    given number of cards of each rank.'''
+    groups = sorted(((count, rank) for rank, count in counts.items()), reverse=True)
+    ranks = sum(1 << rank for rank in counts)
+    best, best_count = groups[0][1], groups[0][0]
+    if best_count == 4:
+        return (7, best, *_top(ranks & ~(1 << best), 1))
+    if best_count == 3 and groups[1][0] >= 2:
+        return (6, best, groups[1][1])
+    straight = _straight(ranks)
+    if straight != -1:
+        return (4, straight)
+    if best_count == 3:
+        return (3, best, *_top(ranks & ~(1 << best), 2))
+    if best_count == 2 and groups[1][0] == 2:
+        second = groups[1][1]
+        return (2, best, second, *_top(ranks & ~(1 << best) & ~(1 << second), 1))
+    if best_count == 2:
+        return (1, best, *_top(ranks & ~(1 << best), 3))
+    return (0, *_top(ranks, 5))
+
+def _multisets(n_cards: int):
+    '''Yield every multiset of ranks with n_cards cards and at most four
+    cards of each rank.'''
+    for ranks in combinations_with_replacement(range(N_RANKS), n_cards):
+        counts = Counter(ranks)
+        if max(counts.values()) <= 4:
+            yield counts
+
+def build_tables() -> tuple[array, array, array]:
+    '''
+    Compute the lookup tables from scratch.
+
+    Returns:
+        tuple[array, array, array]: The flush table indexed by rank mask, and
+            the sorted multiset keys with their ranks.
+    '''
+    # Every distinct 5 card hand, sorted from worst to best
+    keys = {_multiset_key(counts) for counts in _multisets(5)}
+    keys.update(_flush_key(sum(1 << rank for rank in ranks))
+                for ranks in combinations(range(N_RANKS), 5))
+    dense = {key: rank for rank, key in enumerate(sorted(keys), start=1)}
+
+    flushes = array('H', [0]) * (1 << N_RANKS)
+    for ranks in range(1 << N_RANKS):
+        if ranks.bit_count() >= 5:
+            flushes[ranks] = dense[_flush_key(ranks)]
+
+    multisets = {}
+    for n_cards in (5, 6, 7):
+        for counts in _multisets(n_cards):
+            spread = sum(count << 3 * rank for rank, count in counts.items())
+            multisets[spread] = dense[_multiset_key(counts)]
+    spreads = array('Q', sorted(multisets))
+    ranks = array('H', (multisets[spread] for spread in spreads))
+    return flushes, spreads, ranks
+
+def _save_tables(path: Path, flushes: array, spreads: array, ranks: array) -> None:
+    with open(path, 'wb') as file:
+        file.write(_MAGIC)
+        array('Q', [len(spreads)]).tofile(file)
+        flushes.tofile(file)
+        spreads.tofile(file)
+        ranks.tofile(file)
+
+def _load_tables(path: Path) -> tuple[array, array, array]:
+    with open(path, 'rb') as file:
+        if file.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f'{path} is not a rank table file.')
+        size = array('Q')
+        size.fromfile(file, 1)
+        flushes, spreads, ranks = array('H'), array('Q'), array('H')
+        flushes.fromfile(file, 1 << N_RANKS)
+        spreads.fromfile(file, size[0])
+        ranks.fromfile(file, size[0])
+    return flushes, spreads, ranks
+
+def load_tables(path: Path = TABLES_PATH) -> tuple[array, array, array]:
+    '''Load the lookup tables from disk, building and caching them if they
+    are missing or corrupted.'''
+    try:
+        return _load_tables(path)
+    except (OSError, EOFError, ValueError):
+        pass
+    tables = build_tables()
+    try:
+        _save_tables(path, *tables)
+    except OSError:
+        pass  # Read-only installs just rebuild the tables on import
+    return tables
+
+
+FLUSH_TABLE, MULTISET_SPREADS, MULTISET_RANKS = load_tables()
+_FLUSH = FLUSH_TABLE.tolist()
+_MULTISET = dict(zip(MULTISET_SPREADS, MULTISET_RANKS))
+
+# Lowest rank of every category
+_CATEGORY_STARTS = [
+    1,                                          # Seven high
+    _MULTISET[_SPREAD[0b1111] + _SPREAD[1]],    # Pair of deuces
+    _MULTISET[_SPREAD[0b111] + _SPREAD[0b11]],  # Threes and deuces
+    _MULTISET[_SPREAD[0b111] + 2 * _SPREAD[1]], # Three deuces
+    _MULTISET[_SPREAD[0b1000000001111]],        # Five high straight
+    _FLUSH[0b101111],                           # Seven high flush
+    _MULTISET[2 * _SPREAD[0b11] + _SPREAD[1]],  # Deuces full of threes
+    _MULTISET[4 * _SPREAD[1] + _SPREAD[0b10]],  # Four deuces
+    _FLUSH[0b1000000001111],                    # Five high straight flush
+]
+
+
+def rank_mask(mask: int) -> int:
+    '''
+    Rank the best hand in a 52-bit mask of 5 to 7 cards.
+    Args:
+        mask: The 52-bit mask of the cards.
+
+    Returns:
+        int: The strength of the hand from 1 to 7462, the higher the better.
+    '''
+    s0 = mask & RANK_MASK
+    s1 = mask >> 13 & RANK_MASK
+    s2 = mask >> 26 & RANK_MASK
+    s3 = mask >> 39
+    flush = _FLUSH[s0] or _FLUSH[s1] or _FLUSH[s2] or _FLUSH[s3]
+    if flush:
+        return flush
+    return _MULTISET[_SPREAD[s0] + _SPREAD[s1] + _SPREAD[s2] + _SPREAD[s3]]
+
+def rank7(cards: Iterable[Card]) -> int:
+    '''
+    Rank the best hand that can be made with 5 to 7 cards.
+    Args:
+        cards: The cards, usually the hole cards plus the board.
+
+    Returns:
+        int: The strength of the hand from 1 to 7462, the higher the better.
+    '''
+    mask = 0
+    for card in cards:
+        mask |= card.mask
+    return rank_mask(mask)
+
+def hand_category(rank: int) -> str:
+    '''Return the name of the category of a hand rank, e.g. "Full House".'''
+    category = 0
+    while category < 8 and _CATEGORY_STARTS[category + 1] <= rank:
+        category += 1
+    return HAND_CATEGORIES[category]
+
+
+if __name__ == '__main__':
+    # Differential check against the pairwise evaluator of the board
+    # Usage: python -m game_objects.evaluator [number of deals]
+    import sys
+    import time
+
+    from .board import Board
+    from .deck import Deck
+    from .hole_cards import HoleCards
+
+    n_deals = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    mismatches = 0
+    start = time.perf_counter()
+    for i in range(n_deals):
+        deck = Deck()
+        h0 = HoleCards([deck.deal(), deck.deal()])
+        h1 = HoleCards([deck.deal(), deck.deal()])
+        board = Board()
+        board[:] = deck[-5:]
+        expected = board._evaluate_pairwise(h0, h1)
+        result = board.evaluate(h0, h1)
+        if expected[0] != result[0] or (expected[0] and expected[1] != result[1]):
+            mismatches += 1
+            print(f'Mismatch: {h0} vs {h1} on {board}: {result} != {expected}')
+    elapsed = time.perf_counter() - start
+    print(f'{n_deals} deals, {mismatches} mismatches in {elapsed:.1f}s')
+    sys.exit(bool(mismatches))
@@ -0,0 +1,294 @@
+'''
+Compact heads-up game state with apply and undo, for bots that search.
+
+The state follows the rules of Game.process_action and Game.play_round, but
+lives in a handful of slots, so trying an action is ``token =
+state.apply(...)`` and taking it back is ``state.undo(token)``, both in
+constant time. The values an action overwrites are saved in a history that
+is allocated once and reused, and actions must be undone in the reverse
+order they were applied, as any depth first search does.
+'''
+from .action import ActionType
+from .evaluator import rank_mask
+from .game_status import GamePhase
+
+_FOLD = ActionType.FOLD
+_CHECK = ActionType.CHECK
+_CALL = ActionType.CALL
+_RAISE = ActionType.RAISE
+_MUCK = ActionType.MUCK
+_SHOW = ActionType.SHOW
+
+# Every possible set of legal actions, so they are never built again
+_SHOWDOWN_ACTIONS = (_MUCK, _SHOW)
+_BETTING_ACTIONS = (
+    (_FOLD, _CALL),
+    (_FOLD, _CALL, _RAISE),
+    (_FOLD, _CHECK),
+    (_FOLD, _CHECK, _RAISE)
+)
+_NO_ACTIONS = ()
+
+# Number of values saved per applied action
+_SAVED = 9
+
+
+class GameState:
+    '''
+    State of a heads-up hand, from the blinds to the end.
+    Args:
+        stacks (tuple[int, int]): The money of both players before the blinds.
+        blind (int): The big blind.
+        initial_player (int): The player in the small blind, who acts first
+            on every street.
+        holes (tuple[int, int]): The masks of the hole cards of both players,
+            only needed to settle showdowns.
+    '''
+    __slots__ = (
+        'stacks', 'bets', 'phase', 'current_player', 'last_aggresive_player',
+        'board', 'actions', 'initial_player', 'blind', 'holes',
+        '_history', '_depth'
+    )
+
+    def __init__(
+        self,
+        stacks: tuple[int, int] = (1000, 1000),
+        blind: int = 10,
+        initial_player: int = 0,
+        holes: tuple[int, int] = (0, 0)
+    ):
+        other = 1 - initial_player
+        self.stacks = list(stacks)
+        self.bets = [0, 0]
+        self.stacks[initial_player] -= blind // 2
+        self.stacks[other] -= blind
+        self.bets[initial_player] = blind // 2
+        self.bets[other] = blind
+        self.phase = GamePhase.PRE_FLOP
+        self.current_player = initial_player
+        self.last_aggresive_player = other
+        # Mask of the board cards
+        self.board = 0
+        # Actions taken on the current street
+        self.actions = 0
+        self.initial_player = initial_player
+        self.blind = blind
+        self.holes = list(holes)
+        self._history = [None] * (_SAVED * 64)
+        self._depth = 0
+        if self.stacks[initial_player] == 0:
+            self._showdown()
+
+    @classmethod
+    def at_street(
+        cls,
+        phase: GamePhase,
+        stacks: tuple[int, int],
+        bets: tuple[int, int],
+        blind: int = 10,
+        initial_player: int = 0,
+        holes: tuple[int, int] = (0, 0),
+        last_aggresive_player: int | None = None
+    ) -> 'GameState':
+        '''
+        Return the state at the start of a street after the pre-flop, going
+        straight to the showdown if a player is all-in.
+        Args:
+            phase (GamePhase): The street.
+            stacks (tuple[int, int]): The money both players have left.
+            bets (tuple[int, int]): The bets both players made on earlier
+                streets, which must be equal.
+            blind (int): The big blind.
+            initial_player (int): The player who acts first on every street.
+            holes (tuple[int, int]): The masks of the hole cards of both
+                players, only needed to settle showdowns.
+            last_aggresive_player (int | None): The player who shows first
+                at the showdown, the other player if not provided.
+        '''
+        if bets[0] != bets[1]:
+            raise ValueError('Bets must be equal at the start of a street.')
+        # Without blinds nothing is posted
+        state = cls(stacks, 0, initial_player, holes)
+        state.bets = list(bets)
+        state.blind = blind
+        state.phase = phase
+        state.actions = 0
+        state.current_player = initial_player
+        if last_aggresive_player is not None:
+            state.last_aggresive_player = last_aggresive_player
+        if not (stacks[0] and stacks[1]):
+            state._showdown()
+        return state
+
+    def legal_actions(self) -> tuple[ActionType, ...]:
+        '''Return the actions the current player can take, as one of a few
+        constant tuples.'''
+        phase = self.phase
+        if phase is GamePhase.FINISHED:
+            return _NO_ACTIONS
+        if phase is GamePhase.SHOWDOWN:
+            return _SHOWDOWN_ACTIONS
+        player = self.current_player
+        bets = self.bets
+        can_check = bets[player] >= bets[1 - player]
+        can_raise = self.stacks[player] + bets[player] > bets[1 - player]
+        return _BETTING_ACTIONS[2 * can_check + can_raise]
+
+    def apply(self, action_type: ActionType, value: int = 0) -> int:
+        '''
+        Apply an action of the current player.
+        Args:
+            action_type (ActionType): The type of the action.
+            value (int): The amount to raise by, for raises.
+
+        Returns:
+            int: The token to undo the action with.
+        '''
+        phase = self.phase
+        player = self.current_player
+        other = 1 - player
+        stacks = self.stacks
+        bets = self.bets
+        if phase is GamePhase.FINISHED:
+            raise ValueError('The hand is already finished.')
+        if (action_type is _MUCK or action_type is _SHOW) != (phase is GamePhase.SHOWDOWN):
+            raise ValueError(f'Cannot {action_type} during {phase}.')
+        if action_type is _CHECK and bets[player] != bets[other]:
+            raise ValueError('Cannot check when the bet is different from the other player\'s bet.')
+        token = self._save()
+
+        if action_type is _FOLD or action_type is _MUCK:
+            stacks[other] += bets[player] + bets[other]
+            self.phase = GamePhase.FINISHED
+            return token
+
+        if action_type is _SHOW:
+            self.actions += 1
+            if self.actions == 2:
+                self._settle()
+            else:
+                self.current_player = other
+            return token
+
+        if action_type is _RAISE:
+            call_bet = bets[other] - bets[player]
+            total_bet = min(value + call_bet, stacks[player])
+            # Cannot raise over all-in in two player game
+            total_bet = min(total_bet, stacks[other] + bets[other])
+            if total_bet - call_bet == 0:
+                action_type = _CALL
+            else:
+                stacks[player] -= total_bet
+                bets[player] += total_bet
+                self.last_aggresive_player = player
+        if action_type is _CALL:
+            amount = bets[other] - bets[player]
+            stacks[player] -= amount
+            bets[player] += amount
+
+        self.actions += 1
+        self.current_player = other
+        # The street ends once both players acted and the bets are matched
+        if self.actions >= 2 and bets[0] == bets[1]:
+            self.actions = 0
+            self.current_player = self.initial_player
+            self.phase = phase.next_phase()
+            if self.phase is GamePhase.SHOWDOWN or not (stacks[0] and stacks[1]):
+                self._showdown()
+        return token
+
+    def deal(self, mask: int) -> int:
+        '''
+        Add some cards to the board.
+        Args:
+            mask (int): The 52-bit mask of the cards.
+
+        Returns:
+            int: The token to undo the deal with.
+        '''
+        token = self._save()
+        self.board |= mask
+        return token
+
+    def undo(self, token: int) -> None:
+        '''Restore the state from before the action or deal that returned
+        the token, and every one after it.'''
+        history = self._history
+        i = token * _SAVED
+        self.stacks[0] = history[i]
+        self.stacks[1] = history[i + 1]
+        self.bets[0] = history[i + 2]
+        self.bets[1] = history[i + 3]
+        self.phase = history[i + 4]
+        self.current_player = history[i + 5]
+        self.last_aggresive_player = history[i + 6]
+        self.board = history[i + 7]
+        self.actions = history[i + 8]
+        self._depth = token
+
+    def _save(self) -> int:
+        depth = self._depth
+        history = self._history
+        i = depth * _SAVED
+        if i == len(history):
+            history.extend([None] * len(history))
+        history[i] = self.stacks[0]
+        history[i + 1] = self.stacks[1]
+        history[i + 2] = self.bets[0]
+        history[i + 3] = self.bets[1]
+        history[i + 4] = self.phase
+        history[i + 5] = self.current_player
+        history[i + 6] = self.last_aggresive_player
+        history[i + 7] = self.board
+        history[i + 8] = self.actions
+        self._depth = depth + 1
+        return depth
+
+    def _showdown(self) -> None:
+        '''Skip to the showdown, where the last aggressor acts first.'''
+        self.phase = GamePhase.SHOWDOWN
+        self.actions = 0
+        self.current_player = self.last_aggresive_player
+
+    def _settle(self) -> None:
+        '''Give the pot to the best hand, or give every bet back on a tie.'''
+        if self.board.bit_count() != 5:
+            raise ValueError('The board must be complete to settle the showdown.')
+        rank0 = rank_mask(self.board | self.holes[0])
+        rank1 = rank_mask(self.board | self.holes[1])
+        stacks = self.stacks
+        bets = self.bets
+        if rank0 == rank1:
+            stacks[0] += bets[0]
+            stacks[1] += bets[1]
+        else:
+            stacks[int(rank0 < rank1)] += bets[0] + bets[1]
+        self.phase = GamePhase.FINISHED
+
+
+if __name__ == '__main__':
+    # Walk the betting tree of a hand with two raise sizes, on a board dealt
+    # in advance
+    # Usage: python -m game_objects.game_state [depth]
+    import sys
+    import time
+
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    state = GameState(holes=(0b11, 0b1100))
+    state.deal(0b11111 << 20)
+
+    def walk(remaining: int) -> int:
+        nodes = 1
+        if not remaining:
+            return nodes
+        for action_type in state.legal_actions():
+            for value in ((20, 100) if action_type is _RAISE else (0,)):
+                token = state.apply(action_type, value)
+                nodes += walk(remaining - 1)
+                state.undo(token)
+        return nodes
+
+    start = time.perf_counter()
+    nodes = walk(depth)
+    elapsed = time.perf_counter() - start
+    print(f'{nodes:,} nodes in {elapsed:.2f}s ({nodes / elapsed:,.0f} nodes/s)')
@@ -3,6 +3,7 @@ from enum import Enum, auto
 from .action import ActionType
 
 from copy import deepcopy
+from typing import NamedTuple
 
 class GamePhase(Enum):
     PRE_FLOP = auto()
@@ -68,4 +69,61 @@ class GameStatus:
         )
         
     def copy(self):
-        return deepcopy(self)
\ No newline at end of file
+        return deepcopy(self)
+
+    def snapshot(self) -> 'StatusSnapshot':
+        '''Return a read-only copy of the status.'''
+        return StatusSnapshot(
+            tuple(self.players_money),
+            self.game_phase,
+            tuple(self.bets),
+            self.initial_player,
+            self.current_player,
+            self.last_aggresive_player,
+            self.blind
+        )
+
+
+class StatusSnapshot(NamedTuple):
+    '''Read-only snapshot of a GameStatus, with the same queries.'''
+    players_money: tuple[int, int]
+    game_phase: GamePhase
+    bets: tuple[int, int]
+    initial_player: int
+    current_player: int
+    last_aggresive_player: int
+    blind: int
+
+    get_valid_actions = GameStatus.get_valid_actions
+    __str__ = GameStatus.__str__
+
+    def copy(self) -> GameStatus:
+        '''Return a mutable copy of the status.'''
+        status = GameStatus(*self.players_money, self.blind)
+        status.game_phase = self.game_phase
+        status.bets = list(self.bets)
+        status.initial_player = self.initial_player
+        status.current_player = self.current_player
+        status.last_aggresive_player = self.last_aggresive_player
+        return status
+
+
+if __name__ == '__main__':
+    # Per action cost of handing the board and status to a player
+    # Usage: python -m game_objects.game_status
+    import timeit
+
+    from .board import Board
+    from .card import Card
+    from .color import Color
+
+    board = Board()
+    board.flop(Card(1, Color.SPADES), Card(7, Color.HEARTS), Card(11, Color.CLUBS))
+    status = GameStatus(1000, 1000, 10)
+    n = 100_000
+    for name, statement in (
+        ('deepcopy', lambda: (board.copy(), status.copy())),
+        ('snapshot', lambda: (board.snapshot(), status.snapshot()))
+    ):
+        seconds = timeit.timeit(statement, number=n)
+        print(f'{name}: {seconds / n * 1e6:.2f} us per action')
@@ -1,25 +1,51 @@
-from typing import Collection
+from typing import Collection, Iterator, Self
 from collections import Counter
 
 from .card import Card
 from .color import Color
 
-class HoleCards(frozenset):
+class HoleCards:
     '''Your hole cards in a game of Texas Hold'em, also known as pocket hands or
-    private cards.'''
+    private cards.
+
+    A thin view over the 52-bit mask of the two cards.
+    '''
+    __slots__ = ('cards', 'mask')
+
     def __init__(self, cards: Collection[Card]):
-        if len(cards) != 2:
+        cards = tuple(cards)
+        mask = 0
+        for card in cards:
+            mask |= card.mask
+        if len(cards) != 2 or mask.bit_count() != 2:
             raise ValueError(f'Hole cards must amount to 2 cards not {len(cards)}')
-        super().__new__(frozenset, cards)
+        self.cards = cards
+        self.mask = mask
+
+    def __iter__(self) -> Iterator[Card]:
+        return iter(self.cards)
+
+    def __len__(self) -> int:
+        return 2
+
+    def __contains__(self, card: Card) -> bool:
+        return isinstance(card, Card) and bool(self.mask & card.mask)
+
+    def __eq__(self, other: Self) -> bool:
+        return isinstance(other, HoleCards) and self.mask == other.mask
+
+    def __hash__(self) -> int:
+        return self.mask
 
     def __str__(self) -> str:
         return ' '.join(map(str, self))
 
     def __repr__(self) -> str:
         return f'HoleCards({str(list(self))})'
-    
-    def color_count(self) -> Counter[Color]:
-        '''Return the number of cards in the hand with the given color.'''
-        return Counter(card.color for card in self)
-    
-    
\ No newline at end of file
+
+    def color_count(self, color: Color | None = None) -> Counter[Color] | int:
+        '''Return the number of cards in the hand with the given color, or
+        the count of every color if no color is provided.'''
+        if color is not None:
+            return sum(card.color == color for card in self.cards)
+        return Counter(card.color for card in self.cards)
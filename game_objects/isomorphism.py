@@ -0,0 +1,150 @@
+'''
+Suit isomorphism.
+
+Situations that only differ by a permutation of the suits are equivalent,
+e.g. A♠️ K♠️ on 2♥️ 7♥️ 9♣️ and A♥️ K♥️ on 2♠️ 7♠️ 9♦️. The canonical form
+of a situation relabels the suits sorting them by the ranks they hold in
+each group of cards, so every equivalent situation maps to the same masks.
+
+Permutations are tuples mapping every suit to its canonical suit.
+'''
+from functools import lru_cache
+from itertools import combinations
+
+from .card import Card, N_CARDS, N_RANKS, N_SUITS, RANK_MASK
+from .board import Board
+from .hole_cards import HoleCards
+
+IDENTITY = tuple(range(N_SUITS))
+
+
+def suit_permutation(*masks: int) -> tuple[int, ...]:
+    '''
+    Return the permutation to the canonical suits of some groups of cards.
+    Suits are sorted by the ranks they hold in the first group, then in the
+    second one and so on, so the order of the groups matters.
+    Args:
+        masks: The 52-bit masks of every group of cards.
+
+    Returns:
+        tuple[int, ...]: The canonical suit of every suit.
+    '''
+    signatures = [
+        tuple((mask >> suit * N_RANKS) & RANK_MASK for mask in masks)
+        for suit in range(N_SUITS)
+    ]
+    order = sorted(range(N_SUITS), key=signatures.__getitem__, reverse=True)
+    permutation = [0] * N_SUITS
+    for canonical, suit in enumerate(order):
+        permutation[suit] = canonical
+    return tuple(permutation)
+
+def permute_mask(mask: int, permutation: tuple[int, ...]) -> int:
+    '''Move the cards of every suit of a mask to the suit it maps to.'''
+    return (
+        (mask & RANK_MASK) << permutation[0] * N_RANKS
+        | (mask >> N_RANKS & RANK_MASK) << permutation[1] * N_RANKS
+        | (mask >> 2 * N_RANKS & RANK_MASK) << permutation[2] * N_RANKS
+        | (mask >> 3 * N_RANKS) << permutation[3] * N_RANKS
+    )
+
+def inverse(permutation: tuple[int, ...]) -> tuple[int, ...]:
+    '''Return the permutation that undoes another.'''
+    result = [0] * N_SUITS
+    for suit, canonical in enumerate(permutation):
+        result[canonical] = suit
+    return tuple(result)
+
+def permute_card(card: Card, permutation: tuple[int, ...]) -> Card:
+    '''Return the card with its suit mapped by a permutation.'''
+    return Card.from_index(permutation[card.suit] * N_RANKS + card.rank)
+
+def canonical_masks(*masks: int) -> tuple[tuple[int, ...], tuple[int, ...]]:
+    '''
+    Return the canonical form of some groups of cards.
+    Args:
+        masks: The 52-bit masks of every group of cards, see suit_permutation.
+
+    Returns:
+        tuple[tuple[int, ...], tuple[int, ...]]: The canonical masks of every
+            group and the permutation used.
+    '''
+    permutation = suit_permutation(*masks)
+    return tuple(permute_mask(mask, permutation) for mask in masks), permutation
+
+def canonical_key(hole_cards: HoleCards, board: Board) -> tuple[int, int]:
+    '''Return the canonical hole cards and board masks, equal for any two
+    situations that only differ by a permutation of the suits.'''
+    return canonical_masks(hole_cards.mask, board.mask)[0]
+
+def canonicalize(
+    hole_cards: HoleCards,
+    board: Board
+) -> tuple[HoleCards, Board, tuple[int, ...]]:
+    '''
+    Map some hole cards and board to their canonical form. The board is
+    treated as a set of cards, but the canonical board keeps every card in
+    the street it was dealt.
+    Args:
+        hole_cards (HoleCards): The player hand.
+        board (Board): The board, regardless how many cards it has.
+
+    Returns:
+        tuple[HoleCards, Board, tuple[int, ...]]: The canonical hole cards and
+            board, and the permutation used.
+    '''
+    permutation = suit_permutation(hole_cards.mask, board.mask)
+    canonical_hole_cards = HoleCards([permute_card(card, permutation) for card in hole_cards])
+    canonical_board = Board()
+    canonical_board[:] = [
+        card and permute_card(card, permutation) for card in board
+    ]
+    return canonical_hole_cards, canonical_board, permutation
+
+
+# Canonical boards, as sets of cards
+
+@lru_cache(maxsize=None)
+def canonical_boards(n_cards: int) -> tuple[int, ...]:
+    '''
+    Return the canonical masks of the boards with some number of cards in
+    increasing order: 1,755 flops, 16,432 turns and 134,459 rivers.
+    Args:
+        n_cards (int): The number of cards of the boards, from 3 to 5.
+
+    Returns:
+        tuple[int, ...]: The canonical board masks.
+    '''
+    if n_cards == 3:
+        return tuple(sorted({
+            canonical_masks((1 << c0) | (1 << c1) | (1 << c2))[0][0]
+            for c0, c1, c2 in combinations(range(N_CARDS), 3)
+        }))
+    boards = set()
+    for board in canonical_boards(n_cards - 1):
+        for card in range(N_CARDS):
+            if not board >> card & 1:
+                boards.add(canonical_masks(board | 1 << card)[0][0])
+    return tuple(sorted(boards))
+
+@lru_cache(maxsize=None)
+def _board_indices(n_cards: int) -> dict[int, int]:
+    return {board: index for index, board in enumerate(canonical_boards(n_cards))}
+
+def board_index(board: Board) -> int:
+    '''
+    Return the index of the canonical form of a board among the boards with
+    the same number of cards. The tables of turns and rivers are built on
+    first use, which takes a few seconds for the rivers.
+    Args:
+        board (Board): The board, with 3 to 5 cards.
+
+    Returns:
+        int: The index of the canonical board.
+    '''
+    return _board_indices(len(board))[canonical_masks(board.mask)[0][0]]
+
+def flop_index(board: Board) -> int:
+    '''Return the index of the canonical flop of a board, from 0 to 1,754.'''
+    flop = board[0].mask | board[1].mask | board[2].mask
+    return _board_indices(3)[canonical_masks(flop)[0][0]]
@@ -0,0 +1,397 @@
+'''
+Replay of recorded hands through the engine rules.
+
+Every recorded action becomes a Decision record with the state the player
+saw, the legal actions, the action taken and, optionally, the equity of the
+player's hand at that moment.
+
+The engine plays heads-up, so only the hands where exactly two players see
+the flop are checked against it, from the flop on. The pre-flop is taken
+from the record: the money the two players put in becomes their bets and
+what the players who folded put in is dead money that goes to the winner.
+From the flop on every recorded action drives a GameState, the compact form
+of the rules of Game.process_action and Game.play_round, and is checked
+against it: the player must be the one the engine expects to act and the
+action must be legal. At the showdown both hands are shown and the engine
+awards the pot. At the end the winners and the stacks the engine settles on
+are compared with the ones in the record, and any difference is reported as
+a Mismatch. The pre-flop actions, and every action of the other hands, follow
+the record alone and are marked as not validated.
+
+Usage: python replay.py [files or folders] [--workers N] [--no-equity]
+'''
+import os
+import time
+from multiprocessing import Pool
+from typing import Iterable, NamedTuple
+
+from datasets import Hand, HandAction, MalformedHand, hand_history_files, parse_file
+from game_objects import ActionType, Board, Card, GamePhase, GameState, HoleCards, cards_to_mask, rank_mask
+from stats.incremental import HandEquity
+
+# Tolerance when comparing stacks, split pots are paid in halves
+_EPSILON = 1e-6
+
+
+class Decision(NamedTuple):
+    '''
+    A recorded action and the state it was taken in. Stacks and bets are
+    those of the player and then of the opponent, the one with the largest
+    bet among those still in the hand when there are several, and the pot
+    includes the money of every player. The equity is against a random hand,
+    None if not computed. validated is whether the engine checked the
+    action, which it only does from the flop on in hands that are heads-up
+    from the flop.
+    '''
+    hand_id: int
+    street: GamePhase
+    player: str
+    hole_cards: tuple[Card, Card] | None
+    board: tuple[Card, ...]
+    stacks: tuple[int, int]
+    bets: tuple[int, int]
+    pot: int
+    legal_actions: tuple[ActionType, ...]
+    action_type: ActionType
+    value: int
+    winrate: float | None
+    lose_rate: float | None
+    validated: bool
+
+
+class Mismatch(NamedTuple):
+    '''A hand the engine disagrees with the record about.'''
+    source: str
+    hand_id: int
+    message: str
+
+
+class ReplayResult(NamedTuple):
+    '''The hands parsed and the ones checked against the engine, the
+    decisions of every hand and the hands that could not be parsed or that
+    the engine disagrees with.'''
+    hands: int
+    replayed: int
+    decisions: list[Decision]
+    mismatches: list[Mismatch]
+    malformed: list[MalformedHand]
+    seconds: float
+
+
+def heads_up_players(hand: Hand) -> tuple[str, str] | None:
+    '''Return the two players who see the flop, in seat order, or None if
+    the hand is not heads-up from the flop.'''
+    if len(hand.board) < 3:
+        return None
+    folded = {
+        action.player
+        for action in hand.actions
+        if action.street is GamePhase.PRE_FLOP and action.action_type is ActionType.FOLD
+    }
+    players = tuple(player for player in hand.players if player not in folded)
+    return players if len(players) == 2 else None
+
+
+# Legal actions while betting, by whether the player can check and raise
+_BETTING_ACTIONS = (
+    (ActionType.FOLD, ActionType.CALL),
+    (ActionType.FOLD, ActionType.CALL, ActionType.RAISE),
+    (ActionType.FOLD, ActionType.CHECK),
+    (ActionType.FOLD, ActionType.CHECK, ActionType.RAISE)
+)
+_SHOWDOWN_ACTIONS = (ActionType.MUCK, ActionType.SHOW)
+# Board cards seen on every street
+_BOARD_CARDS = {GamePhase.PRE_FLOP: 0, GamePhase.FLOP: 3, GamePhase.TURN: 4}
+
+
+def _board(cards: tuple[Card, ...]) -> Board:
+    board = Board()
+    if not cards:
+        return board
+    board.flop(*cards[:3])
+    if len(cards) > 3:
+        board.turn(cards[3])
+    if len(cards) > 4:
+        board.river(cards[4])
+    return board
+
+
+def _recorded_decisions(
+    hand: Hand,
+    actions: Iterable[HandAction],
+    calculators: dict[str, HandEquity]
+) -> list[Decision]:
+    '''Return the decisions of some actions of a hand, from the start of
+    the hand, as the record has them.'''
+    put_in = dict.fromkeys(hand.players, 0)
+    for player, amount in hand.posts:
+        put_in[player] += amount
+    stacks = {player: stack - put_in[player] for player, stack in zip(hand.players, hand.stacks)}
+    folded = set()
+    decisions = []
+    for action in actions:
+        player = action.player
+        # The opponent is the one the player has to match
+        opponent = max(
+            (other for other in hand.players if other != player and other not in folded),
+            key=put_in.__getitem__,
+            default=player
+        )
+        if action.action_type is ActionType.SHOW or action.action_type is ActionType.MUCK:
+            legal = _SHOWDOWN_ACTIONS
+        else:
+            to_call = put_in[opponent] - put_in[player]
+            legal = _BETTING_ACTIONS[2 * (to_call <= 0) + (stacks[player] > to_call)]
+        value = 0
+        if action.action_type is ActionType.RAISE:
+            value = action.amount - max(put_in[opponent] - put_in[player], 0)
+        board = hand.board[:_BOARD_CARDS.get(action.street, 5)]
+        winrate = lose_rate = None
+        if player in calculators:
+            winrate, lose_rate = calculators[player].equity(_board(board))
+        decisions.append(Decision(
+            hand.hand_id,
+            action.street,
+            player,
+            hand.hole_cards[hand.players.index(player)],
+            board,
+            (stacks[player], stacks[opponent]),
+            (put_in[player], put_in[opponent]),
+            sum(put_in.values()),
+            legal,
+            action.action_type,
+            value,
+            winrate,
+            lose_rate,
+            False
+        ))
+        put_in[player] += action.amount
+        stacks[player] -= action.amount
+        if action.action_type is ActionType.FOLD:
+            folded.add(player)
+    return decisions
+
+
+def replay_hand(hand: Hand, *, equity: bool = True) -> tuple[list[Decision], str | None]:
+    '''
+    Replay a hand, checking it against the engine from the flop on if it is
+    heads-up from the flop.
+    Args:
+        hand (Hand): The hand.
+        equity (bool): Whether to compute the equity of every decision.
+
+    Returns:
+        tuple[list[Decision], str | None]: The decisions of every action, up
+            to the first one the engine disagrees with, and what it
+            disagrees about, None if the replay matches the record or the
+            hand is not checked.
+    '''
+    calculators = {
+        player: HandEquity(HoleCards(cards))
+        for player, cards in zip(hand.players, hand.hole_cards)
+        if equity and cards
+    }
+    players = heads_up_players(hand)
+    if players is None:
+        return _recorded_decisions(hand, hand.actions, calculators), None
+    preflop = [action for action in hand.actions if action.street is GamePhase.PRE_FLOP]
+    decisions = _recorded_decisions(hand, preflop, calculators)
+    # Decisions from here on are checked by the engine
+    checked = len(decisions)
+    seats = {player: i for i, player in enumerate(players)}
+    holes = [hand.hole_cards[hand.players.index(player)] for player in players]
+
+    # Money put in pre-flop, by the two players and by everyone else
+    put_in = dict.fromkeys(hand.players, 0)
+    for player, amount in hand.posts:
+        put_in[player] += amount
+    last_raiser = None
+    for action in hand.actions:
+        if action.street is GamePhase.PRE_FLOP:
+            put_in[action.player] += action.amount
+            if action.action_type is ActionType.RAISE and action.player in seats:
+                last_raiser = seats[action.player]
+    # The excess of an all-in nobody could call is returned
+    bet = min(put_in[player] for player in players)
+    dead = sum(amount for player, amount in put_in.items() if player not in seats)
+    starts = [hand.stacks[hand.players.index(player)] for player in players]
+
+    # The first player after the button acts first after the flop
+    after_button = [hand.seats[hand.players.index(player)] > hand.button for player in players]
+    initial_player = after_button.index(True) if any(after_button) else 0
+    state = GameState.at_street(
+        GamePhase.FLOP,
+        (starts[0] - bet, starts[1] - bet),
+        (bet, bet),
+        hand.big_blind,
+        initial_player,
+        tuple(cards_to_mask(cards or ()) for cards in holes),
+        last_raiser
+    )
+    state.deal(cards_to_mask(hand.board))
+
+    postflop = [action for action in hand.actions if action.street is not GamePhase.PRE_FLOP]
+    for action in postflop:
+        if action.street is GamePhase.SHOWDOWN:
+            break
+        if state.phase is not action.street:
+            return decisions, f'The engine is on the {state.phase}, the record on the {action.street}'
+        player = seats[action.player]
+        if player != state.current_player:
+            return decisions, f'{action.player} acts on the {action.street} out of turn'
+        legal = state.legal_actions()
+        if action.action_type not in legal:
+            return decisions, f'{action.action_type} by {action.player} on the {action.street} is not legal'
+        value = 0
+        if action.action_type is ActionType.RAISE:
+            value = action.amount - (state.bets[1 - player] - state.bets[player])
+        decisions.append(_decision(hand, state, players, holes, calculators, dead, legal, action.action_type, value))
+        state.apply(action.action_type, value)
+
+    if state.phase is GamePhase.SHOWDOWN:
+        if None in holes:
+            return decisions, 'The engine reaches the showdown without both hands'
+        # Both hands are known, so both are shown and the engine decides
+        # who wins, whatever the record says was shown
+        while state.phase is GamePhase.SHOWDOWN:
+            decisions.append(_decision(hand, state, players, holes, calculators, dead, state.legal_actions(), ActionType.SHOW, 0))
+            state.apply(ActionType.SHOW)
+    if state.phase is not GamePhase.FINISHED:
+        return decisions, f'The hand is not finished for the engine, which is on the {state.phase}'
+
+    # The dead money, less the rake, goes to the winners of the engine
+    if len(decisions) > checked and decisions[-1].action_type is ActionType.FOLD:
+        winners = [1 - seats[decisions[-1].player]]
+    else:
+        ranks = [rank_mask(state.board | hole) for hole in state.holes]
+        winners = [i for i in (0, 1) if ranks[i] == max(ranks)]
+    collectors = sorted({seats[player] for player, _ in hand.collected if player in seats})
+    if winners != collectors:
+        return decisions, (
+            f'The engine gives the pot to {[players[i] for i in winners]}, '
+            f'the record to {[players[i] for i in collectors]}'
+        )
+    expected = list(state.stacks)
+    for winner in winners:
+        expected[winner] += (dead - hand.rake) / len(winners)
+
+    recorded = list(starts)
+    for player, amount in hand.posts:
+        if player in seats:
+            recorded[seats[player]] -= amount
+    for action in hand.actions:
+        if action.player in seats:
+            recorded[seats[action.player]] -= action.amount
+    for player, amount in (*hand.returned, *hand.collected):
+        if player in seats:
+            recorded[seats[player]] += amount
+    if any(abs(a - b) > _EPSILON for a, b in zip(expected, recorded)):
+        return decisions, f'The engine ends with stacks {expected}, the record with {recorded}'
+    return decisions, None
+
+
+def _decision(
+    hand: Hand,
+    state: GameState,
+    players: tuple[str, str],
+    holes: list,
+    calculators: dict[str, HandEquity],
+    dead: int,
+    legal: tuple[ActionType, ...],
+    action_type: ActionType,
+    value: int
+) -> Decision:
+    player = state.current_player
+    other = 1 - player
+    board = hand.board[:_BOARD_CARDS.get(state.phase, 5)]
+    winrate = lose_rate = None
+    if players[player] in calculators:
+        winrate, lose_rate = calculators[players[player]].equity(_board(board))
+    return Decision(
+        hand.hand_id,
+        state.phase,
+        players[player],
+        holes[player],
+        board,
+        (state.stacks[player], state.stacks[other]),
+        (state.bets[player], state.bets[other]),
+        state.bets[0] + state.bets[1] + dead,
+        legal,
+        action_type,
+        value,
+        winrate,
+        lose_rate,
+        True
+    )
+
+
+def _replay_file(task: tuple[str, bool]) -> tuple[int, int, list[Decision], list[Mismatch], list[MalformedHand]]:
+    path, equity = task
+    hands = replayed = 0
+    decisions, mismatches, malformed = [], [], []
+    for hand in parse_file(path, malformed):
+        hands += 1
+        replayed += heads_up_players(hand) is not None
+        hand_decisions, message = replay_hand(hand, equity=equity)
+        decisions.extend(hand_decisions)
+        if message is not None:
+            mismatches.append(Mismatch(path, hand.hand_id, message))
+    return hands, replayed, decisions, mismatches, malformed
+
+
+def replay(
+    paths: Iterable[str],
+    *,
+    workers: int | None = None,
+    equity: bool = True
+) -> ReplayResult:
+    '''
+    Replay the hands of some hand history files across a pool of
+    processes, one file at a time per process, see replay_hand.
+    Args:
+        paths (Iterable[str]): The hand history files.
+        workers (int | None): The number of processes, one per core if not
+            provided.
+        equity (bool): Whether to compute the equity of every decision.
+
+    Returns:
+        ReplayResult: The number of hands parsed and checked against the
+            engine, the decisions in file order, the hands the engine
+            disagrees with and the hands that could not be parsed.
+    '''
+    tasks = [(path, equity) for path in paths]
+    hands = replayed = 0
+    decisions, mismatches, malformed = [], [], []
+    start = time.perf_counter()
+    if tasks:
+        with Pool(min(workers or os.cpu_count(), len(tasks))) as pool:
+            for result in pool.imap(_replay_file, tasks):
+                hands += result[0]
+                replayed += result[1]
+                decisions.extend(result[2])
+                mismatches.extend(result[3])
+                malformed.extend(result[4])
+    return ReplayResult(hands, replayed, decisions, mismatches, malformed, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Replay recorded hands through the engine rules.')
+    parser.add_argument('paths', nargs='*', help='hand history files or folders')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--no-equity', action='store_true', help='skip the equity of every decision')
+    arguments = parser.parse_args()
+
+    paths = []
+    for argument in arguments.paths or [os.path.join(os.path.dirname(__file__), 'datasets', 'full_datasets')]:
+        paths.extend(hand_history_files(argument) if os.path.isdir(argument) else [argument])
+    result = replay(paths, workers=arguments.workers, equity=not arguments.no_equity)
+    print(
+        f'{result.hands} hands replayed in {result.seconds:.1f}s '
+        f'({result.hands / result.seconds:,.0f} hands/s), {len(result.decisions)} decisions, '
+        f'{result.replayed} hands checked against the engine'
+    )
+    print(f'{len(result.mismatches)} mismatches, {len(result.malformed)} malformed hands')
+    for mismatch in result.mismatches[:10]:
+        print(f'  {mismatch.source} #{mismatch.hand_id}: {mismatch.message}')
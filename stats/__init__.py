@@ -1,5 +1,33 @@
-from .equity import calculate_equity
+from .equity import calculate_equity, better_equity_calculator
+from .batch import evaluate_many, rank_many
+from .preflop import preflop_equity, preflop_matchup
+from .flops import flop_equity
+from .cache import EquityCache, equity_cache
+from .adaptive import adaptive_equity, AdaptiveEquity
+from .multiway import multiway_equity, MultiwayEquity
+from .strength import hand_strength, HandStrength
+from .incremental import HandEquity
+from .ranges import parse_range, combo_equities, range_equity, hand_equity
 
 __all__ = [
-    'calculate_equity'
-]
\ No newline at end of file
+    'calculate_equity',
+    'better_equity_calculator',
+    'evaluate_many',
+    'rank_many',
+    'preflop_equity',
+    'preflop_matchup',
+    'flop_equity',
+    'EquityCache',
+    'equity_cache',
+    'adaptive_equity',
+    'AdaptiveEquity',
+    'multiway_equity',
+    'MultiwayEquity',
+    'hand_strength',
+    'HandStrength',
+    'HandEquity',
+    'parse_range',
+    'combo_equities',
+    'range_equity',
+    'hand_equity'
+]
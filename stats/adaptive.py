@@ -0,0 +1,126 @@
+'''
+Adaptive Monte Carlo equity.
+
+Simulations run in batches and stop as soon as the estimate is precise
+enough, the time budget runs out, or the confidence intervals are clear of
+every threshold the caller decides on, so obvious spots are settled with a
+fraction of the samples.
+'''
+import random
+import time
+from math import sqrt
+from statistics import NormalDist
+from typing import Collection, NamedTuple
+
+from game_objects import Board, HoleCards
+from .equity import simulate
+
+
+class AdaptiveEquity(NamedTuple):
+    '''The result of adaptive_equity. stopped_by is either "precision",
+    "thresholds", "time" or "max_simulations".'''
+    winrate: float
+    lose_rate: float
+    simulations: int
+    win_interval: tuple[float, float]
+    lose_interval: tuple[float, float]
+    stopped_by: str
+
+
+def wilson_interval(successes: int, trials: int, z: float) -> tuple[float, float]:
+    '''Return the Wilson score interval of a binomial proportion.'''
+    if not trials:
+        return 0.0, 1.0
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    margin = z * sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(center - margin, 0.0), min(center + margin, 1.0)
+
+def _clear_of(interval: tuple[float, float], thresholds: Collection[float]) -> bool:
+    low, high = interval
+    return not any(low <= threshold <= high for threshold in thresholds)
+
+def adaptive_equity(
+    hole_cards: HoleCards,
+    board: Board,
+    *,
+    target_error: float | None = 0.01,
+    time_budget: float | None = None,
+    thresholds: Collection[float] = (),
+    lose_thresholds: Collection[float] = (),
+    confidence: float = 0.95,
+    batch_size: int = 100,
+    max_simulations: int = 100_000,
+    seed: int | None = None
+) -> AdaptiveEquity:
+    '''
+    Calculate the equity of the player hand against a random opponent hand,
+    simulating only until the result is good enough.
+    Args:
+        hole_cards (HoleCards): The player hand.
+        board (Board): The board, regardless how many cards it has.
+        target_error (float | None): Stop once the standard error of both the
+            winrate and the lose rate is below this.
+        time_budget (float | None): Stop after this many seconds.
+        thresholds (Collection[float]): Winrates the caller decides on. Stop
+            once the confidence interval of the winrate contains none of them
+            and the one of the lose rate none of lose_thresholds.
+        lose_thresholds (Collection[float]): Lose rates the caller decides on.
+        confidence (float): The confidence level of the intervals.
+        batch_size (int): The number of simulations between checks.
+        max_simulations (int): Never run more simulations than this.
+        seed (int | None): The seed of the simulations, the global random
+            generator is used if not provided.
+
+    Returns:
+        AdaptiveEquity: The winrate and lose rate, the number of simulations
+            used, the confidence intervals and the reason to stop.
+    '''
+    if target_error is None and time_budget is None and not (thresholds or lose_thresholds):
+        raise ValueError('Provide a target error, a time budget or some thresholds.')
+    if max_simulations <= 0 or batch_size <= 0:
+        raise ValueError('max_simulations and batch_size must be positive.')
+    rng = random.Random(seed) if seed is not None else None
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    deadline = time.perf_counter() + time_budget if time_budget is not None else None
+
+    wins = losses = simulations = 0
+    while True:
+        batch = min(batch_size, max_simulations - simulations)
+        batch_wins, batch_losses = simulate(hole_cards, board, batch, rng)
+        wins += batch_wins
+        losses += batch_losses
+        simulations += batch
+
+        win_interval = wilson_interval(wins, simulations, z)
+        lose_interval = wilson_interval(losses, simulations, z)
+        winrate = wins / simulations
+        lose_rate = losses / simulations
+
+        # The standard errors are read from the intervals, which unlike the
+        # plain binomial ones do not vanish when nothing has been lost yet
+        win_error = (win_interval[1] - win_interval[0]) / (2 * z)
+        lose_error = (lose_interval[1] - lose_interval[0]) / (2 * z)
+
+        stopped_by = None
+        if target_error is not None and max(win_error, lose_error) <= target_error:
+            stopped_by = 'precision'
+        elif (thresholds or lose_thresholds) \
+                and _clear_of(win_interval, thresholds) \
+                and _clear_of(lose_interval, lose_thresholds):
+            stopped_by = 'thresholds'
+        elif deadline is not None and time.perf_counter() >= deadline:
+            stopped_by = 'time'
+        elif simulations >= max_simulations:
+            stopped_by = 'max_simulations'
+
+        if stopped_by:
+            return AdaptiveEquity(
+                winrate,
+                lose_rate,
+                simulations,
+                win_interval,
+                lose_interval,
+                stopped_by
+            )
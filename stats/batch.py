@@ -0,0 +1,123 @@
+'''
+Vectorized hand evaluation with NumPy.
+
+Cards are the ints from 0 to 51 of game_objects.card (``suit * 13 + rank``)
+and the ranks are the same as game_objects.evaluator.rank_mask, so both can
+be mixed freely.
+'''
+import numpy as np
+
+from game_objects.card import N_RANKS, N_SUITS
+from game_objects.evaluator import FLUSH_TABLE, MULTISET_SPREADS, MULTISET_RANKS
+
+_FLUSH = np.frombuffer(FLUSH_TABLE, dtype=np.uint16)
+_SPREADS = np.frombuffer(MULTISET_SPREADS, dtype=np.uint64)
+_RANKS = np.frombuffer(MULTISET_RANKS, dtype=np.uint16)
+
+# Face keys: the sums of up to seven of them with at most four of each are
+# unique for a given number of cards, and small enough to index a flat table.
+_FACE_KEYS = np.array(
+    [0, 1, 5, 22, 98, 453, 2031, 8698, 22854, 83661, 262349, 636345, 1479181],
+    dtype=np.int32
+)
+
+# Per card contributions to the rank multiset key, the suit counts (one byte
+# per suit) and the rank mask of its suit
+_CARD_KEYS = np.array([_FACE_KEYS[card % N_RANKS] for card in range(52)], dtype=np.int32)
+_CARD_SUITS = np.array([1 << 8 * (card // N_RANKS) for card in range(52)], dtype=np.uint32)
+_CARD_BITS = np.array([1 << card % N_RANKS for card in range(52)], dtype=np.uint16)
+
+_rank_tables: dict[int, np.ndarray] = {}
+
+def _rank_table(n_cards: int) -> np.ndarray:
+    '''Return the table from face key to rank for hands of n_cards cards
+    without a flush, building it on first use.'''
+    table = _rank_tables.get(n_cards)
+    if table is None:
+        # Decode the rank counts of every multiset from its 3-bit spread
+        shifts = np.arange(N_RANKS, dtype=np.uint64) * np.uint64(3)
+        counts = (_SPREADS[:, None] >> shifts) & np.uint64(7)
+        counts = counts.astype(np.int64)
+        sizes = counts.sum(axis=1)
+        keys = counts[sizes == n_cards] @ _FACE_KEYS.astype(np.int64)
+        table = np.zeros(keys.max() + 1, dtype=np.uint16)
+        table[keys] = _RANKS[sizes == n_cards]
+        assert np.count_nonzero(table) == len(keys), 'Face keys collide'
+        _rank_tables[n_cards] = table
+    return table
+
+
+def rank_many(cards: np.ndarray) -> np.ndarray:
+    '''
+    Rank many hands at once.
+    Args:
+        cards (np.ndarray): An (N, k) integer array with 5 to 7 distinct cards
+            per row.
+
+    Returns:
+        np.ndarray: An (N,) uint16 array with the strength of every hand from
+            1 to 7462, the higher the better.
+    '''
+    cards = np.asarray(cards, dtype=np.intp)
+    if cards.ndim != 2 or not 5 <= cards.shape[1] <= 7:
+        raise ValueError(f'Expected an (N, 5..7) array of cards, got {cards.shape}')
+
+    # Every hand as if there were no flush, from its rank multiset
+    ranks = _rank_table(cards.shape[1])[_CARD_KEYS[cards].sum(axis=1)]
+
+    # A suit with 5 cards or more sets the high bit of its byte once 3 is
+    # added to every suit count
+    flushes = (_CARD_SUITS[cards].sum(axis=1, dtype=np.uint32) + 0x03030303) & 0x08080808
+    rows = np.flatnonzero(flushes)
+    if rows.size:
+        flushes = flushes[rows]
+        flush_suits = np.zeros(rows.size, dtype=np.intp)
+        for suit in range(1, N_SUITS):
+            flush_suits[flushes >> (8 * suit + 3) & 1 == 1] = suit
+        flush_cards = cards[rows]
+        in_suit = flush_cards // N_RANKS == flush_suits[:, None]
+        suit_ranks = np.bitwise_or.reduce(
+            np.where(in_suit, _CARD_BITS[flush_cards], 0),
+            axis=1
+        )
+        ranks[rows] = _FLUSH[suit_ranks]
+    return ranks
+
+def evaluate_many(hole_cards: np.ndarray, boards: np.ndarray) -> np.ndarray:
+    '''
+    Rank many (hole cards, board) combinations at once.
+    Args:
+        hole_cards (np.ndarray): An (N, 2) integer array of hole cards.
+        boards (np.ndarray): An (N, 5) integer array of boards. Boards of 3
+            or 4 cards are also accepted.
+
+    Returns:
+        np.ndarray: An (N,) uint16 array with the strength of every hand from
+            1 to 7462, the higher the better.
+    '''
+    return rank_many(np.concatenate((hole_cards, boards), axis=1))
+
+
+if __name__ == '__main__':
+    # Throughput benchmark and cross-check against the scalar evaluator
+    # Usage: python -m stats.batch [number of deals]
+    import sys
+    import time
+
+    from game_objects.evaluator import rank_mask
+
+    n_deals = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    deck = np.tile(np.arange(52, dtype=np.int8), (n_deals, 1))
+    deals = rng.permuted(deck, axis=1)[:, :7].astype(np.intp)
+
+    start = time.perf_counter()
+    ranks = evaluate_many(deals[:, :2], deals[:, 2:])
+    elapsed = time.perf_counter() - start
+    print(f'{n_deals} hands in {elapsed:.3f}s ({n_deals / elapsed:,.0f} hands/s)')
+
+    sample = min(n_deals, 100_000)
+    expected = [rank_mask(sum(1 << int(card) for card in deal)) for deal in deals[:sample]]
+    mismatches = int(np.count_nonzero(ranks[:sample] != np.array(expected)))
+    print(f'{mismatches} mismatches against rank_mask in {sample} hands')
+    sys.exit(bool(mismatches))
@@ -0,0 +1,209 @@
+'''
+Memoization of equity queries.
+
+Situations are keyed by their suit canonical form, so equivalent spots share
+the same entry, together with the method and precision used to compute them.
+The exact enumerations behind the equities from the flop on are kept too, so
+every bot refines the turn and the river from the same flop enumeration.
+'''
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from game_objects import Board, HoleCards
+from game_objects.isomorphism import canonical_key, canonicalize
+from .equity import _runout_masks, calculate_equity, better_equity_calculator, exact_runout_counts
+from .preflop import preflop_equity
+
+CacheKey = tuple[int, int, str, int | None]
+# Runouts as masks, their win, tie and loss counts and the suit permutation
+Runouts = tuple[np.ndarray, np.ndarray, tuple[int, ...]]
+
+METHODS: dict[str, Callable[..., tuple[float, float]]] = {
+    'monte_carlo': lambda hole_cards, board, precision:
+        calculate_equity(hole_cards, board, num_simulations=precision or 1000),
+    'exact': lambda hole_cards, board, precision:
+        better_equity_calculator(hole_cards, board),
+    'preflop': lambda hole_cards, board, precision:
+        preflop_equity(hole_cards),
+}
+
+class EquityCache:
+    '''
+    Thread-safe LRU cache of equities.
+    Args:
+        maxsize (int): The maximum number of entries, the least recently used
+            ones are evicted first.
+        path (str | Path | None): A file to warm the cache from, if it
+            exists, and to write it to with save.
+        runouts_maxsize (int): The maximum number of exact enumerations,
+            which are kept in memory only.
+    '''
+    def __init__(
+        self,
+        maxsize: int = 100_000,
+        path: str | Path | None = None,
+        runouts_maxsize: int = 1000
+    ):
+        if maxsize <= 0 or runouts_maxsize <= 0:
+            raise ValueError('The cache size must be positive.')
+        self.maxsize = maxsize
+        self.runouts_maxsize = runouts_maxsize
+        self.path = Path(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        # Enumerations are counted apart, hits and misses are equity queries
+        self.runout_hits = 0
+        self.runout_misses = 0
+        self._entries: OrderedDict[CacheKey, tuple[float, float]] = OrderedDict()
+        self._runouts: OrderedDict[tuple[int, int], tuple[np.ndarray, np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock()
+        if self.path and self.path.exists():
+            self.load()
+
+    def equity(
+        self,
+        hole_cards: HoleCards,
+        board: Board,
+        method: str = 'exact',
+        precision: int | None = None
+    ) -> tuple[float, float]:
+        '''
+        Return the equity of a hand, computing it only if no equivalent
+        situation has been computed before.
+        Args:
+            hole_cards (HoleCards): The player hand.
+            board (Board): The board, regardless how many cards it has.
+            method (str): One of METHODS.
+            precision (int | None): The number of simulations for Monte Carlo.
+
+        Returns:
+            tuple[float, float]: The winrate and lose rate of the player hand.
+        '''
+        if method not in METHODS:
+            raise ValueError(f'Unknown equity method: {method!r}')
+        key = (*canonical_key(hole_cards, board), method, precision)
+        result = self.get(key)
+        if result is None:
+            # Computed outside the lock so other threads are not blocked
+            result = METHODS[method](hole_cards, board, precision)
+            self.put(key, result)
+        return result
+
+    def get(self, key: CacheKey) -> tuple[float, float] | None:
+        '''Return a stored result, None if there is none.'''
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: CacheKey, result: tuple[float, float]) -> None:
+        '''Store a result, evicting the least recently used entries.'''
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def runouts(self, hole_cards: HoleCards, board: Board) -> Runouts:
+        '''
+        Return the exact enumeration of a hand, see exact_runout_counts,
+        enumerating only if no equivalent situation has been before.
+        Args:
+            hole_cards (HoleCards): The player hand.
+            board (Board): The board with 3, 4 or 5 cards.
+
+        Returns:
+            Runouts: The (R,) uint64 masks of the cards of every runout and
+                the (R, 3) wins, ties and losses on each, both read-only and
+                in the canonical suits of the situation, and the permutation
+                to those suits.
+        '''
+        canonical_hole_cards, canonical_board, permutation = canonicalize(hole_cards, board)
+        key = (canonical_hole_cards.mask, canonical_board.mask)
+        with self._lock:
+            entry = self._runouts.get(key)
+            if entry is not None:
+                self._runouts.move_to_end(key)
+                self.runout_hits += 1
+                return entry[0], entry[1], permutation
+            self.runout_misses += 1
+
+        runouts, counts = exact_runout_counts(canonical_hole_cards, canonical_board)
+        masks = _runout_masks(runouts)
+        # Shared by every caller
+        masks.flags.writeable = False
+        counts.flags.writeable = False
+        with self._lock:
+            self._runouts[key] = (masks, counts)
+            self._runouts.move_to_end(key)
+            while len(self._runouts) > self.runouts_maxsize:
+                self._runouts.popitem(last=False)
+        return masks, counts, permutation
+
+    @property
+    def hit_rate(self) -> float:
+        '''Return the fraction of queries answered from the cache.'''
+        queries = self.hits + self.misses
+        return self.hits / queries if queries else 0.0
+
+    def stats(self) -> dict[str, int | float]:
+        '''Return the size, hits, misses and hit rate of the cache.'''
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'runouts': len(self._runouts),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hit_rate,
+                'runout_hits': self.runout_hits,
+                'runout_misses': self.runout_misses
+            }
+
+    def clear(self) -> None:
+        '''Remove every entry and reset the counters.'''
+        with self._lock:
+            self._entries.clear()
+            self._runouts.clear()
+            self.hits = 0
+            self.misses = 0
+            self.runout_hits = 0
+            self.runout_misses = 0
+
+    def save(self, path: str | Path | None = None) -> None:
+        '''Write the entries to disk, from least to most recently used.'''
+        path = Path(path) if path else self.path
+        if path is None:
+            raise ValueError('No path to save the cache to.')
+        with self._lock:
+            entries = [[*key, *result] for key, result in self._entries.items()]
+        # Write to a temporary file first so a crash never leaves half a cache
+        temporary = path.with_name(path.name + '.tmp')
+        with open(temporary, 'w') as file:
+            json.dump(entries, file)
+        os.replace(temporary, path)
+
+    def load(self, path: str | Path | None = None) -> None:
+        '''Add the entries of a file written by save.'''
+        path = Path(path) if path else self.path
+        with open(path) as file:
+            entries = json.load(file)
+        for hole_mask, board_mask, method, precision, win, lose in entries:
+            self.put((hole_mask, board_mask, method, precision), (win, lose))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared by every bot of the process
+equity_cache = EquityCache()
@@ -1,8 +1,18 @@
-from math import perm, comb
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import chain, combinations
+from math import comb
+
+import numpy as np
 
 from game_objects.board import Board
 from game_objects.deck import Deck
 from game_objects import Deck, Board, HoleCards, GamePhase
+from game_objects.card import N_CARDS
+from game_objects.evaluator import rank_mask
+from .batch import rank_many
 
 # Fast algorithms for copying boards in any state
 def _preflop(board: Board, deck: Deck):
@@ -36,10 +46,89 @@ generate_board_func = {
     
 
 
+def simulate(
+    hole_cards: HoleCards,
+    board: Board,
+    num_simulations: int,
+    rng: random.Random | None = None
+) -> tuple[int, int]:
+    '''
+    Run some simulations against a random opponent hand.
+
+    The live cards are listed once as single bit masks and every simulation
+    only draws the cards it needs with a partial Fisher-Yates shuffle of
+    that same list, so no cards, hands or boards are built in the loop.
+    Args:
+        hole_cards (HoleCards): The player hand.
+        board (Board): The board, regardless how many cards it has.
+        num_simulations (int): The number of simulations to run.
+        rng (random.Random | None): The random generator to deal with, the
+            global one if not provided.
+
+    Returns:
+        tuple[int, int]: The number of wins and losses.
+    '''
+    uniform = (rng or random).random
+    board_mask = board.mask
+    hero_mask = hole_cards.mask
+    dead = board_mask | hero_mask
+    live = [1 << card for card in range(N_CARDS) if not dead >> card & 1]
+    n_live = len(live)
+    missing = 5 - board_mask.bit_count()
+    draws = range(missing + 2)
+
+    wins = losses = 0
+    for _ in range(num_simulations):
+        # Move the drawn cards to the front of the live cards, the list does
+        # not need to be restored since any order is a valid deck
+        for i in draws:
+            j = i + int(uniform() * (n_live - i))
+            live[i], live[j] = live[j], live[i]
+        runout = board_mask
+        for i in range(missing):
+            runout |= live[i]
+        hero_rank = rank_mask(runout | hero_mask)
+        opponent_rank = rank_mask(runout | live[missing] | live[missing + 1])
+        wins += hero_rank > opponent_rank
+        losses += hero_rank < opponent_rank
+    return wins, losses
+
+def _simulate_seeded(
+    hole_cards: HoleCards,
+    board: Board,
+    num_simulations: int,
+    seed: int
+) -> tuple[int, int]:
+    return simulate(hole_cards, board, num_simulations, random.Random(seed))
+
+# One pool per number of workers, so a pool is never shut down while
+# another thread submits to it
+_pools: dict[int, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    '''Return the process pool with some number of workers, reused between
+    calls and threads.'''
+    with _pools_lock:
+        if workers not in _pools:
+            _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+        return _pools[workers]
+
+def worker_seeds(seed: int | None, workers: int) -> list[int]:
+    '''Derive independent seeds for every worker from a single seed.'''
+    sequence = np.random.SeedSequence(seed)
+    return [
+        int(child.generate_state(2, dtype=np.uint64)[0])
+        for child in sequence.spawn(workers)
+    ]
+
 def calculate_equity(
     hole_cards: HoleCards,
     board: Board,
-    num_simulations=1000
+    num_simulations=1000,
+    *,
+    workers: int = 1,
+    seed: int | None = None
 ) -> tuple[float, float]:
     '''
     Calculate the equity of the player hand against a random opponent hand.
@@ -47,71 +136,198 @@ def calculate_equity(
         hole_cards (HoleCards): The player hand.
         board (Board): The board, regardless how many cards it has.
         num_simulations (int): The number of simulations to run.
+        workers (int): The number of processes to split the simulations
+            across. Every worker has its own random generator, derived from
+            the seed.
+        seed (int | None): The seed of the simulations. For a given seed and
+            number of workers the results are always the same. Without a
+            seed a single worker uses the global random generator.
         
     Returns:
         tuple[float, float]: The winrate and lose rate of the player hand.
     '''
+    if workers < 1:
+        raise ValueError('There must be at least one worker.')
 
-    player_cards = list(hole_cards)
-        
-    game_phase = board.status
-    board_f = generate_board_func[game_phase]
-
-    equity_results = []
-    for _ in range(num_simulations):
-        simulation_deck = Deck(existing_cards=player_cards + board)
-        # Generate oponent hand
-        opponent_hand = HoleCards([simulation_deck.deal() for _ in range(2)])
-        # Generate board
-        simmulation_board = board_f(board, simulation_deck)
-        
-        # Evaluate position
-        is_win, winner_idx = simmulation_board.evaluate(hole_cards, opponent_hand)
-        if is_win:
-            equity_results.append(winner_idx == 0)
-            continue
+    if workers == 1 and seed is None:
+        wins, losses = simulate(hole_cards, board, num_simulations)
+    else:
+        seeds = worker_seeds(seed, workers)
+        chunks = [
+            num_simulations // workers + (i < num_simulations % workers)
+            for i in range(workers)
+        ]
+        if workers == 1:
+            results = [_simulate_seeded(hole_cards, board, chunks[0], seeds[0])]
+        else:
+            pool = _get_pool(workers)
+            results = pool.map(
+                _simulate_seeded,
+                [hole_cards] * workers,
+                [board] * workers,
+                chunks,
+                seeds
+            )
+        wins = losses = 0
+        for chunk_wins, chunk_losses in results:
+            wins += chunk_wins
+            losses += chunk_losses
         
     # Calculate both winrate and lose rate since the are not complementary
     # (draw rate)
-    winrate = sum(equity_results) / num_simulations
-    lose_rate = equity_results.count(False) / num_simulations
+    winrate = wins / num_simulations
+    lose_rate = losses / num_simulations
     return winrate, lose_rate
 
+@lru_cache(maxsize=None)
+def _combinations(n: int, r: int) -> np.ndarray:
+    '''Return every r-combination of range(n) as an (C(n, r), r) array.'''
+    flat = np.fromiter(
+        chain.from_iterable(combinations(range(n), r)),
+        dtype=np.intp,
+        count=comb(n, r) * r
+    )
+    return flat.reshape(comb(n, r), r)
+
+def exact_runout_counts(
+    hole_cards: HoleCards,
+    board: Board
+) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Count the wins, ties and losses of the player hand against every
+    opponent hand, separately for every runout of the board.
+
+    The opponent's rank only depends on the set of unknown cards it uses,
+    regardless of which of them are the opponent's hole cards and which
+    complete the board. Each of those sets is ranked once and compared with
+    every way of splitting it between the runout and the opponent hand, for
+    which the player's rank is also computed once per runout.
+    Args:
+        hole_cards (HoleCards): The player hand.
+        board (Board): The board with 3, 4 or 5 cards.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The (R, k) cards of every runout and
+            the (R, 3) number of wins, ties and losses on each of them.
+    '''
+    known = [card.index for card in board if card is not None]
+    if len(known) < 3:
+        raise ValueError('Exact enumeration needs at least the flop.')
+    missing = 5 - len(known)
+    dead = board.mask | hole_cards.mask
+    live = np.array([card for card in range(N_CARDS) if not dead >> card & 1])
+    known = np.array(known, dtype=np.intp)
+    hole = np.array([card.index for card in hole_cards], dtype=np.intp)
+
+    # Hero ranks and runout numbers, indexed by the cards of the runout read
+    # as digits in base 52
+    digits = N_CARDS ** np.arange(missing)
+    runouts = live[_combinations(len(live), missing)]
+    hero_cards = np.concatenate((
+        np.broadcast_to(hole, (len(runouts), 2)),
+        np.broadcast_to(known, (len(runouts), len(known))),
+        runouts
+    ), axis=1)
+    hero_ranks = np.zeros(N_CARDS ** missing, dtype=np.uint16)
+    hero_ranks[runouts @ digits] = rank_many(hero_cards)
+    runout_index = np.zeros(N_CARDS ** missing, dtype=np.intp)
+    runout_index[runouts @ digits] = np.arange(len(runouts))
+
+    # Opponent ranks for every set of unknown cards
+    unknown = live[_combinations(len(live), missing + 2)]
+    opponent_cards = np.concatenate((
+        np.broadcast_to(known, (len(unknown), len(known))),
+        unknown
+    ), axis=1)
+    opponent_ranks = rank_many(opponent_cards)
+
+    counts = np.zeros((len(runouts), 3), dtype=np.int64)
+    for runout in combinations(range(missing + 2), missing):
+        keys = unknown[:, list(runout)] @ digits
+        ranks = hero_ranks[keys]
+        # 0 for a win, 1 for a tie and 2 for a loss
+        results = 1 + (ranks < opponent_ranks).astype(np.intp) - (ranks > opponent_ranks)
+        counts += np.bincount(
+            runout_index[keys] * 3 + results,
+            minlength=3 * len(runouts)
+        ).reshape(-1, 3)
+    return runouts, counts
+
+def _runout_masks(runouts: np.ndarray) -> np.ndarray:
+    '''Return the (R,) uint64 masks of the (R, k) cards of some runouts.'''
+    return np.bitwise_or.reduce(
+        np.left_shift(np.uint64(1), runouts.astype(np.uint64)),
+        axis=1,
+        initial=np.uint64(0)
+    )
+
+def exact_counts(hole_cards: HoleCards, board: Board) -> tuple[int, int, int]:
+    '''
+    Count the wins, ties and losses of the player hand against every
+    opponent hand and every runout of the board, see exact_runout_counts.
+    Args:
+        hole_cards (HoleCards): The player hand.
+        board (Board): The board with 3, 4 or 5 cards.
+
+    Returns:
+        tuple[int, int, int]: The number of wins, ties and losses.
+    '''
+    wins, ties, losses = exact_runout_counts(hole_cards, board)[1].sum(axis=0)
+    return int(wins), int(ties), int(losses)
+
 def better_equity_calculator(
     hole_cards: HoleCards,
     board: Board
 ) -> tuple[float, float]:
     '''
     Calculate the equity of the player hand against a random opponent hand.
-    Uses combinatorial analysis to calculate the equity instead of simmulations.
+    Enumerates every opponent hand and every runout instead of running
+    simulations, so the result is exact. Only available from the flop on.
     Args:
         hole_cards (HoleCards): The player hand.
-        board (Board): The board, regardless how many cards it has.
-    
+        board (Board): The board, with at least the flop.
+        
+    Returns:
+        tuple[float, float]: The winrate and lose rate of the player hand.
     '''
-    raise NotImplementedError()
-    n_board_cards = len(board)
-    known_cards = n_board_cards + 2
-    unknown_cards = 5 - n_board_cards + 2
-    total_cards = 52 - known_cards
-    total_cases = perm(total_cards, unknown_cards)
-    # Check for flushes
-    # Count and save all flushes that still are possible
-    common_colors = [data for data in board.color_count().items() if data[1] - len(board) >= 0]
-    own_colors = {color:hole_cards.color_count() for color,_ in common_colors}
-    total_flush_cases = 0
-    for color, count in common_colors:
-        missing = 5 - count
-        for excess in range(unknown_cards - missing):
-            new_colored_cards = 5 - count + excess
-            flush_cases = perm(13 - count - own_colors[color], new_colored_cards)
-            # From the remaining cards, we can only get non-colors and cards 
-            # that have not been seen not to repeat cases
-            seen_cards_non_color = known_cards - own_colors[color] - count
-            remaining_cards = unknown_cards - 5 + count - excess
-            remaining_cases = perm(
-                total_cards - 13 - seen_cards_non_color,
-                remaining_cards
+    wins, ties, losses = exact_counts(hole_cards, board)
+    total = wins + ties + losses
+    return wins / total, losses / total
+
+
+if __name__ == '__main__':
+    # Simulation kernel benchmark
+    # Usage: python -m stats.equity [number of simulations]
+    import sys
+    import time
+
+    from game_objects import Card, Color
+
+    def object_kernel(hole_cards, board, num_simulations, rng):
+        '''The previous kernel, which dealt every simulation from a new
+        shuffled deck into new hands and boards.'''
+        player_cards = list(hole_cards)
+        board_f = generate_board_func[board.status]
+        wins = losses = 0
+        for _ in range(num_simulations):
+            deck = Deck(existing_cards=player_cards + board, rng=rng)
+            opponent_hand = HoleCards([deck.deal() for _ in range(2)])
+            is_win, winner_idx = board_f(board, deck).evaluate(hole_cards, opponent_hand)
+            if is_win:
+                wins += winner_idx == 0
+                losses += winner_idx == 1
+        return wins, losses
+
+    n_simulations = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    hole_cards = HoleCards([Card(1, Color.SPADES), Card(13, Color.SPADES)])
+    flop = Board()
+    flop[:3] = Card(2, Color.SPADES), Card(7, Color.HEARTS), Card(11, Color.SPADES)
+    for name, board in (('pre-flop', Board()), ('flop', flop)):
+        for kernel in (object_kernel, simulate):
+            start = time.perf_counter()
+            wins, losses = kernel(hole_cards, board, n_simulations, random.Random(0))
+            elapsed = time.perf_counter() - start
+            print(
+                f'{name} {kernel.__name__}: {n_simulations / elapsed:,.0f} simulations/s '
+                f'(win {wins / n_simulations:.2%} lose {losses / n_simulations:.2%})'
             )
-            arrangements = comb(unknown_cards, new_colored_cards)
-            total_flush_cases += flush_cases * remaining_cases * arrangements
\ No newline at end of file
@@ -0,0 +1,133 @@
+'''
+Exact flop equities of every hand against a random hand.
+
+The table is built offline with ``python -m stats.flops [workers]`` and
+memory-mapped at import, so flop queries are table reads:
+    - flop_equities: (1755, 1326, 2) uint16 win and tie rates of every combo
+      on every canonical flop, in units of 1/65535. Combos that use a card of
+      the flop are 0.
+
+Flops are stored in their canonical form, see game_objects.isomorphism, and
+the hole cards are relabeled with the same suit permutation on lookup. The
+build enumerates every turn and river of a flop for all the combos at once
+with the range engine, and can be interrupted and resumed: finished flops
+are written to a partial table as they come.
+'''
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from game_objects import Board, HoleCards
+from game_objects.card import mask_to_cards
+from game_objects.isomorphism import canonical_boards, canonical_masks, flop_index
+from .hands import N_COMBOS, combo_index
+from .preflop import TABLES_DIR, _load
+from .ranges import combo_equities
+
+N_FLOPS = 1755
+SCALE = 65535
+FLOPS_PATH = TABLES_DIR / 'flop_equities.npy'
+
+flop_equities = _load(FLOPS_PATH)
+
+
+def available() -> bool:
+    '''Return whether the flop table has been built.'''
+    return flop_equities is not None
+
+def flop_equity(hole_cards: HoleCards, board: Board) -> tuple[float, float]:
+    '''
+    Read the flop equity of a hand against a random opponent hand.
+    Args:
+        hole_cards (HoleCards): The player hand.
+        board (Board): The board, only its flop is used.
+
+    Returns:
+        tuple[float, float]: The winrate and lose rate of the player hand.
+    '''
+    if flop_equities is None:
+        raise FileNotFoundError(f'{FLOPS_PATH} is missing, run python -m stats.flops')
+    flop = board[0].mask | board[1].mask | board[2].mask
+    if flop & hole_cards.mask:
+        raise ValueError('The hole cards and the flop share some cards.')
+    # Suits the flop cannot tell apart are sorted by the hole cards, which
+    # leaves the canonical flop as is
+    (_, hole), _ = canonical_masks(flop, hole_cards.mask)
+    win, tie = flop_equities[flop_index(board), combo_index(HoleCards(mask_to_cards(hole)))]
+    return win / SCALE, 1 - (int(win) + int(tie)) / SCALE
+
+
+def flop_row(index: int) -> np.ndarray:
+    '''Compute the (1326, 2) row of a canonical flop of the table.'''
+    board = Board()
+    board[:3] = mask_to_cards(canonical_boards(3)[index])
+    rates = combo_equities(np.ones(N_COMBOS), board)[:, :2]
+    return np.round(np.nan_to_num(rates) * SCALE).astype(np.uint16)
+
+def build_table(
+    path: Path = FLOPS_PATH,
+    *,
+    workers: int = os.cpu_count() or 1,
+    verbose: bool = False
+) -> np.ndarray:
+    '''
+    Build the flop table, resuming from a previous interrupted build.
+
+    Rows are written to ``<path>.partial`` as soon as they are computed and
+    the finished flops are tracked in ``<path>.done``, both are replaced by
+    the table once every flop has been computed.
+    Args:
+        path (Path): Where to save the table.
+        workers (int): The number of processes to split the flops across.
+        verbose (bool): Whether to print the progress.
+
+    Returns:
+        np.ndarray: The table.
+    '''
+    partial_path = path.with_name(path.name + '.partial')
+    done_path = path.with_name(path.name + '.done')
+    path.parent.mkdir(exist_ok=True)
+    if partial_path.exists() and done_path.exists():
+        table = np.lib.format.open_memmap(partial_path, mode='r+')
+        done = np.load(done_path)
+    else:
+        table = np.lib.format.open_memmap(
+            partial_path,
+            mode='w+',
+            dtype=np.uint16,
+            shape=(N_FLOPS, N_COMBOS, 2)
+        )
+        done = np.zeros(N_FLOPS, dtype=bool)
+    pending = np.flatnonzero(~done).tolist()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for count, (index, row) in enumerate(
+            zip(pending, pool.map(flop_row, pending, chunksize=4)), 1
+        ):
+            table[index] = row
+            done[index] = True
+            # Flush the rows before marking them as done
+            if count % 10 == 0 or count == len(pending):
+                table.flush()
+                with open(done_path, 'wb') as file:
+                    np.save(file, done)
+                if verbose:
+                    print(f'{done.sum()}/{N_FLOPS} flops')
+
+    del table
+    os.replace(partial_path, path)
+    done_path.unlink()
+    return np.load(path, mmap_mode='r')
+
+
+if __name__ == '__main__':
+    # Usage: python -m stats.flops [number of workers]
+    import sys
+    import time
+
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
+    start = time.perf_counter()
+    build_table(workers=workers, verbose=True)
+    print(f'Built the flop table in {time.perf_counter() - start:.0f}s')
@@ -0,0 +1,80 @@
+'''
+Starting hands: the 1326 two card combos and the 169 hand classes.
+
+Classes are laid out on the usual 13x13 grid, indexed ``row * 13 + column``
+with ranks from 0 (deuce) to 12 (ace): pairs on the diagonal, suited hands
+with the high card as the row and offsuit hands with the high card as the
+column.
+'''
+from itertools import combinations
+
+import numpy as np
+
+from game_objects import Card, HoleCards
+from game_objects.card import N_CARDS, N_RANKS
+
+N_COMBOS = 1326
+N_CLASSES = 169
+RANK_CHARS = '23456789TJQKA'
+
+# Every combo as its two card indices, the lowest first
+COMBOS = np.array(list(combinations(range(N_CARDS), 2)), dtype=np.intp)
+COMBO_MASKS = [(1 << int(c0)) | (1 << int(c1)) for c0, c1 in COMBOS]
+
+_COMBO_INDEX = np.full((N_CARDS, N_CARDS), -1, dtype=np.intp)
+_COMBO_INDEX[COMBOS[:, 0], COMBOS[:, 1]] = np.arange(N_COMBOS)
+_COMBO_INDEX[COMBOS[:, 1], COMBOS[:, 0]] = np.arange(N_COMBOS)
+
+
+def _class_of(c0: int, c1: int) -> int:
+    high, low = sorted((c0 % N_RANKS, c1 % N_RANKS), reverse=True)
+    if c0 // N_RANKS == c1 // N_RANKS:
+        return high * N_RANKS + low
+    return low * N_RANKS + high
+
+COMBO_CLASSES = np.array([_class_of(c0, c1) for c0, c1 in COMBOS], dtype=np.intp)
+
+
+def combo_index(hole_cards: HoleCards) -> int:
+    '''Return the index from 0 to 1325 of some hole cards.'''
+    c0, c1 = (card.index for card in hole_cards)
+    return int(_COMBO_INDEX[c0, c1])
+
+def combo_hole_cards(index: int) -> HoleCards:
+    '''Return the hole cards of a combo index.'''
+    return HoleCards([Card.from_index(int(card)) for card in COMBOS[index]])
+
+def hand_class(hole_cards: HoleCards) -> int:
+    '''Return the index from 0 to 168 of the class of some hole cards.'''
+    c0, c1 = (card.index for card in hole_cards)
+    return _class_of(c0, c1)
+
+def class_name(index: int) -> str:
+    '''Return the usual name of a hand class, e.g. "AKs", "T9o" or "QQ".'''
+    row, column = divmod(index, N_RANKS)
+    if row == column:
+        return RANK_CHARS[row] * 2
+    if row > column:
+        return f'{RANK_CHARS[row]}{RANK_CHARS[column]}s'
+    return f'{RANK_CHARS[column]}{RANK_CHARS[row]}o'
+
+def class_index(name: str) -> int:
+    '''Return the index of a hand class from its name, e.g. "AKs".'''
+    try:
+        high, low = RANK_CHARS.index(name[0]), RANK_CHARS.index(name[1])
+    except (IndexError, ValueError):
+        raise ValueError(f'Invalid hand class: {name!r}') from None
+    suffix = name[2:]
+    if high < low:
+        high, low = low, high
+    if high == low and not suffix:
+        return high * N_RANKS + low
+    if high != low and suffix == 's':
+        return high * N_RANKS + low
+    if high != low and suffix == 'o':
+        return low * N_RANKS + high
+    raise ValueError(f'Invalid hand class: {name!r}')
+
+def class_combos(index: int) -> np.ndarray:
+    '''Return the combo indices of a hand class.'''
+    return np.flatnonzero(COMBO_CLASSES == index)
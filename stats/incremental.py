@@ -0,0 +1,109 @@
+'''
+Equity of a hand refined street by street.
+
+The counts of the first street enumerated are kept per runout. Later streets
+only keep the runouts that contain the new cards, since against every
+opponent hand they are exactly the runouts still possible, so the turn and
+the river are read from the flop enumeration without ranking anything.
+The flop is read from the flop table instead when it has been built.
+
+Enumerations and equities go through an EquityCache, keyed by the canonical
+form of the situation, so every hand equivalent up to a permutation of the
+suits, in any thread, shares the same flop enumeration.
+'''
+import numpy as np
+
+from game_objects import Board, GamePhase, HoleCards
+from game_objects.isomorphism import IDENTITY, canonical_key, permute_mask
+from . import flops, preflop
+from .cache import EquityCache, equity_cache
+from .equity import _runout_masks, calculate_equity, exact_runout_counts
+
+
+class HandEquity:
+    '''
+    Equity of one hand against a random opponent hand, created at the deal
+    and queried as the board is dealt.
+    Args:
+        hole_cards (HoleCards): The player hand.
+        num_simulations (int): The number of simulations pre-flop when the
+            pre-flop tables have not been built.
+        cache (EquityCache | None): The cache of enumerations and equities,
+            None to enumerate every hand on its own.
+    '''
+    def __init__(
+        self,
+        hole_cards: HoleCards,
+        num_simulations: int = 1000,
+        cache: EquityCache | None = equity_cache
+    ):
+        self.hole_cards = hole_cards
+        self.num_simulations = num_simulations
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        # Board mask of the enumeration, its runouts as masks and their
+        # counts, and the permutation to the suits of the runouts
+        self._base: int | None = None
+        self._runouts: np.ndarray | None = None
+        self._counts: np.ndarray | None = None
+        self._permutation = IDENTITY
+        self._results: dict[int, tuple[float, float]] = {}
+
+    def equity(self, board: Board) -> tuple[float, float]:
+        '''
+        Return the equity of the hand on a board, reusing the work of the
+        previous streets and the result of previous queries on the same one.
+        Args:
+            board (Board): The board, regardless how many cards it has.
+
+        Returns:
+            tuple[float, float]: The winrate and lose rate of the hand.
+        '''
+        mask = board.mask
+        result = self._results.get(mask)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+
+        if not mask:
+            result = self._preflop(board)
+        elif board.status == GamePhase.FLOP and self._base is None and flops.available():
+            # The turn is enumerated on its own, which is cheap
+            result = flops.flop_equity(self.hole_cards, board)
+        elif self.cache is None:
+            result = self._filter(board)
+        else:
+            key = (*canonical_key(self.hole_cards, board), 'exact', None)
+            result = self.cache.get(key)
+            if result is None:
+                result = self._filter(board)
+                self.cache.put(key, result)
+        self._results[mask] = result
+        return result
+
+    def _filter(self, board: Board) -> tuple[float, float]:
+        mask = board.mask
+        if self._base is None or self._base & ~mask:
+            self._enumerate(board)
+        # Runouts holding every card dealt since the enumeration
+        dealt = np.uint64(permute_mask(mask & ~self._base, self._permutation))
+        wins, ties, losses = self._counts[self._runouts & dealt == dealt].sum(axis=0)
+        total = wins + ties + losses
+        return float(wins / total), float(losses / total)
+
+    def _preflop(self, board: Board) -> tuple[float, float]:
+        if preflop.available():
+            return preflop.preflop_equity(self.hole_cards)
+        return calculate_equity(self.hole_cards, board, self.num_simulations)
+
+    def _enumerate(self, board: Board) -> None:
+        self._base = board.mask
+        if self.cache is not None:
+            self._runouts, self._counts, self._permutation = self.cache.runouts(self.hole_cards, board)
+            return
+        runouts, counts = exact_runout_counts(self.hole_cards, board)
+        self._runouts = _runout_masks(runouts)
+        self._counts = counts
+        self._permutation = IDENTITY
@@ -0,0 +1,150 @@
+'''
+Equity of a hand against several opponents.
+
+Every player is ranked once per runout and the pot is split evenly between
+the best hands, so a showdown between k players costs k ranks instead of
+pairwise comparisons. Opponents are either given or random, and random ones
+are dealt from the cards nobody else holds.
+'''
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+from game_objects import Board, HoleCards
+from game_objects.card import N_CARDS
+from .batch import rank_many
+from .equity import _combinations
+
+MAX_PLAYERS = 10
+
+
+class MultiwayEquity(NamedTuple):
+    '''The result of multiway_equity. equity is the share of the pot the
+    player wins on average, ties split, and the rates add up to one.'''
+    equity: float
+    winrate: float
+    tie_rate: float
+    lose_rate: float
+
+
+def pot_shares(ranks: np.ndarray) -> np.ndarray:
+    '''
+    Split the pot of many showdowns.
+    Args:
+        ranks (np.ndarray): An (N, P) array with the rank of every player in
+            every showdown.
+
+    Returns:
+        np.ndarray: The (N, P) share of the pot of every player.
+    '''
+    winners = ranks == ranks.max(axis=1, keepdims=True)
+    return winners / winners.sum(axis=1, keepdims=True)
+
+def _showdowns(
+    hands: np.ndarray,
+    known: np.ndarray,
+    runouts: np.ndarray
+) -> np.ndarray:
+    '''Rank every player of many showdowns, hands being (N, P, 2) and the
+    runouts (N, k).'''
+    n, players = hands.shape[:2]
+    boards = np.concatenate((np.broadcast_to(known, (n, len(known))), runouts), axis=1)
+    cards = np.concatenate((
+        hands,
+        np.broadcast_to(boards[:, None, :], (n, players, 5))
+    ), axis=2)
+    return rank_many(cards.reshape(-1, 7)).reshape(n, players)
+
+def _summarize(shares: np.ndarray) -> MultiwayEquity:
+    '''Summarize the shares of the player, the first column.'''
+    share = shares[:, 0]
+    n = len(share)
+    wins = int(np.count_nonzero(share == 1))
+    ties = int(np.count_nonzero((share > 0) & (share < 1)))
+    return MultiwayEquity(
+        float(share.mean()),
+        wins / n,
+        ties / n,
+        (n - wins - ties) / n
+    )
+
+def multiway_equity(
+    hole_cards: HoleCards,
+    board: Board,
+    opponents: int | Sequence[HoleCards | None],
+    *,
+    method: str = 'auto',
+    num_simulations: int = 10_000,
+    seed: int | None = None,
+    chunk: int = 50_000
+) -> MultiwayEquity:
+    '''
+    Calculate the equity of the player hand against several opponents.
+    Args:
+        hole_cards (HoleCards): The player hand.
+        board (Board): The board, regardless how many cards it has.
+        opponents (int | Sequence[HoleCards | None]): Either the number of
+            random opponents or the hand of every opponent, None for the
+            random ones.
+        method (str): "exact" enumerates every runout and needs every
+            opponent hand, "monte_carlo" samples the runouts and the random
+            hands, "auto" picks exact whenever possible.
+        num_simulations (int): The number of simulations for Monte Carlo.
+        seed (int | None): The seed of the simulations.
+        chunk (int): The number of showdowns ranked at once.
+
+    Returns:
+        MultiwayEquity: The share of the pot and the win, tie and lose rates
+            of the player hand.
+    '''
+    if isinstance(opponents, int):
+        opponents = [None] * opponents
+    if not 1 <= len(opponents) < MAX_PLAYERS:
+        raise ValueError(f'There must be between 1 and {MAX_PLAYERS - 1} opponents.')
+    known_hands = [hole_cards, *(hand for hand in opponents if hand is not None)]
+    n_random = len(opponents) - len(known_hands) + 1
+    if method == 'auto':
+        method = 'monte_carlo' if n_random else 'exact'
+    if method == 'exact' and n_random:
+        raise ValueError('Exact enumeration needs the hand of every opponent.')
+    if method not in ('exact', 'monte_carlo'):
+        raise ValueError(f'Unknown equity method: {method!r}')
+
+    dead = board.mask
+    for hand in known_hands:
+        if dead & hand.mask:
+            raise ValueError('The hands and the board share some cards.')
+        dead |= hand.mask
+    known = np.array([card.index for card in board if card is not None], dtype=np.intp)
+    live = np.array([card for card in range(N_CARDS) if not dead >> card & 1])
+    missing = 5 - len(known)
+    # Seats of the given hands, the player first, and of the random ones
+    seats = [0] + [i + 1 for i, hand in enumerate(opponents) if hand is not None]
+    random_seats = [i + 1 for i, hand in enumerate(opponents) if hand is None]
+    given = np.array([[card.index for card in hand] for hand in known_hands], dtype=np.intp)
+
+    if method == 'exact':
+        runouts = live[_combinations(len(live), missing)]
+        total = len(runouts)
+
+        def get_chunk(start: int, size: int) -> tuple[np.ndarray, np.ndarray]:
+            return np.broadcast_to(given, (size, *given.shape)), runouts[start:start + size]
+    else:
+        rng = np.random.default_rng(seed)
+        total = num_simulations
+        draws = missing + 2 * n_random
+
+        def get_chunk(start: int, size: int) -> tuple[np.ndarray, np.ndarray]:
+            picked = np.argpartition(rng.random((size, len(live))), draws - 1, axis=1)
+            dealt = live[picked[:, :draws]]
+            hands = np.empty((size, len(opponents) + 1, 2), dtype=np.intp)
+            hands[:, seats] = given
+            hands[:, random_seats] = dealt[:, missing:].reshape(size, n_random, 2)
+            return hands, dealt[:, :missing]
+
+    shares = np.empty((total, len(opponents) + 1))
+    for start in range(0, total, chunk):
+        size = min(chunk, total - start)
+        hands, runouts_chunk = get_chunk(start, size)
+        shares[start:start + size] = pot_shares(_showdowns(hands, known, runouts_chunk))
+    return _summarize(shares)
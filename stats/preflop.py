@@ -0,0 +1,192 @@
+'''
+Precomputed heads-up pre-flop equities of the 169 hand classes.
+
+The tables are built offline with ``python -m stats.preflop`` and
+memory-mapped at import, so pre-flop queries are table reads:
+    - vs_random: (169, 3) win, tie and loss rates of every class against a
+      random hand.
+    - matchups: (169, 169, 3) win, tie and loss rates of every class against
+      every other class.
+
+The build enumerates every board, once per suit isomorphism class, and
+ranks all 1326 combos on each of them, so every board is shared by all the
+matchups and the tables are exact.
+'''
+from collections import Counter
+from math import factorial
+from pathlib import Path
+
+import numpy as np
+
+from game_objects import HoleCards
+from game_objects.card import N_CARDS, N_RANKS, N_SUITS, RANK_MASK, mask_to_cards
+from game_objects.isomorphism import canonical_boards
+from .batch import rank_many
+from .hands import COMBOS, COMBO_CLASSES, N_COMBOS, N_CLASSES, hand_class
+
+TABLES_DIR = Path(__file__).with_name('tables')
+VS_RANDOM_PATH = TABLES_DIR / 'preflop_vs_random.npy'
+MATCHUPS_PATH = TABLES_DIR / 'preflop_matchups.npy'
+
+
+def _load(path: Path) -> np.ndarray | None:
+    try:
+        return np.load(path, mmap_mode='r')
+    except OSError:
+        return None
+
+vs_random = _load(VS_RANDOM_PATH)
+matchups = _load(MATCHUPS_PATH)
+
+
+def available() -> bool:
+    '''Return whether the pre-flop tables have been built.'''
+    return vs_random is not None and matchups is not None
+
+def preflop_equity(hole_cards: HoleCards) -> tuple[float, float]:
+    '''
+    Read the pre-flop equity of a hand against a random opponent hand.
+    Args:
+        hole_cards (HoleCards): The player hand.
+
+    Returns:
+        tuple[float, float]: The winrate and lose rate of the player hand.
+    '''
+    if vs_random is None:
+        raise FileNotFoundError(f'{VS_RANDOM_PATH} is missing, run python -m stats.preflop')
+    win, _, lose = vs_random[hand_class(hole_cards)]
+    return float(win), float(lose)
+
+def preflop_matchup(h0: HoleCards, h1: HoleCards) -> tuple[float, float]:
+    '''
+    Read the pre-flop equity of the class of a hand against the class of
+    another.
+    Args:
+        h0 (HoleCards): The player hand.
+        h1 (HoleCards): The opponent hand.
+
+    Returns:
+        tuple[float, float]: The winrate and lose rate of the player hand.
+    '''
+    if matchups is None:
+        raise FileNotFoundError(f'{MATCHUPS_PATH} is missing, run python -m stats.preflop')
+    win, _, lose = matchups[hand_class(h0), hand_class(h1)]
+    return float(win), float(lose)
+
+
+def _orbit_size(board: int) -> int:
+    '''Return the number of boards a canonical board stands for, the 24 suit
+    permutations over the ones that leave it unchanged.'''
+    suits = Counter((board >> suit * N_RANKS) & RANK_MASK for suit in range(N_SUITS))
+    fixed = 1
+    for count in suits.values():
+        fixed *= factorial(count)
+    return factorial(N_SUITS) // fixed
+
+def build_tables(*, batch: int = 64, verbose: bool = False) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Compute the pre-flop tables exactly.
+
+    Sums by class do not change when the suits of the board are permuted, so
+    every river is enumerated once in its canonical form and weighted by the
+    number of boards it stands for. On every board all the combos that do
+    not use its cards are ranked once and counted by class and strength, so
+    the wins and ties of every pair of classes are a product of those counts.
+    The pairs of combos that share a card are then taken away.
+    Args:
+        batch (int): The number of boards ranked per call to rank_many.
+        verbose (bool): Whether to print the progress.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The vs_random and matchups tables.
+    '''
+    boards = canonical_boards(5)
+    # Pairs of different combos that share a card
+    first, second = np.nonzero(np.triu(
+        (COMBOS[:, None, :, None] == COMBOS[None, :, None, :]).any(axis=(2, 3)), 1
+    ))
+    forward = COMBO_CLASSES[first] * N_CLASSES + COMBO_CLASSES[second]
+    backward = COMBO_CLASSES[second] * N_CLASSES + COMBO_CLASSES[first]
+    n_pairs = N_CLASSES * N_CLASSES
+    class_wins = np.zeros((N_CLASSES, N_CLASSES))
+    class_ties = np.zeros((N_CLASSES, N_CLASSES))
+    # Any valid hand, ranked in place of the combos that use board cards
+    filler = np.arange(7)
+
+    for start in range(0, len(boards), batch):
+        masks = boards[start:start + batch]
+        size = len(masks)
+        cards = np.array([[card.index for card in mask_to_cards(mask)] for mask in masks])
+        on_board = np.zeros((size, N_CARDS), dtype=bool)
+        on_board[np.arange(size)[:, None], cards] = True
+        dead = on_board[:, COMBOS].any(axis=2)
+
+        hands = np.concatenate((
+            np.broadcast_to(COMBOS, (size, N_COMBOS, 2)),
+            np.broadcast_to(cards[:, None, :], (size, N_COMBOS, 5))
+        ), axis=2)
+        hands[dead] = filler
+        # Dead combos are the weakest and are never counted
+        ranks = np.where(dead, 0, rank_many(hands.reshape(-1, 7)).reshape(size, N_COMBOS))
+
+        for mask, board_ranks, board_dead in zip(masks, ranks, dead):
+            live = ~board_dead
+            _, strength = np.unique(board_ranks, return_inverse=True)
+            n_strengths = strength.max() + 1
+            # Live combos of every class by strength, and those below
+            counts = np.bincount(
+                COMBO_CLASSES * n_strengths + strength,
+                live,
+                N_CLASSES * n_strengths
+            ).reshape(N_CLASSES, n_strengths)
+            below = np.cumsum(counts, axis=1)
+            wins = counts[:, 1:] @ below[:, :-1].T
+            ties = counts @ counts.T
+            # Every combo tied with itself
+            ties -= np.diag(counts.sum(axis=1))
+
+            meet = live[first] & live[second]
+            ranks0 = board_ranks[first]
+            ranks1 = board_ranks[second]
+            wins -= np.bincount(forward[meet & (ranks0 > ranks1)], minlength=n_pairs).reshape(N_CLASSES, N_CLASSES)
+            wins -= np.bincount(backward[meet & (ranks0 < ranks1)], minlength=n_pairs).reshape(N_CLASSES, N_CLASSES)
+            tied = meet & (ranks0 == ranks1)
+            ties -= (
+                np.bincount(forward[tied], minlength=n_pairs)
+                + np.bincount(backward[tied], minlength=n_pairs)
+            ).reshape(N_CLASSES, N_CLASSES)
+
+            weight = _orbit_size(mask)
+            class_wins += weight * wins
+            class_ties += weight * ties
+        if verbose and start // batch % 200 == 0:
+            print(f'{start + size}/{len(boards)} boards')
+
+    class_losses = class_wins.T
+    counts = class_wins + class_ties + class_losses
+    matchups = np.stack((class_wins, class_ties, class_losses), axis=2) / counts[..., None]
+    vs_random = np.stack((
+        class_wins.sum(axis=1),
+        class_ties.sum(axis=1),
+        class_losses.sum(axis=1)
+    ), axis=1) / counts.sum(axis=1)[:, None]
+    return vs_random.astype(np.float32), matchups.astype(np.float32)
+
+
+if __name__ == '__main__':
+    # Usage: python -m stats.preflop
+    import time
+
+    from .hands import class_index, class_name
+
+    start = time.perf_counter()
+    vs_random, matchups = build_tables(verbose=True)
+    TABLES_DIR.mkdir(exist_ok=True)
+    np.save(VS_RANDOM_PATH, vs_random)
+    np.save(MATCHUPS_PATH, matchups)
+    print(f'Built pre-flop tables in {time.perf_counter() - start:.0f}s')
+    for index in np.argsort(-vs_random[:, 0])[:5]:
+        win, tie, lose = vs_random[index]
+        print(f'{class_name(index)}: win {win:.2%} tie {tie:.2%} lose {lose:.2%}')
+    win, tie, lose = matchups[class_index('AA'), class_index('KK')]
+    print(f'AA vs KK: win {win:.2%} tie {tie:.2%} lose {lose:.2%}')
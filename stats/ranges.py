@@ -0,0 +1,311 @@
+'''
+Hand ranges and range equities.
+
+A range is a vector of 1326 weights, one per combo of stats.hands, usually
+parsed from the usual notation, e.g. ``"QQ+,AKs,T9s-65s,AJo:0.5"``.
+
+Equities are computed runout by runout: every combo is ranked once per
+runout and compared with the whole opposing range at once. Card removal is
+handled by counting the range by strength, and then taking away the combos
+that share a card with each hand, which only needs the 51 combos of every
+card sorted by strength.
+'''
+import numpy as np
+
+from game_objects import Board, Card, HoleCards
+from game_objects.card import N_CARDS, N_RANKS
+from .batch import rank_many
+from .equity import _combinations
+from .hands import COMBOS, N_COMBOS, RANK_CHARS, class_combos, class_index, combo_index
+
+SUIT_CHARS = 'shdc'
+N_STRENGTHS = 7463
+
+# The 51 combos holding every card, and where every combo appears in them
+CARD_COMBOS = np.array([
+    np.flatnonzero((COMBOS == card).any(axis=1)) for card in range(N_CARDS)
+])
+_CARD_SLOTS = np.array([
+    [card * (N_CARDS - 1) + int(np.flatnonzero(CARD_COMBOS[card] == combo)[0]) for card in cards]
+    for combo, cards in enumerate(COMBOS)
+])
+
+
+# Parsing
+
+def _parse_combo(token: str) -> int:
+    try:
+        c0, c1 = (
+            SUIT_CHARS.index(token[i + 1]) * N_RANKS + RANK_CHARS.index(token[i])
+            for i in (0, 2)
+        )
+    except ValueError:
+        raise ValueError(f'Invalid combo: {token!r}') from None
+    if c0 == c1:
+        raise ValueError(f'Invalid combo: {token!r}')
+    return combo_index(HoleCards([Card.from_index(c0), Card.from_index(c1)]))
+
+def _class_names(high: int, low: int, suffix: str) -> list[str]:
+    '''Return the names of a class, both suited and offsuit if the suffix
+    is empty and the ranks differ.'''
+    name = RANK_CHARS[high] + RANK_CHARS[low]
+    if high == low or suffix:
+        return [name + suffix]
+    return [name + 's', name + 'o']
+
+def _parse_classes(token: str) -> list[str]:
+    '''Expand a token like "QQ+", "ATs+", "T9s-65s" or "A5o-A2o" into the
+    names of its classes.'''
+    def ranks(part: str) -> tuple[int, int, str]:
+        # Classes without a suffix stand for both the suited and offsuit ones
+        plain = len(part) == 2 and part[0] != part[1]
+        index = class_index(part + 's' if plain else part)
+        row, column = divmod(index, N_RANKS)
+        return max(row, column), min(row, column), '' if plain else part[2:]
+
+    if token.endswith('+'):
+        high, low, suffix = ranks(token[:-1])
+        if high == low:
+            return [RANK_CHARS[rank] * 2 for rank in range(low, N_RANKS)]
+        return [
+            name for kicker in range(low, high)
+            for name in _class_names(high, kicker, suffix)
+        ]
+    if '-' in token:
+        first, last = token.split('-')
+        high0, low0, suffix0 = ranks(first)
+        high1, low1, suffix1 = ranks(last)
+        if suffix0 != suffix1:
+            raise ValueError(f'Invalid range: {token!r}')
+        if high0 == low0 and high1 == low1:
+            return [
+                RANK_CHARS[rank] * 2
+                for rank in range(min(low0, low1), max(low0, low1) + 1)
+            ]
+        if high0 == high1:
+            return [
+                name for kicker in range(min(low0, low1), max(low0, low1) + 1)
+                for name in _class_names(high0, kicker, suffix0)
+            ]
+        if high0 - low0 == high1 - low1:
+            gap = high0 - low0
+            return [
+                name for low in range(min(low0, low1), max(low0, low1) + 1)
+                for name in _class_names(low + gap, low, suffix0)
+            ]
+        raise ValueError(f'Invalid range: {token!r}')
+    high, low, suffix = ranks(token)
+    return _class_names(high, low, suffix)
+
+def parse_range(text: str) -> np.ndarray:
+    '''
+    Parse a range from its usual notation: comma separated classes ("AKs",
+    "AKo", "AK", "QQ"), classes and better kickers ("QQ+", "ATs+"), spans
+    ("T9s-65s", "A5s-A2s", "99-66") and specific combos ("AhKh"). Any of
+    them can be weighted with a colon, e.g. "AJo:0.5", and later entries
+    override earlier ones.
+    Args:
+        text (str): The range.
+
+    Returns:
+        np.ndarray: The (1326,) weights of the range.
+    '''
+    weights = np.zeros(N_COMBOS)
+    for token in text.replace(' ', '').split(','):
+        if not token:
+            continue
+        token, _, weight = token.partition(':')
+        weight = float(weight) if weight else 1.0
+        if len(token) == 4 and token[1] in SUIT_CHARS:
+            weights[_parse_combo(token)] = weight
+            continue
+        for name in _parse_classes(token):
+            weights[class_combos(class_index(name))] = weight
+    return weights
+
+def range_weights(hand_range: str | np.ndarray) -> np.ndarray:
+    '''Return the (1326,) weights of a range given either as weights or in
+    the notation of parse_range.'''
+    if isinstance(hand_range, str):
+        return parse_range(hand_range)
+    weights = np.asarray(hand_range, dtype=np.float64)
+    if weights.shape != (N_COMBOS,):
+        raise ValueError(f'A range must have {N_COMBOS} weights, got shape {weights.shape}')
+    if (weights < 0).any():
+        raise ValueError('Range weights cannot be negative.')
+    return weights
+
+
+# Equities
+
+def _runouts(board: Board, n_boards: int, seed: int | None) -> tuple[np.ndarray, np.ndarray]:
+    '''Return the known cards of a board and either every runout of it, from
+    the flop on, or n_boards random ones before.'''
+    known = np.array([card.index for card in board if card is not None], dtype=np.intp)
+    live = np.array([card for card in range(N_CARDS) if not board.mask >> card & 1])
+    missing = 5 - len(known)
+    if len(known) >= 3:
+        return known, live[_combinations(len(live), missing)]
+    rng = np.random.default_rng(seed)
+    draws = np.argpartition(rng.random((n_boards, len(live))), missing, axis=1)
+    return known, live[draws[:, :missing]]
+
+def _count(
+    villain: np.ndarray,
+    known: np.ndarray,
+    runouts: np.ndarray,
+    chunk: int = 256
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Weigh, for every combo, the villain combos it beats, ties and can meet
+    over some runouts.
+    Args:
+        villain (np.ndarray): The (1326,) weights of the villain range.
+        known (np.ndarray): The cards of the board.
+        runouts (np.ndarray): An (R, k) array with the rest of the board.
+        chunk (int): The number of runouts ranked per call to rank_many.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: The (1326,) weights of the
+            wins, ties and opponents of every combo.
+    '''
+    wins = np.zeros(N_COMBOS)
+    ties = np.zeros(N_COMBOS)
+    totals = np.zeros(N_COMBOS)
+    # Any valid hand, ranked in place of the combos that use board cards
+    filler = np.arange(7)
+
+    for start in range(0, len(runouts), chunk):
+        rest = runouts[start:start + chunk]
+        boards = np.concatenate((np.broadcast_to(known, (len(rest), len(known))), rest), axis=1)
+        size = len(boards)
+        rows = np.arange(size)[:, None]
+        on_board = np.zeros((size, N_CARDS), dtype=bool)
+        on_board[rows, boards] = True
+        dead = on_board[:, COMBOS].any(axis=2)
+
+        cards = np.concatenate((
+            np.broadcast_to(COMBOS, (size, N_COMBOS, 2)),
+            np.broadcast_to(boards[:, None, :], (size, N_COMBOS, 5))
+        ), axis=2)
+        cards[dead] = filler
+        ranks = rank_many(cards.reshape(-1, 7)).reshape(size, N_COMBOS).astype(np.intp)
+        weights = np.where(dead, 0.0, villain)
+
+        # Villain weight by strength, for every runout
+        by_strength = np.bincount(
+            (ranks + rows * N_STRENGTHS).ravel(),
+            weights.ravel(),
+            minlength=size * N_STRENGTHS
+        ).reshape(size, N_STRENGTHS)
+        below = np.cumsum(by_strength, axis=1) - by_strength
+        beaten = below[rows, ranks]
+        tied = by_strength[rows, ranks]
+        total = weights.sum(axis=1, keepdims=True)
+
+        # The same counts among the 51 combos holding each card, sorted by
+        # runout, card and strength. Every combo appears twice, once for each
+        # of its cards
+        groups = (rows * N_CARDS + np.arange(N_CARDS))[..., None]
+        keys = (groups * N_STRENGTHS + ranks[:, CARD_COMBOS]).ravel()
+        card_weights = weights[:, CARD_COMBOS]
+        order = np.argsort(keys)
+        sorted_keys = keys[order]
+        cumulative = np.concatenate(([0.0], np.cumsum(card_weights.ravel()[order])))
+        first = np.searchsorted(sorted_keys, keys, 'left')
+        last = np.searchsorted(sorted_keys, keys, 'right')
+        group_start = np.repeat(groups.ravel(), N_CARDS - 1) * (N_CARDS - 1)
+        card_beaten = (cumulative[first] - cumulative[group_start]).reshape(size, -1)
+        card_tied = (cumulative[last] - cumulative[first]).reshape(size, -1)
+        card_total = card_weights.sum(axis=2)
+
+        shared_beaten = card_beaten[:, _CARD_SLOTS].sum(axis=2)
+        shared_tied = card_tied[:, _CARD_SLOTS].sum(axis=2)
+        shared_total = card_total[:, COMBOS].sum(axis=2)
+
+        alive = ~dead
+        # The combo itself was counted once in the range and once per card
+        wins += np.where(alive, beaten - shared_beaten, 0.0).sum(axis=0)
+        ties += np.where(alive, tied - shared_tied + weights, 0.0).sum(axis=0)
+        totals += np.where(alive, total - shared_total + weights, 0.0).sum(axis=0)
+    return wins, ties, totals
+
+def combo_equities(
+    villain: str | np.ndarray,
+    board: Board,
+    *,
+    n_boards: int = 2000,
+    seed: int | None = None
+) -> np.ndarray:
+    '''
+    Calculate the equity of every combo against a range. From the flop on
+    every runout is enumerated, pre-flop n_boards random boards are sampled.
+    Args:
+        villain (str | np.ndarray): The opponent range.
+        board (Board): The board, regardless how many cards it has.
+        n_boards (int): The number of boards to sample pre-flop.
+        seed (int | None): The seed of the pre-flop sampling.
+
+    Returns:
+        np.ndarray: The (1326, 3) win, tie and loss rates of every combo,
+            NaN for the combos that can never meet the range.
+    '''
+    known, runouts = _runouts(board, n_boards, seed)
+    wins, ties, totals = _count(range_weights(villain), known, runouts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rates = np.stack((wins, ties, totals - wins - ties), axis=1) / totals[:, None]
+    rates[totals == 0] = np.nan
+    return rates
+
+def range_equity(
+    hero: str | np.ndarray,
+    villain: str | np.ndarray,
+    board: Board,
+    *,
+    n_boards: int = 2000,
+    seed: int | None = None
+) -> tuple[float, float]:
+    '''
+    Calculate the equity of a range against another, weighing every pair of
+    combos that can meet by the product of their weights.
+    Args:
+        hero (str | np.ndarray): The player range.
+        villain (str | np.ndarray): The opponent range.
+        board (Board): The board, regardless how many cards it has.
+        n_boards (int): The number of boards to sample pre-flop.
+        seed (int | None): The seed of the pre-flop sampling.
+
+    Returns:
+        tuple[float, float]: The winrate and lose rate of the player range.
+    '''
+    hero = range_weights(hero)
+    known, runouts = _runouts(board, n_boards, seed)
+    wins, ties, totals = _count(range_weights(villain), known, runouts)
+    total = hero @ totals
+    if not total:
+        raise ValueError('The ranges can never meet on this board.')
+    return float(hero @ wins / total), float(hero @ (totals - wins - ties) / total)
+
+def hand_equity(
+    hole_cards: HoleCards,
+    villain: str | np.ndarray,
+    board: Board,
+    *,
+    n_boards: int = 2000,
+    seed: int | None = None
+) -> tuple[float, float]:
+    '''
+    Calculate the equity of the player hand against a range.
+    Args:
+        hole_cards (HoleCards): The player hand.
+        villain (str | np.ndarray): The opponent range.
+        board (Board): The board, regardless how many cards it has.
+        n_boards (int): The number of boards to sample pre-flop.
+        seed (int | None): The seed of the pre-flop sampling.
+
+    Returns:
+        tuple[float, float]: The winrate and lose rate of the player hand.
+    '''
+    hero = np.zeros(N_COMBOS)
+    hero[combo_index(hole_cards)] = 1
+    return range_equity(hero, villain, board, n_boards=n_boards, seed=seed)
@@ -0,0 +1,130 @@
+'''
+Hand strength, potential and equity distribution.
+
+Features of a hand against a random opponent hand, all computed from the
+same enumeration of opponent hands and runouts:
+    - hand_strength: the share of opponent hands the player is ahead of
+      right now, ties counted as half.
+    - ppot and npot: the positive and negative potential, the chances of
+      getting ahead when behind and of falling behind when ahead.
+    - ehs: the effective hand strength, combining the three.
+    - histogram: how the equity of the hand is distributed over the runouts.
+'''
+from itertools import combinations
+from math import comb
+from typing import NamedTuple
+
+import numpy as np
+
+from game_objects import Board, HoleCards
+from game_objects.card import N_CARDS
+from .batch import rank_many
+from .equity import _combinations
+
+AHEAD, TIED, BEHIND = range(3)
+
+
+class HandStrength(NamedTuple):
+    '''The result of hand_strength. histogram has the fraction of runouts
+    whose equity falls in every bin, from 0 to 1.'''
+    hand_strength: float
+    ppot: float
+    npot: float
+    ehs: float
+    equity: float
+    histogram: np.ndarray
+
+
+def _states(hero: np.ndarray, opponent: np.ndarray) -> np.ndarray:
+    '''Return whether the player is ahead, tied or behind for some ranks.'''
+    return np.where(hero > opponent, AHEAD, np.where(hero == opponent, TIED, BEHIND))
+
+def hand_strength(hole_cards: HoleCards, board: Board, bins: int = 10) -> HandStrength:
+    '''
+    Calculate the hand strength, the potential and the equity distribution
+    of the player hand against a random opponent hand.
+
+    Every opponent hand is ranked once on the current board, the player once
+    per runout, and every set of unknown cards once for the opponent, as in
+    exact_counts. Each way of splitting those sets between the opponent hand
+    and the runout is then tallied by the state of the player before and
+    after the runout, and by runout.
+    Args:
+        hole_cards (HoleCards): The player hand.
+        board (Board): The board with 3, 4 or 5 cards.
+        bins (int): The number of bins of the histogram.
+
+    Returns:
+        HandStrength: The hand strength, potentials, effective hand strength,
+            equity and equity histogram of the player hand.
+    '''
+    known = [card.index for card in board if card is not None]
+    if len(known) < 3:
+        raise ValueError('The hand strength needs at least the flop.')
+    missing = 5 - len(known)
+    dead = board.mask | hole_cards.mask
+    live = np.array([card for card in range(N_CARDS) if not dead >> card & 1])
+    known = np.array(known, dtype=np.intp)
+    hole = np.array([card.index for card in hole_cards], dtype=np.intp)
+
+    def with_board(cards: np.ndarray) -> np.ndarray:
+        return np.concatenate((np.broadcast_to(known, (len(cards), len(known))), cards), axis=1)
+
+    # Current ranks, indexed by the opponent hand read in base 52
+    opponents = live[_combinations(len(live), 2)]
+    opponent_index = np.zeros(N_CARDS ** 2, dtype=np.intp)
+    opponent_index[opponents @ [1, N_CARDS]] = np.arange(len(opponents))
+    hero_now = rank_many(np.concatenate((hole, known))[None, :])[0]
+    states_now = _states(hero_now, rank_many(with_board(opponents)))
+
+    # Final ranks of the player, indexed by the runout read in base 52
+    digits = N_CARDS ** np.arange(missing)
+    runouts = live[_combinations(len(live), missing)]
+    runout_index = np.zeros(N_CARDS ** missing, dtype=np.intp)
+    runout_index[runouts @ digits] = np.arange(len(runouts))
+    hero_final = rank_many(np.concatenate((
+        np.broadcast_to(hole, (len(runouts), 2)),
+        with_board(runouts)
+    ), axis=1))
+
+    # Final ranks of the opponent for every set of unknown cards
+    unknown = live[_combinations(len(live), missing + 2)]
+    opponent_final = rank_many(with_board(unknown))
+
+    transitions = np.zeros(9, dtype=np.int64)
+    runout_wins = np.zeros(len(runouts))
+    for runout in combinations(range(missing + 2), missing):
+        hand = [i for i in range(missing + 2) if i not in runout]
+        runout_of = runout_index[unknown[:, list(runout)] @ digits]
+        opponent_of = opponent_index[unknown[:, hand] @ [1, N_CARDS]]
+        states_final = _states(hero_final[runout_of], opponent_final)
+        transitions += np.bincount(states_now[opponent_of] * 3 + states_final, minlength=9)
+        runout_wins += np.bincount(
+            runout_of,
+            (states_final == AHEAD) + (states_final == TIED) / 2,
+            minlength=len(runouts)
+        )
+
+    # Billings et al. potential, from the counts of every pair of states
+    hp = transitions.reshape(3, 3)
+    now = hp.sum(axis=1)
+    strength = (now[AHEAD] + now[TIED] / 2) / now.sum()
+    behind = now[BEHIND] + now[TIED] / 2
+    ahead = now[AHEAD] + now[TIED] / 2
+    ppot = npot = 0.0
+    if behind:
+        ppot = (hp[BEHIND, AHEAD] + hp[BEHIND, TIED] / 2 + hp[TIED, AHEAD] / 2) / behind
+    if ahead:
+        npot = (hp[AHEAD, BEHIND] + hp[TIED, BEHIND] / 2 + hp[AHEAD, TIED] / 2) / ahead
+
+    # Every runout leaves the same number of opponent hands
+    equities = runout_wins / comb(len(live) - missing, 2)
+    histogram, _ = np.histogram(equities, bins=bins, range=(0, 1))
+    return HandStrength(
+        float(strength),
+        float(ppot),
+        float(npot),
+        float(strength * (1 - npot) + (1 - strength) * ppot),
+        float(equities.mean()),
+        histogram / len(runouts)
+    )
@@ -0,0 +1,289 @@
+'''
+Tournaments between several players across a pool of processes.
+
+Every match is split into chunks of deals that the workers play with arena's
+duplicate deals, each with its own seed derived from the tournament seed, so
+results do not depend on the number of workers or the order chunks finish.
+Workers live for the whole tournament and build every player at most once.
+The results of every chunk are merged as soon as they arrive and, with a
+checkpoint file, saved so an interrupted tournament resumes where it stopped.
+
+Usage: python tournament.py [hands per match] [workers] [checkpoint]
+'''
+import itertools
+import json
+import os
+import random
+import time
+from multiprocessing import Pool
+from typing import Any, Callable, Iterable, NamedTuple
+
+from arena import bb_per_100, play_hands
+from player import Player
+
+
+class Entrant(NamedTuple):
+    '''
+    A player of the tournament, built inside the workers as
+    ``factory(name, **kwargs)``. The factory must be importable by the
+    workers, such as a Player subclass defined at module level.
+    '''
+    name: str
+    factory: Callable[..., Player]
+    kwargs: dict[str, Any] | None = None
+
+
+class MatchResult(NamedTuple):
+    '''The result of a match, from the point of view of player_a.'''
+    player_a: str
+    player_b: str
+    hands: int
+    bb_per_100: float
+    interval: tuple[float, float]
+
+
+class Standing(NamedTuple):
+    '''The results of a player against every opponent together.'''
+    name: str
+    matches: int
+    hands: int
+    bb_per_100: float
+    interval: tuple[float, float]
+
+
+class TournamentResult(NamedTuple):
+    '''The matches and the standings, best player first.'''
+    matches: list[MatchResult]
+    standings: list[Standing]
+    seconds: float
+
+
+class _Tally:
+    '''Running sums of the big blinds won on every deal.'''
+    __slots__ = ('deals', 'hands', 'total', 'squares')
+
+    def __init__(self, deals: int = 0, hands: int = 0, total: float = 0.0, squares: float = 0.0):
+        self.deals = deals
+        self.hands = hands
+        self.total = total
+        self.squares = squares
+
+    def add(self, other: '_Tally', sign: int = 1) -> None:
+        self.deals += other.deals
+        self.hands += other.hands
+        self.total += sign * other.total
+        self.squares += other.squares
+
+
+def round_robin(entrants: Iterable[Entrant]) -> list[tuple[str, str]]:
+    '''Return every pair of different entrants once.'''
+    return list(itertools.combinations([entrant.name for entrant in entrants], 2))
+
+
+# State of every worker, set once by _init_worker
+_entrants: dict[str, Entrant] = {}
+_players: dict[str, Player] = {}
+_stack = 1000
+_blind = 10
+
+
+def _init_worker(entrants: list[Entrant], stack: int, blind: int) -> None:
+    global _stack, _blind
+    _entrants.update((entrant.name, entrant) for entrant in entrants)
+    _stack = stack
+    _blind = blind
+
+
+def _player(name: str, mirror: bool = False) -> Player:
+    '''Return the player of an entrant, built on first use and reused by
+    every later chunk of the worker. The opponent in a mirror match is a
+    second copy with another name, as the players of a Game must differ.'''
+    key = f'{name} (mirror)' if mirror else name
+    if key not in _players:
+        entrant = _entrants[name]
+        _players[key] = entrant.factory(key, **(entrant.kwargs or {}))
+    return _players[key]
+
+
+def _play_chunk(task: tuple[int, int, str, str, int, int]) -> tuple[int, int, list[float]]:
+    '''Play a chunk of a match and return the big blinds won by player_a on
+    every deal.'''
+    match, chunk, name_a, name_b, hands, seed = task
+    results = play_hands(_player(name_a), _player(name_b, name_a == name_b), seed=seed, stack=_stack, blind=_blind)
+    deals = [0.0] * ((hands + 1) // 2)
+    for i, won in enumerate(itertools.islice(results, hands)):
+        deals[i // 2] += won
+    return match, chunk, deals
+
+
+def _chunk_seed(seed: int, name_a: str, name_b: str, chunk: int) -> int:
+    return random.Random(f'{seed}/{name_a}/{name_b}/{chunk}').getrandbits(64)
+
+
+def _load_checkpoint(path: str, config: dict) -> dict[str, list]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        saved = json.load(file)
+    if saved['config'] != config:
+        raise ValueError(f'{path} belongs to a tournament with different settings.')
+    return saved['chunks']
+
+
+def _save_checkpoint(path: str, config: dict, chunks: dict[str, list]) -> None:
+    # Written next to the checkpoint and renamed, so a crash never leaves it
+    # half written
+    partial = path + '.partial'
+    with open(partial, 'w') as file:
+        json.dump({'config': config, 'chunks': chunks}, file)
+    os.replace(partial, path)
+
+
+def tournament(
+    entrants: list[Entrant],
+    pairs: list[tuple[str, str]] | None = None,
+    hands: int = 100_000,
+    *,
+    seed: int = 0,
+    workers: int | None = None,
+    chunk_hands: int = 1000,
+    checkpoint: str | None = None,
+    stack: int = 1000,
+    blind: int = 10,
+    confidence: float = 0.95,
+    verbose: bool = False
+) -> TournamentResult:
+    '''
+    Play matches between the entrants across a pool of processes.
+    Args:
+        entrants (list[Entrant]): The players.
+        pairs (list[tuple[str, str]] | None): The names of the players of
+            every match, a round robin if not provided.
+        hands (int): The number of hands of every match.
+        seed (int): The seed the seeds of the chunks are derived from.
+        workers (int | None): The number of processes, one per core if not
+            provided.
+        chunk_hands (int): The number of hands a worker plays at once, and
+            how often progress is merged and saved.
+        checkpoint (str | None): The file to save progress to and resume
+            from.
+        stack (int): The stack of both players at the start of every hand.
+        blind (int): The big blind.
+        confidence (float): The confidence level of the intervals.
+        verbose (bool): Whether to print the progress.
+
+    Returns:
+        TournamentResult: The result of every match, the standings and the
+            time it took.
+    '''
+    names = [entrant.name for entrant in entrants]
+    if len(set(names)) != len(names):
+        raise ValueError('Entrant names must be unique.')
+    pairs = round_robin(entrants) if pairs is None else [tuple(pair) for pair in pairs]
+    for name_a, name_b in pairs:
+        if name_a not in names or name_b not in names:
+            raise ValueError(f'Unknown entrant in match {name_a} vs {name_b}.')
+    # Chunks hold whole deals
+    chunk_hands += chunk_hands % 2
+    n_chunks = -(-hands // chunk_hands)
+
+    config = {
+        'pairs': [list(pair) for pair in pairs],
+        'hands': hands,
+        'seed': seed,
+        'chunk_hands': chunk_hands,
+        'stack': stack,
+        'blind': blind
+    }
+    # Tallies of the finished chunks, keyed by 'match/chunk'
+    chunks = _load_checkpoint(checkpoint, config) if checkpoint else {}
+    tasks = []
+    for match, (name_a, name_b) in enumerate(pairs):
+        for chunk in range(n_chunks):
+            if f'{match}/{chunk}' not in chunks:
+                size = min(chunk_hands, hands - chunk * chunk_hands)
+                tasks.append((match, chunk, name_a, name_b, size, _chunk_seed(seed, name_a, name_b, chunk)))
+
+    start = time.perf_counter()
+    played = 0
+    if tasks:
+        with Pool(workers, _init_worker, (entrants, stack, blind)) as pool:
+            for done, (match, chunk, deals) in enumerate(pool.imap_unordered(_play_chunk, tasks), 1):
+                size = min(chunk_hands, hands - chunk * chunk_hands)
+                chunks[f'{match}/{chunk}'] = [len(deals), size, sum(deals), sum(won * won for won in deals)]
+                played += size
+                if checkpoint:
+                    _save_checkpoint(checkpoint, config, chunks)
+                if verbose:
+                    elapsed = time.perf_counter() - start
+                    print(f'{done}/{len(tasks)} chunks, {played / elapsed:,.0f} hands/s')
+    seconds = time.perf_counter() - start
+
+    tallies = [_Tally() for _ in pairs]
+    for key, values in chunks.items():
+        tallies[int(key.split('/')[0])].add(_Tally(*values))
+    matches = []
+    totals = {name: _Tally() for name in names}
+    opponents = {name: 0 for name in names}
+    for (name_a, name_b), tally in zip(pairs, tallies):
+        rate, interval = bb_per_100(tally.total, tally.squares, tally.deals, tally.hands, confidence)
+        matches.append(MatchResult(name_a, name_b, tally.hands, rate, interval))
+        # Mirror matches say nothing about the standings
+        if name_a != name_b:
+            totals[name_a].add(tally)
+            totals[name_b].add(tally, -1)
+            opponents[name_a] += 1
+            opponents[name_b] += 1
+
+    standings = []
+    for name, tally in totals.items():
+        if tally.hands:
+            rate, interval = bb_per_100(tally.total, tally.squares, tally.deals, tally.hands, confidence)
+            standings.append(Standing(name, opponents[name], tally.hands, rate, interval))
+    standings.sort(key=lambda standing: standing.bb_per_100, reverse=True)
+    return TournamentResult(matches, standings, seconds)
+
+
+def format_table(result: TournamentResult) -> str:
+    '''Return the standings and the matches as a text table.'''
+    width = max([len('Player')] + [len(standing.name) for standing in result.standings])
+    lines = [f'{"Player":<{width}}  Matches     Hands    bb/100  Interval']
+    for standing in result.standings:
+        low, high = standing.interval
+        lines.append(
+            f'{standing.name:<{width}}  {standing.matches:>7}  {standing.hands:>8}  '
+            f'{standing.bb_per_100:>+8.1f}  [{low:+.1f}, {high:+.1f}]'
+        )
+    lines.append('')
+    for match in result.matches:
+        low, high = match.interval
+        lines.append(
+            f'{match.player_a} vs {match.player_b}: {match.hands} hands, '
+            f'{match.bb_per_100:+.1f} bb/100 [{low:+.1f}, {high:+.1f}]'
+        )
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import sys
+
+    from basic_decider import BasicDecisionMaker
+
+    hands = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    checkpoint = sys.argv[3] if len(sys.argv) > 3 else None
+    entrants = [
+        Entrant('Default', BasicDecisionMaker),
+        Entrant('Tight', BasicDecisionMaker, {'win_thresholds': (0.9, 0.75, 0.6, 0.5)}),
+        Entrant('Loose', BasicDecisionMaker, {'win_thresholds': (0.85, 0.6, 0.45, 0.3)})
+    ]
+    result = tournament(
+        entrants,
+        hands=hands,
+        workers=workers,
+        chunk_hands=50,
+        checkpoint=checkpoint,
+        verbose=True
+    )
+    print(f'{len(result.matches)} matches in {result.seconds:.1f}s')
+    print(format_table(result))
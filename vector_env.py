@@ -0,0 +1,299 @@
+'''
+Many heads-up hands stepped in lockstep as NumPy arrays.
+
+VectorEnv holds K independent hands as arrays with one row per hand and
+applies one action to every hand with a single call to step, following the
+rules of Game.process_action and Game.play_round: blinds, raises capped at
+the opponent's stack, all-in runouts and the showdown, where the last
+aggressor shows or mucks first. Showdowns are settled with the batch
+evaluator.
+
+Actions are the indices of ACTIONS and phases the values of GamePhase.
+
+Usage: python vector_env.py [number of hands]
+'''
+import numpy as np
+
+from game_objects import ActionType, GamePhase
+from stats.batch import rank_many
+
+ACTIONS = (
+    ActionType.FOLD,
+    ActionType.CHECK,
+    ActionType.CALL,
+    ActionType.RAISE,
+    ActionType.MUCK,
+    ActionType.SHOW
+)
+FOLD, CHECK, CALL, RAISE, MUCK, SHOW = range(len(ACTIONS))
+
+PRE_FLOP = GamePhase.PRE_FLOP.value
+SHOWDOWN = GamePhase.SHOWDOWN.value
+FINISHED = GamePhase.FINISHED.value
+
+
+class VectorEnv:
+    '''
+    K heads-up hands played at once.
+    Args:
+        n_hands (int): The number of hands K.
+        blind (int): The big blind.
+        seed (int | None): The seed of the deals.
+    '''
+    def __init__(self, n_hands: int, blind: int = 10, seed: int | None = None):
+        if blind % 2:
+            raise ValueError('Blind must be an even number.')
+        self.n_hands = n_hands
+        self.blind = blind
+        self.rng = np.random.default_rng(seed)
+        self._rows = np.arange(n_hands)
+        self.reset()
+
+    def reset(
+        self,
+        stacks: int | np.ndarray = 1000,
+        initial_player: int | np.ndarray | None = None,
+        holes: np.ndarray | None = None,
+        boards: np.ndarray | None = None
+    ) -> None:
+        '''
+        Deal new hands and post the blinds.
+        Args:
+            stacks (int | np.ndarray): The money of the players before the
+                blinds, either the same for all or (K, 2).
+            initial_player (int | np.ndarray | None): The player in the small
+                blind of every hand, random if not provided.
+            holes (np.ndarray | None): The (K, 2, 2) hole cards of the
+                players, random if not provided.
+            boards (np.ndarray | None): The (K, 5) board cards, random if not
+                provided.
+        '''
+        k = self.n_hands
+        rows = self._rows
+        if holes is None or boards is None:
+            cards = np.argpartition(self.rng.random((k, 52)), 9, axis=1)[:, :9]
+            holes = cards[:, :4].reshape(k, 2, 2) if holes is None else holes
+            boards = cards[:, 4:] if boards is None else boards
+        if initial_player is None:
+            initial_player = self.rng.integers(0, 2, k)
+        self.holes = np.asarray(holes, dtype=np.intp)
+        self.boards = np.asarray(boards, dtype=np.intp)
+        self.initial_player = np.broadcast_to(initial_player, (k,)).astype(np.intp)
+        self.stacks = np.broadcast_to(stacks, (k, 2)).astype(np.int64)
+        self.start_stacks = self.stacks.copy()
+
+        small = self.initial_player
+        big = 1 - small
+        self.bets = np.zeros((k, 2), dtype=np.int64)
+        self.bets[rows, small] = self.blind // 2
+        self.bets[rows, big] = self.blind
+        self.stacks -= self.bets
+        self.phase = np.full(k, PRE_FLOP, dtype=np.int8)
+        self.current_player = small.copy()
+        self.last_aggresive_player = big.copy()
+        # Actions taken on the current street
+        self.actions = np.zeros(k, dtype=np.int8)
+        self._showdown(self.stacks[rows, small] == 0)
+
+    @property
+    def done(self) -> np.ndarray:
+        '''Return whether every hand has finished.'''
+        return self.phase == FINISHED
+
+    def legal_actions(self) -> np.ndarray:
+        '''Return the (K, 6) mask of the actions the current players can
+        take, none for finished hands.'''
+        rows = self._rows
+        player = self.current_player
+        own = self.bets[rows, player]
+        other = self.bets[rows, 1 - player]
+        betting = self.phase < SHOWDOWN
+        showdown = self.phase == SHOWDOWN
+        legal = np.zeros((self.n_hands, len(ACTIONS)), dtype=bool)
+        legal[:, FOLD] = betting
+        legal[:, CHECK] = betting & (own >= other)
+        legal[:, CALL] = betting & (own < other)
+        legal[:, RAISE] = betting & (self.stacks[rows, player] + own > other)
+        legal[:, MUCK] = showdown
+        legal[:, SHOW] = showdown
+        return legal
+
+    def step(
+        self,
+        actions: np.ndarray,
+        values: np.ndarray | int = 0
+    ) -> tuple[np.ndarray, bool]:
+        '''
+        Apply an action of the current player of every hand. Finished hands
+        ignore theirs.
+        Args:
+            actions (np.ndarray): The (K,) indices of the actions in ACTIONS.
+            values (np.ndarray | int): The amounts to raise by, for raises.
+
+        Returns:
+            tuple[np.ndarray, bool]: The (K, 2) money won by both
+                players in the hands that finished with this step, and
+                whether every hand has finished.
+        '''
+        rows = self._rows
+        actions = np.asarray(actions)
+        values = np.broadcast_to(values, (self.n_hands,)).astype(np.int64)
+        stacks = self.stacks
+        bets = self.bets
+        phase = self.phase
+        player = self.current_player.copy()
+        other = 1 - player
+        active = phase != FINISHED
+        showdown = phase == SHOWDOWN
+        own_bet = bets[rows, player]
+        other_bet = bets[rows, other]
+
+        is_showdown_action = (actions == MUCK) | (actions == SHOW)
+        invalid = active & (
+            (is_showdown_action != showdown)
+            | ((actions == CHECK) & (own_bet != other_bet))
+        )
+        if invalid.any():
+            raise ValueError(f'Invalid actions in hands {np.flatnonzero(invalid)[:10].tolist()}')
+
+        # Folds and mucks give the pot to the other player
+        folded = active & ((actions == FOLD) | (actions == MUCK))
+        stacks[rows[folded], other[folded]] += own_bet[folded] + other_bet[folded]
+        phase[folded] = FINISHED
+
+        # The second show settles the hand
+        shown = active & (actions == SHOW)
+        self.actions[shown] += 1
+        settled = shown & (self.actions == 2)
+        self.current_player[shown & ~settled] = other[shown & ~settled]
+        self._settle(settled)
+
+        # Raises, capped at the own stack and at what the other player can
+        # call, and calls
+        raised = active & (actions == RAISE)
+        call_bet = other_bet - own_bet
+        total_bet = np.minimum(values + call_bet, stacks[rows, player])
+        # Cannot raise over all-in in two player game
+        total_bet = np.minimum(total_bet, stacks[rows, other] + other_bet)
+        called = active & ((actions == CALL) | (raised & (total_bet == call_bet)))
+        raised &= total_bet != call_bet
+        amount = np.where(raised, total_bet, np.where(called, call_bet, 0))
+        stacks[rows, player] -= amount
+        bets[rows, player] += amount
+        self.last_aggresive_player[raised] = player[raised]
+
+        # The street ends once both players acted and the bets are matched
+        betting = active & ((actions == CHECK) | called | raised)
+        self.actions[betting] += 1
+        self.current_player[betting] = other[betting]
+        ended = betting & (self.actions >= 2) & (bets[:, 0] == bets[:, 1])
+        self.actions[ended] = 0
+        self.current_player[ended] = self.initial_player[ended]
+        phase[ended] += 1
+        self._showdown(ended & ((phase == SHOWDOWN) | (stacks == 0).any(axis=1)))
+
+        finished = active & (phase == FINISHED)
+        rewards = np.where(finished[:, None], stacks - self.start_stacks, 0)
+        return rewards, bool(self.done.all())
+
+    def _showdown(self, hands: np.ndarray) -> None:
+        '''Skip some hands to the showdown, where the last aggressor acts
+        first.'''
+        self.phase[hands] = SHOWDOWN
+        self.actions[hands] = 0
+        self.current_player[hands] = self.last_aggresive_player[hands]
+
+    def _settle(self, hands: np.ndarray) -> None:
+        '''Give the pot to the best hand of some hands, or give every bet
+        back on a tie.'''
+        if not hands.any():
+            return
+        holes = self.holes[hands]
+        boards = self.boards[hands]
+        n = len(boards)
+        cards = np.concatenate((holes, np.broadcast_to(boards[:, None, :], (n, 2, 5))), axis=2)
+        ranks = rank_many(cards.reshape(-1, 7)).reshape(n, 2).astype(np.int32)
+        bets = self.bets[hands]
+        pot = bets.sum(axis=1)
+        won = np.where(
+            (ranks[:, 0] == ranks[:, 1])[:, None],
+            bets,
+            np.where(ranks == ranks.max(axis=1, keepdims=True), pot[:, None], 0)
+        )
+        self.stacks[hands] += won
+        self.phase[hands] = FINISHED
+
+
+if __name__ == '__main__':
+    # Conformance against Game on random actions and throughput benchmark
+    import random
+    import sys
+    import time
+
+    from game import Game
+    from game_objects import Action
+    from player import Player
+
+    class RandomPlayer(Player):
+        '''Takes random valid actions and logs them.'''
+        def __init__(self, name: str, rng: random.Random, log: list):
+            super().__init__(name)
+            self.rng = rng
+            self.log = log
+
+        def get_action(self, hole_cards, board, status, *, op_holecards=None) -> Action:
+            action_type = self.rng.choice(status.get_valid_actions())
+            value = self.rng.randint(0, 150) if action_type == ActionType.RAISE else None
+            self.log.append((ACTIONS.index(action_type), value or 0))
+            return Action(action_type, value)
+
+    n_hands = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+
+    # Play the rounds with Game, then replay their actions in lockstep
+    n_games = 2000
+    logs, stacks, initial, holes, boards, expected = [], [], [], [], [], []
+    for i in range(n_games):
+        rng = random.Random(i)
+        log = []
+        money = (rng.randint(15, 300), rng.randint(15, 300))
+        game = Game(
+            RandomPlayer('A', rng, log),
+            RandomPlayer('B', rng, log),
+            *money,
+            rng=random.Random(i)
+        )
+        game.status.initial_player = rng.randint(0, 1)
+        game.play_round()
+        # Deal the rest of the board to settle hands that ended early
+        while len(game.board) < 5:
+            game.board[len(game.board)] = game.deck.deal()
+        logs.append(log)
+        stacks.append(money)
+        initial.append(game.status.initial_player)
+        holes.append([[card.index for card in hand] for hand in game.hole_cards])
+        boards.append([card.index for card in game.board])
+        expected.append(game.status.players_money)
+
+    env = VectorEnv(n_games)
+    env.reset(np.array(stacks), np.array(initial), np.array(holes), np.array(boards))
+    for t in range(max(map(len, logs))):
+        actions = np.array([log[t][0] if t < len(log) else FOLD for log in logs])
+        values = np.array([log[t][1] if t < len(log) else 0 for log in logs])
+        env.step(actions, values)
+    mismatches = int(np.count_nonzero((env.stacks != np.array(expected)).any(axis=1)))
+    print(f'{mismatches} mismatches against Game in {n_games} hands')
+
+    # Random legal actions in every hand until all of them finish
+    env = VectorEnv(n_hands, seed=0)
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    steps = 0
+    done = False
+    while not done:
+        legal = env.legal_actions()
+        actions = np.argmax(rng.random(legal.shape) * legal, axis=1)
+        _, done = env.step(actions, rng.integers(0, 150, n_hands))
+        steps += 1
+    elapsed = time.perf_counter() - start
+    print(f'{n_hands} hands in {steps} steps and {elapsed:.3f}s ({n_hands / elapsed:,.0f} hands/s)')
+    sys.exit(bool(mismatches))